@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import re
+
+# Almacén en disco de barras de larga historia (años de barras de 1 minuto) que
+# no caben en memoria como DataFrames. Cada (ticker, intervalo) tiene:
+#   - <nombre>.ts: marcas de tiempo int64 (ns UTC) ordenadas, el índice;
+#   - <nombre>.barras: un registro de ancho fijo (REGISTRO) por marca de tiempo;
+#   - <nombre>.json: zona horaria de las barras.
+# Los archivos crecen por el final (la última barra, que pudo estar incompleta, se
+# reescribe); barras anteriores a la última, como las de una recarga por dividendo
+# o split, reescriben los archivos desde la primera de ellas. Las consultas de
+# rango buscan en el índice con searchsorted y devuelven vistas de np.memmap, sin
+# copiar: solo se leen del disco las páginas que se usan.
+
+DIRECTORIO_ALMACEN = os.path.join("cache_datos", "barras")
+
+REGISTRO = np.dtype([
+    ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'), ('adj_close', 'f8'),
+    ('volume', 'f8'), ('dividends', 'f8'), ('splits', 'f8'),
+])
+# Columna del DataFrame de yfinance que va en cada campo del registro
+COLUMNAS = {
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'adj_close': 'Adj Close',
+    'volume': 'Volume', 'dividends': 'Dividends', 'splits': 'Stock Splits',
+}
+
+
+def _rutas(ticker_symbol, interval, directorio):
+    nombre = os.path.join(directorio, re.sub(r'[^\w.=^-]', '_', f"{ticker_symbol}_{interval}"))
+    return nombre + ".ts", nombre + ".barras", nombre + ".json"
+
+def _abrir(ruta, dtype, n):
+    # np.memmap no acepta archivos vacíos
+    if n == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(ruta, dtype=dtype, mode='r', shape=(n,))
+
+def cantidad(ticker_symbol, interval, directorio=DIRECTORIO_ALMACEN):
+    """Número de barras guardadas; el índice de tiempos es el que manda."""
+    ruta_ts = _rutas(ticker_symbol, interval, directorio)[0]
+    return os.path.getsize(ruta_ts) // 8 if os.path.exists(ruta_ts) else 0
+
+def zona_horaria(ticker_symbol, interval, directorio=DIRECTORIO_ALMACEN):
+    ruta_meta = _rutas(ticker_symbol, interval, directorio)[2]
+    if not os.path.exists(ruta_meta):
+        return 'UTC'
+    with open(ruta_meta) as archivo:
+        return json.load(archivo)['tz']
+
+def agregar(ticker_symbol, interval, data, directorio=DIRECTORIO_ALMACEN, reajustar=False):
+    """Guarda las barras de `data`; las que ya estaban con la misma marca de tiempo se reemplazan.
+
+    Lo normal es que sean posteriores a la última guardada (que se reescribe) y solo
+    se escribe la cola. Si empiezan antes, se reescribe desde la primera de ellas.
+    Con reajustar=True (recarga tras un dividendo o split) el adj_close de las barras
+    anteriores a `data` se reescala con el factor de la primera barra en común.
+    Devuelve el número de barras escritas.
+    """
+    if data.empty:
+        return 0
+    ruta_ts, ruta_barras, ruta_meta = _rutas(ticker_symbol, interval, directorio)
+    n = cantidad(ticker_symbol, interval, directorio)
+    indice = data.index.tz_convert('UTC') if data.index.tz is not None else data.index
+    nuevos = indice.as_unit('ns').asi8
+    orden = np.argsort(nuevos, kind='stable')
+    nuevos = nuevos[orden]
+    registros = np.zeros(len(nuevos), dtype=REGISTRO)
+    for campo, columna in COLUMNAS.items():
+        if columna in data:
+            registros[campo] = data[columna].to_numpy(dtype=np.float64)[orden]
+    if 'Adj Close' not in data:
+        registros['adj_close'] = registros['close']
+
+    tiempos = _abrir(ruta_ts, np.int64, n)
+    # Posición desde la que se reescribe (n - 1 si solo se reescribe la última barra)
+    posicion = int(np.searchsorted(tiempos, nuevos[0])) if n else 0
+    if posicion < n:
+        # Las guardadas desde `posicion` que no vienen en `data` se conservan
+        viejos = _abrir(ruta_barras, REGISTRO, n)
+        quedan = ~np.isin(tiempos[posicion:], nuevos)
+        if reajustar and posicion > 0 and tiempos[posicion] == nuevos[0] and viejos['adj_close'][posicion] != 0:
+            factor = registros['adj_close'][0] / viejos['adj_close'][posicion]
+            if np.isfinite(factor) and factor != 1:
+                anteriores = np.memmap(ruta_barras, dtype=REGISTRO, mode='r+', shape=(posicion,))
+                anteriores['adj_close'] *= factor
+                anteriores.flush()
+                del anteriores
+        nuevos = np.concatenate((nuevos, tiempos[posicion:][quedan]))
+        registros = np.concatenate((registros, viejos[posicion:][quedan]))
+        orden = np.argsort(nuevos, kind='stable')
+        nuevos, registros = nuevos[orden], registros[orden]
+        del viejos
+    del tiempos
+
+    os.makedirs(directorio, exist_ok=True)
+    if n == 0:
+        with open(ruta_meta, "w") as archivo:
+            json.dump({'tz': str(data.index.tz or 'UTC')}, archivo)
+    # Primero los registros y después el índice: nunca hay marcas de tiempo sin barra
+    for ruta, arreglo, ancho in ((ruta_barras, registros, REGISTRO.itemsize), (ruta_ts, nuevos, 8)):
+        with open(ruta, "ab") as archivo:
+            archivo.truncate(posicion * ancho)
+            archivo.write(np.ascontiguousarray(arreglo).tobytes())
+    return len(nuevos)
+
+def rango(ticker_symbol, interval, inicio=None, fin=None, directorio=DIRECTORIO_ALMACEN):
+    """Vistas (tiempos, registros) de las barras en [inicio, fin), sin copiar.
+
+    `tiempos` son int64 ns UTC; `registros` es un arreglo estructurado con los
+    campos de REGISTRO (registros['close'] también es una vista).
+    """
+    ruta_ts, ruta_barras, _ = _rutas(ticker_symbol, interval, directorio)
+    n = cantidad(ticker_symbol, interval, directorio)
+    tiempos = _abrir(ruta_ts, np.int64, n)
+    registros = _abrir(ruta_barras, REGISTRO, n)
+    a = 0 if inicio is None else int(np.searchsorted(tiempos, pd.Timestamp(inicio).value))
+    b = n if fin is None else int(np.searchsorted(tiempos, pd.Timestamp(fin).value))
+    return tiempos[a:b], registros[a:b]
+
+def como_dataframe(tiempos, registros, tz='UTC'):
+    """Copia una vista del almacén a un DataFrame con las columnas de yfinance."""
+    indice = pd.DatetimeIndex(pd.to_datetime(np.asarray(tiempos), unit='ns', utc=True)).tz_convert(tz)
+    return pd.DataFrame({columna: np.asarray(registros[campo]) for campo, columna in COLUMNAS.items()},
+                        index=indice.rename('Datetime'))
@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from scipy.stats import ks_2samp
+import forex
+import simulacion
+from simulacion import simular_modelo, simular_en_paralelo, establecer_backend
+
+# Banco de pruebas de rendimiento de la simulación. Las funciones escalares de
+# forex.py (un bucle de Python por trayectoria) son la referencia: se mide su
+# rendimiento y se usan para comprobar que los motores rápidos reproducen la
+# misma distribución antes de confiar en cualquier aceleración.
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Parámetros de los modelos (los mismos que usa pronosticar_precio)
+PARAMETROS = dict(S0=20.0, T=1 / 24, r=0.01, sigma=0.1, v0=0.01, kappa=1.0, theta=0.01, rho=0.1)
+
+# Grilla del banco de pruebas
+CAMINOS = [1_000, 10_000, 100_000]
+PASOS = [100, 1_000]
+TIPOS = [np.float64, np.float32]
+
+# Trayectorias de referencia (el bucle escalar es lento) y tolerancia estadística
+CAMINOS_REFERENCIA = 2_000
+PASOS_VALIDACION = 100
+P_VALOR_MINIMO = 0.001
+# Diferencia máxima, en errores estándar de la diferencia, de la media, la
+# desviación estándar y los cuantiles 5/50/95 entre motor y referencia. Se exige
+# junto con la prueba KS: con sigma pequeña la dispersión terminal es de pocos por
+# ciento y una tolerancia relativa fija dejaría pasar una volatilidad equivocada.
+Z_MAXIMO = 4.0
+CUANTILES_VALIDACION = np.array([0.05, 0.5, 0.95])
+
+# Los motores exactos reproducen el modelo continuo y no la discretización de
+# Euler, así que se comparan contra la ley del modelo: la normal analítica del
+# log-precio en GBM, Black-Scholes y Vasicek y, en CIR, el mismo muestreador en
+# una grilla REFINAMIENTO veces más fina. Ahí la varianza sale de su ley exacta
+# (chi-cuadrado no central) y la integral de la varianza ya convergió. Euler no
+# sirve de referencia para CIR: con estos parámetros no se cumple la condición
+# de Feller y, cerca de v = 0, converge muy lento. Heston (QE) se compara con Euler.
+REFINAMIENTO = 50
+LEYES_NORMALES = {'GBM', 'Black-Scholes', 'Vasicek'}
+REFERENCIAS_CONTINUAS = LEYES_NORMALES | {'CIR'}
+
+# Funciones escalares de forex.py y los parámetros que reciben
+REFERENCIAS = {
+    'Heston': (forex.heston_model, ('S0', 'T', 'r', 'sigma', 'v0', 'kappa', 'theta', 'rho')),
+    'Black-Scholes': (forex.black_scholes_model, ('S0', 'T', 'r', 'sigma')),
+    'GBM': (forex.geometric_brownian_motion, ('S0', 'T', 'r', 'sigma')),
+    'CIR': (forex.cir_model, ('S0', 'T', 'r', 'sigma', 'kappa', 'theta')),
+    'Vasicek': (forex.vasicek_model, ('S0', 'T', 'r', 'sigma', 'kappa', 'theta')),
+}
+
+def referencia_escalar(modelo, parametros, num_steps, n_paths, semilla, dtype=np.float64):
+    """Ejecuta el bucle escalar original una vez por trayectoria."""
+    funcion, argumentos = REFERENCIAS[modelo]
+    np.random.seed(semilla)
+    valores = [parametros[nombre] for nombre in argumentos]
+    return np.array([funcion(*valores, num_steps) for _ in range(n_paths)], dtype=dtype)
+
+def log_precio_normal(modelo, parametros):
+    """Media y desviación del log-precio terminal de los modelos con ley normal."""
+    S0, T, r, sigma = (parametros[nombre] for nombre in ('S0', 'T', 'r', 'sigma'))
+    if modelo in ('GBM', 'Black-Scholes'):
+        return np.log(S0) + (r - 0.5 * sigma**2) * T, sigma * np.sqrt(T)
+    # Vasicek: la tasa y el log-precio comparten el browniano (ver simulacion.vasicek_exacto)
+    kappa, theta = parametros['kappa'], parametros['theta']
+    e = np.exp(-kappa * T)
+    i1, i2, c = (1 - e) / kappa, (1 - e**2) / (2 * kappa), 1 + 1 / kappa
+    media = np.log(S0) + theta * T + (r - theta) * i1 - 0.5 * sigma**2 * T
+    return media, sigma * np.sqrt(c**2 * T - 2 * c * i1 / kappa + i2 / kappa**2)
+
+def referencia_continua(modelo, parametros, num_steps, n_paths, semilla):
+    """Precios terminales de referencia de los motores exactos en REFERENCIAS_CONTINUAS."""
+    rng = np.random.default_rng(semilla)
+    if modelo in LEYES_NORMALES:
+        return np.exp(rng.normal(*log_precio_normal(modelo, parametros), size=n_paths))
+    tiempos = np.linspace(0, parametros['T'], num_steps * REFINAMIENTO + 1)[1:]
+    return simulacion.simular_en_grilla(modelo, parametros, tiempos, n_paths, rng)[:, -1]
+
+def _con_backend(backend, modelo, parametros, num_steps, n_paths, semilla, dtype):
+    anterior = simulacion.BACKEND
+    establecer_backend(backend)
+    try:
+        return simular_modelo(modelo, parametros, num_steps, n_paths, np.random.default_rng(semilla), dtype)
+    finally:
+        establecer_backend(anterior)
+
+def motor_vectorizado(modelo, parametros, num_steps, n_paths, semilla, dtype=np.float64):
+    return _con_backend('numpy', modelo, parametros, num_steps, n_paths, semilla, dtype)
+
+def motor_numba(modelo, parametros, num_steps, n_paths, semilla, dtype=np.float64):
+    return _con_backend('numba', modelo, parametros, num_steps, n_paths, semilla, dtype)
+
+def motor_exacto(modelo, parametros, num_steps, n_paths, semilla, dtype=np.float64):
+    return simular_modelo(modelo, parametros, num_steps, n_paths, np.random.default_rng(semilla), dtype, esquema='exacto')
+
+def motor_paralelo(modelo, parametros, num_steps, n_paths, semilla, dtype=np.float64):
+    return simular_en_paralelo(parametros, num_steps, n_paths, semilla=semilla, modelos=[modelo], dtype=dtype)[modelo]
+
+# Motores a comparar contra la referencia escalar
+MOTORES = {
+    'escalar': referencia_escalar,
+    'vectorizado': motor_vectorizado,
+    'exacto': motor_exacto,
+    'paralelo': motor_paralelo,
+}
+
+# El backend compilado solo se mide si Numba está instalado
+if simulacion.simulacion_numba is not None:
+    MOTORES['numba'] = motor_numba
+
+def _rss_pico_mb():
+    if resource is None:
+        return np.nan
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024**2 if sys.platform == 'darwin' else pico / 1024  # macOS reporta bytes, Linux KB
+
+def medir_caso(motor, modelo, num_steps, n_paths, dtype, semilla=0):
+    """Mide un caso: tiempo, trayectorias/s, RSS pico y memoria asignada (tracemalloc)."""
+    funcion = MOTORES[motor]
+    # Calentamiento: excluye la compilación JIT y las importaciones perezosas de la medición
+    funcion(modelo, PARAMETROS, 2, 16, semilla, dtype)
+    rss_inicial = _rss_pico_mb()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    trayectorias = funcion(modelo, PARAMETROS, num_steps, n_paths, semilla, dtype)
+    segundos = time.perf_counter() - inicio
+    _, pico_asignado = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    salida = trayectorias.nbytes
+    return {
+        'Motor': motor,
+        'Modelo': modelo,
+        'Trayectorias': n_paths,
+        'Pasos': num_steps,
+        'Tipo': np.dtype(dtype).name,
+        'Segundos': segundos,
+        'Trayectorias/s': n_paths / segundos,
+        'RSS pico (MB)': _rss_pico_mb(),
+        'RSS adicional (MB)': _rss_pico_mb() - rss_inicial,
+        'Asignado pico (MB)': pico_asignado / 1024**2,
+        # Memoria asignada respecto al arreglo de salida: mide los temporales del motor
+        'Asignado / salida': pico_asignado / salida if salida else np.nan,
+    }
+
+def _ejecutar_aislado(caso):
+    """Corre cada caso en un proceso nuevo para que el RSS pico no se arrastre entre casos."""
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+        return pool.submit(medir_caso, *caso).result()
+
+def ejecutar_banco(motores=None, modelos=None, caminos=CAMINOS, pasos=PASOS, tipos=TIPOS, aislar=True):
+    """Recorre la grilla (motor, modelo, trayectorias, pasos, tipo) y devuelve un DataFrame."""
+    motores = list(MOTORES) if motores is None else motores
+    modelos = list(REFERENCIAS) if modelos is None else modelos
+    filas = []
+    for motor, modelo, n_paths, num_steps, dtype in itertools.product(motores, modelos, caminos, pasos, tipos):
+        # El bucle escalar solo se mide con la cantidad de referencia
+        if motor == 'escalar' and n_paths > CAMINOS_REFERENCIA:
+            continue
+        caso = (motor, modelo, num_steps, n_paths, dtype)
+        fila = _ejecutar_aislado(caso) if aislar else medir_caso(*caso)
+        print(f"{motor:12s} {modelo:14s} {n_paths:>8,} x {num_steps:>5,} {fila['Tipo']:8s} "
+              f"{fila['Trayectorias/s']:>14,.0f} tray/s  RSS {fila['RSS pico (MB)']:.0f} MB")
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+def _error_desviacion(muestra):
+    """Error estándar de la desviación estándar muestral (sin suponer normalidad)."""
+    desvios = muestra - muestra.mean()
+    varianza = np.mean(desvios**2)
+    return np.sqrt(max(np.mean(desvios**4) - varianza**2, 0.0) / len(muestra)) / (2 * np.sqrt(varianza))
+
+def _error_cuantiles(muestra, qs, paso=0.02):
+    """Error estándar de los cuantiles muestrales: sqrt(q(1-q)/n) / densidad en el cuantil.
+
+    La inversa de la densidad se estima con la pendiente del cuantil empírico entre q ± paso.
+    """
+    bajos = np.quantile(muestra, np.clip(qs - paso, 0, 1))
+    altos = np.quantile(muestra, np.clip(qs + paso, 0, 1))
+    pendiente = (altos - bajos) / (np.clip(qs + paso, 0, 1) - np.clip(qs - paso, 0, 1))
+    return np.sqrt(qs * (1 - qs) / len(muestra)) * pendiente
+
+def validar_distribuciones(motores=None, modelos=None, n_paths=CAMINOS_REFERENCIA, num_steps=PASOS_VALIDACION):
+    """Compara el precio terminal de cada motor contra su referencia.
+
+    Los motores de Euler se comparan con el bucle escalar y los exactos con la
+    ley del modelo (referencia_continua). Un motor pasa si la prueba KS de dos muestras no lo rechaza y, además, la
+    media, la desviación estándar y los cuantiles 5/50/95 difieren en menos de
+    Z_MAXIMO errores estándar.
+    """
+    motores = [m for m in (list(MOTORES) if motores is None else motores) if m != 'escalar']
+    modelos = list(REFERENCIAS) if modelos is None else modelos
+    filas = []
+    for modelo in modelos:
+        euler = referencia_escalar(modelo, PARAMETROS, num_steps, n_paths, semilla=1)[:, -1]
+        continua = None
+        for motor in motores:
+            if motor == 'exacto' and modelo in REFERENCIAS_CONTINUAS:
+                if continua is None:
+                    continua = referencia_continua(modelo, PARAMETROS, num_steps, n_paths, semilla=1)
+                referencia, nombre_referencia = continua, 'continua'
+            else:
+                referencia, nombre_referencia = euler, 'escalar'
+            for dtype in TIPOS:
+                terminal = MOTORES[motor](modelo, PARAMETROS, num_steps, n_paths, 2, dtype)[:, -1].astype(np.float64)
+                estadistico, p_valor = ks_2samp(referencia, terminal)
+                error_medias = np.sqrt(referencia.var() / len(referencia) + terminal.var() / len(terminal))
+                z_media = abs(terminal.mean() - referencia.mean()) / error_medias
+                error_desviaciones = np.hypot(_error_desviacion(referencia), _error_desviacion(terminal))
+                z_desviacion = abs(terminal.std() - referencia.std()) / error_desviaciones
+                error_cuantiles = np.hypot(_error_cuantiles(referencia, CUANTILES_VALIDACION),
+                                           _error_cuantiles(terminal, CUANTILES_VALIDACION))
+                dif_cuantiles = np.quantile(terminal, CUANTILES_VALIDACION) - np.quantile(referencia, CUANTILES_VALIDACION)
+                z_cuantiles = np.max(np.abs(dif_cuantiles) / error_cuantiles)
+                filas.append({
+                    'Motor': motor,
+                    'Modelo': modelo,
+                    'Tipo': np.dtype(dtype).name,
+                    'Referencia': nombre_referencia,
+                    'Media ref.': referencia.mean(),
+                    'Media motor': terminal.mean(),
+                    'Desv. ref.': referencia.std(),
+                    'Desv. motor': terminal.std(),
+                    'KS': estadistico,
+                    'p-valor': p_valor,
+                    'z medias': z_media,
+                    'z desviaciones': z_desviacion,
+                    'z cuantiles': z_cuantiles,
+                    'Dentro de tolerancia': (p_valor >= P_VALOR_MINIMO and z_media <= Z_MAXIMO
+                                             and z_desviacion <= Z_MAXIMO and z_cuantiles <= Z_MAXIMO),
+                })
+    return pd.DataFrame(filas)
+
+
+if __name__ == "__main__":
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_columns', 20)
+
+    print("Validando distribuciones contra las referencias...")
+    validacion = validar_distribuciones()
+    print(validacion.to_string(index=False))
+    if not validacion['Dentro de tolerancia'].all():
+        print("Advertencia: algún motor no reproduce la distribución de referencia.")
+
+    print("\nMidiendo rendimiento...")
+    resultados = ejecutar_banco()
+    resultados.to_csv("benchmark_simulacion.csv", index=False)
+
+    # Aceleración de cada motor respecto a la referencia escalar del mismo modelo, pasos y tipo
+    escalar = resultados[resultados['Motor'] == 'escalar'].set_index(['Modelo', 'Pasos', 'Tipo'])['Trayectorias/s']
+    resultados['Aceleración'] = [
+        fila['Trayectorias/s'] / escalar.get((fila['Modelo'], fila['Pasos'], fila['Tipo']), np.nan)
+        for _, fila in resultados.iterrows()
+    ]
+    print(resultados.to_string(index=False))
+    print(f"Resultados guardados en benchmark_simulacion.csv ({os.getcwd()})")
@@ -0,0 +1,280 @@
+import pandas as pd
+import json
+import os
+import re
+import almacen_barras
+from calendario import apertura_sesion
+from proveedores import proveedor_actual
+
+# Caché local de barras OHLCV por ticker e intervalo. Cada par (ticker, intervalo)
+# se guarda en un archivo columnar con un JSON de cobertura al lado que registra
+# el rango de fechas ya consultado. Al pedir un rango solo se descargan las barras
+# que faltan antes o después de la cobertura y se combinan con las guardadas, así
+# que repetir una descarga es una lectura de disco.
+#
+# Se guardan los precios sin ajustar junto con 'Adj Close'; el ajuste por
+# dividendos y splits (lo que hace auto_adjust en yfinance) se aplica al leer.
+#
+# Los intervalos intradía y diarios de un rango reciente no se descargan: se
+# construyen remuestreando las barras de 1 minuto, así el reporte, el pronóstico y
+# las gráficas comparten una sola descarga por ticker. Las barras de 1 minuto
+# además se archivan en almacen_barras, donde se acumulan más allá de los 30 días
+# que ofrece yfinance; su archivo de caché solo conserva esos 30 días.
+
+# Parquet si pyarrow está instalado; si no, pickle de pandas
+try:
+    import pyarrow  # noqa: F401
+    FORMATO = 'parquet'
+except ImportError:
+    FORMATO = 'pickle'
+
+DIRECTORIO_CACHE = "cache_datos"
+COLUMNAS_PRECIO = ['Open', 'High', 'Low', 'Close']
+
+# Duración de cada intervalo: una cobertura más reciente que esto se considera al día
+DURACION_INTERVALO = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min', '60m': '60min',
+    '90m': '90min', '1h': '1h', '1d': '1D', '5d': '5D', '1wk': '7D', '1mo': '31D', '3mo': '92D',
+}
+
+# Intervalos que se derivan de barras de 1 minuto cuando el rango pedido las tiene
+INTERVALO_BASE = '1m'
+DERIVABLES = {'2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d'}
+# yfinance solo entrega barras de 1 minuto de los últimos 30 días y 8 días por petición
+HISTORIA_BASE = pd.Timedelta('29D')
+TRAMO_MAXIMO = {'1m': pd.Timedelta('7D')}
+# Intervalos que se archivan en el almacén de barras de larga historia
+ARCHIVADOS = {'1m'}
+
+# Cómo se combinan las columnas al pasar a un intervalo mayor
+AGREGACION = {
+    'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last',
+    'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'max',
+}
+
+
+def _ruta(ticker_symbol, interval, directorio):
+    nombre = re.sub(r'[^\w.=^-]', '_', f"{ticker_symbol}_{interval}")
+    return os.path.join(directorio, f"{nombre}.{FORMATO}")
+
+def _leer(ruta):
+    """Devuelve las barras guardadas y su cobertura (inicio, fin), o (None, None)."""
+    if not (os.path.exists(ruta) and os.path.exists(ruta + ".json")):
+        return None, None
+    with open(ruta + ".json") as archivo:
+        cobertura = json.load(archivo)
+    data = pd.read_parquet(ruta) if FORMATO == 'parquet' else pd.read_pickle(ruta)
+    return data, (pd.Timestamp(cobertura['inicio']), pd.Timestamp(cobertura['fin']))
+
+def _escribir(ruta, data, inicio, fin):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = ruta + ".tmp"
+    if FORMATO == 'parquet':
+        data.to_parquet(temporal)
+    else:
+        data.to_pickle(temporal)
+    os.replace(temporal, ruta)
+    # La cobertura se escribe después de los datos: nunca anuncia barras que no existen
+    with open(ruta + ".json", "w") as archivo:
+        json.dump({'inicio': inicio.isoformat(), 'fin': fin.isoformat(), 'barras': len(data)}, archivo)
+
+def _utc(fecha):
+    fecha = pd.Timestamp(fecha)
+    return fecha.tz_localize('UTC') if fecha.tzinfo is None else fecha.tz_convert('UTC')
+
+def _descargar(ticker_symbol, interval, inicio, fin):
+    """Descarga las barras sin ajustar de [inicio, fin) con el proveedor activo."""
+    return proveedor_actual().historial(ticker_symbol, interval, inicio, fin)
+
+def _inicio_periodo(period, ahora):
+    """Inicio del rango a descargar para un `period` de yfinance ('5d', '1mo', '2y', 'ytd', ...)."""
+    if period == 'max':
+        return pd.Timestamp('1970-01-01', tz='UTC')
+    if period == 'ytd':
+        return ahora.normalize().replace(month=1, day=1)
+    n, unidad = re.fullmatch(r'(\d+)(d|wk|mo|y)', period).groups()
+    n = int(n)
+    if unidad == 'd':
+        # Los días de yfinance son sesiones: se pide un margen y luego se recorta
+        return ahora.normalize() - pd.offsets.BDay(n + 2)
+    if unidad == 'wk':
+        return ahora - pd.DateOffset(weeks=n)
+    return ahora - (pd.DateOffset(months=n) if unidad == 'mo' else pd.DateOffset(years=n))
+
+def _ajustar(data):
+    """Aplica a OHLC el factor Adj Close / Close, igual que auto_adjust=True."""
+    if 'Adj Close' not in data:
+        return data
+    data = data.copy()
+    factor = data['Adj Close'] / data['Close']
+    for columna in COLUMNAS_PRECIO:
+        data[columna] = data[columna] * factor
+    return data.drop(columns='Adj Close')
+
+def intervalo_descarga(interval, inicio, ahora):
+    """Intervalo que hay que descargar para servir `interval` desde `inicio`."""
+    if interval in DERIVABLES and inicio >= ahora - HISTORIA_BASE:
+        return INTERVALO_BASE
+    return interval
+
+def remuestrear(data, interval, apertura=0):
+    """Agrupa barras finas en barras OHLCV de `interval`.
+
+    Las barras intradía se alinean con la hora de apertura de la sesión
+    (`apertura`, minutos desde la medianoche local: 570 para las 9:30 de Nueva
+    York, 0 en forex), como las de yfinance, aunque falten las primeras barras del
+    día; las diarias con la medianoche local.
+    """
+    if data.empty:
+        return data
+    dias = data.index.normalize()
+    if interval == '1d':
+        claves = dias.rename('Date')
+    else:
+        paso = pd.Timedelta(DURACION_INTERVALO[interval])
+        ancla = dias + pd.Timedelta(minutes=apertura)
+        claves = (ancla + (data.index - ancla) // paso * paso).rename('Datetime')
+    agregacion = {columna: funcion for columna, funcion in AGREGACION.items() if columna in data}
+    return data.groupby(claves)[list(agregacion)].agg(agregacion)
+
+def _hay_acciones(data):
+    return any((data[columna] != 0).any() for columna in ('Dividends', 'Stock Splits') if columna in data)
+
+def tramos_pendientes(ticker_symbol, interval, inicio, fin, directorio=DIRECTORIO_CACHE):
+    """Lee el caché y devuelve (ruta, barras, cobertura, tramos que faltan para cubrir [inicio, fin])."""
+    ruta = _ruta(ticker_symbol, interval, directorio)
+    data, cobertura = _leer(ruta)
+    tolerancia = pd.Timedelta(DURACION_INTERVALO.get(interval, '1D'))
+
+    tramos = []
+    if cobertura is None:
+        tramos.append((inicio, fin))
+    else:
+        if inicio < cobertura[0]:
+            tramos.append((inicio, cobertura[0]))
+        if fin > cobertura[1] + tolerancia:
+            # La última barra guardada pudo estar incompleta: se vuelve a pedir
+            tramos.append((cobertura[1] - tolerancia, fin))
+    maximo = TRAMO_MAXIMO.get(interval)
+    if maximo is not None:
+        # Rangos largos se piden en trozos que el proveedor acepte
+        tramos = [(a + i * maximo, min(b, a + (i + 1) * maximo)) for a, b in tramos for i in range(-((a - b) // maximo))]
+    return ruta, data, cobertura, tramos
+
+def _cobertura_nueva(cobertura, tramos, nuevos):
+    """Cobertura tras la descarga: la anterior extendida con los tramos contiguos que trajeron barras.
+
+    Un tramo vacío (yfinance suele devolver un DataFrame vacío en lugar de fallar)
+    no se da por cubierto, así se vuelve a pedir en la siguiente consulta.
+    """
+    rangos = sorted(tramo for tramo, barras in zip(tramos, nuevos) if barras is not None and not barras.empty)
+    if cobertura is not None:
+        rangos = sorted(rangos + [cobertura])
+    bloques = []
+    for a, b in rangos:
+        if bloques and a <= bloques[-1][1]:
+            bloques[-1][1] = max(bloques[-1][1], b)
+        else:
+            bloques.append([a, b])
+    if not bloques:
+        return None
+    # La cobertura es un solo rango: el que contiene a la anterior o, si no había, el más reciente
+    bloque = next((b for b in bloques if cobertura is not None and b[0] <= cobertura[0] and cobertura[1] <= b[1]), bloques[-1])
+    return tuple(bloque)
+
+def _directorio_almacen(directorio):
+    return os.path.join(directorio, "barras")
+
+def _leer_almacen(ticker_symbol, interval, inicio, fin, directorio):
+    """Barras de [inicio, fin) del almacén; solo se copian las de la ventana."""
+    almacen = _directorio_almacen(directorio)
+    tiempos, registros = almacen_barras.rango(ticker_symbol, interval, inicio, fin, almacen)
+    return almacen_barras.como_dataframe(tiempos, registros, almacen_barras.zona_horaria(ticker_symbol, interval, almacen))
+
+def guardar_descarga(ticker_symbol, interval, ruta, data, cobertura, tramos, nuevos):
+    """Combina las barras descargadas (nuevos[i] las de tramos[i]) con las guardadas, escribe el caché y devuelve el total."""
+    tramos, nuevos = list(tramos), [n if n is not None else pd.DataFrame() for n in nuevos]
+    if data is not None and not data.empty and data.index.tz is not None:
+        # Las descargas masivas pueden venir en UTC: se conserva la zona horaria guardada
+        nuevos = [n.tz_convert(data.index.tz) if not n.empty and n.index.tz is not None else n for n in nuevos]
+    # Un dividendo o split nuevo cambia los precios ajustados anteriores: se descarga todo el rango
+    recargado = data is not None and any(_hay_acciones(n[~n.index.isin(data.index)]) for n in nuevos if not n.empty)
+    if recargado:
+        inicio = min([cobertura[0]] + [a for a, _ in tramos])
+        fin = max([cobertura[1]] + [b for _, b in tramos])
+        data, cobertura = None, None
+        tramos, nuevos = [(inicio, fin)], [_descargar(ticker_symbol, interval, inicio, fin)]
+
+    descargado = [n for n in nuevos if not n.empty]
+    if not descargado:
+        # Nada nuevo que guardar: los tramos siguen pendientes
+        return data if data is not None else pd.DataFrame()
+    cobertura = _cobertura_nueva(cobertura, tramos, nuevos)
+    descargado = pd.concat(descargado)
+    descargado = descargado[~descargado.index.duplicated(keep='last')].sort_index()
+    data = descargado if data is None or data.empty else pd.concat([data, descargado])
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    if interval in ARCHIVADOS and cobertura[0] < cobertura[1] - HISTORIA_BASE:
+        # El almacén guarda la historia completa: el caché solo conserva lo que el proveedor aún entrega
+        cobertura = (cobertura[1] - HISTORIA_BASE, cobertura[1])
+        data = data[data.index >= cobertura[0]]
+    _escribir(ruta, data, *cobertura)
+    if interval in ARCHIVADOS:
+        # Al almacén solo van las barras descargadas; tras una recarga reemplazan a las guardadas
+        almacen_barras.agregar(ticker_symbol, interval, descargado, _directorio_almacen(os.path.dirname(ruta)),
+                               reajustar=recargado)
+    return data
+
+def sincronizar(ticker_symbol, interval, inicio, fin, directorio=DIRECTORIO_CACHE):
+    """Garantiza que el caché cubra [inicio, fin] descargando solo lo que falta y devuelve todas sus barras."""
+    ruta, data, cobertura, tramos = tramos_pendientes(ticker_symbol, interval, inicio, fin, directorio)
+    if not tramos:
+        return data
+    nuevos = [_descargar(ticker_symbol, interval, a, b) for a, b in tramos]
+    return guardar_descarga(ticker_symbol, interval, ruta, data, cobertura, tramos, nuevos)
+
+def rango_pedido(period=None, start=None, end=None, ahora=None):
+    """Rango (inicio, fin) en UTC que corresponde a period/start/end."""
+    ahora = proveedor_actual().ahora() if ahora is None else ahora
+    fin = ahora if end is None else min(_utc(end), ahora)
+    inicio = _utc(start) if start is not None else _inicio_periodo(period or '1mo', ahora)
+    return inicio, fin
+
+def historial(ticker_symbol, period=None, interval="1d", start=None, end=None, ajustado=True, directorio=DIRECTORIO_CACHE):
+    """Equivalente en caché de yf.Ticker(ticker_symbol).history(period/start/end, interval).
+
+    Con ajustado=False devuelve los precios sin ajustar y la columna 'Adj Close'.
+    """
+    proveedor = proveedor_actual()
+    ahora = proveedor.ahora()
+    inicio, fin = rango_pedido(period, start, end, ahora)
+    origen = intervalo_descarga(interval, inicio, ahora)
+    if proveedor.cacheable:
+        data = sincronizar(ticker_symbol, origen, inicio, fin, directorio)
+        if origen in ARCHIVADOS and data is not None and not data.empty:
+            # Las barras archivadas se leen del almacén, que guarda la historia completa
+            data = _leer_almacen(ticker_symbol, origen, inicio, None if end is None else fin, directorio)
+    else:
+        data = _descargar(ticker_symbol, origen, inicio, fin)
+    if data is None or data.empty:
+        return pd.DataFrame()
+
+    data = data[data.index >= inicio]
+    if end is not None:
+        data = data[data.index < fin]
+    if origen != interval:
+        data = remuestrear(data, interval, apertura_sesion(ticker_symbol, data.index.tz))
+    if start is None and period and re.fullmatch(r'\d+d', period) and not data.empty:
+        # Últimas n sesiones con datos, como los periodos en días de yfinance
+        fechas = data.index.normalize()
+        data = data[fechas >= fechas.unique()[-int(period[:-1]):].min()]
+    return _ajustar(data) if ajustado else data
+
+def historial_varios(tickers, start=None, end=None, period=None, interval="1d", columna='Adj Close', directorio=DIRECTORIO_CACHE):
+    """Matriz ancha (fechas x tickers) con `columna` de cada ticker, leída del caché."""
+    series = {}
+    for ticker in tickers:
+        data = historial(ticker, period, interval, start, end, ajustado=columna != 'Adj Close', directorio=directorio)
+        if not data.empty:
+            series[ticker] = data[columna]
+    return pd.DataFrame(series)
@@ -0,0 +1,101 @@
+import numpy as np
+from collections import namedtuple
+
+# Calendario de sesiones de cada clase de activo. Para una serie de barras se
+# calcula una sola vez (por ticker e intervalo) dónde empieza cada sesión y dónde
+# hay un cierre de mercado (fin de semana o feriado), como arreglos int64 de
+# posiciones. Las gráficas y estadísticas usan esas posiciones en lugar de
+# recorrer el índice con diff() o de formatear una fecha por barra.
+#
+# Cada barra pertenece a la sesión del día en que cierra:
+#   - forex: de 17:00 a 17:00 de Nueva York (la sesión del lunes abre el domingo);
+#   - futuros (=F): de 18:00 a 17:00 de Nueva York, con una pausa diaria de una hora;
+#   - acciones: el día local de la bolsa.
+# Entre dos sesiones consecutivas hay un cierre de mercado cuando sus días están
+# separados por más de un día; si en medio quedó algún día hábil, fue feriado.
+
+# Hora de Nueva York en que empieza la sesión del día siguiente (None: día local)
+CORTE_SESION = {'forex': 17, 'futuros': 18, 'acciones': None}
+
+NS_DIA = 86_400 * 10**9
+NS_HORA = 3_600 * 10**9
+NS_MS = 10**6
+
+# Hora local de apertura de las bolsas de acciones, en minutos desde la medianoche,
+# según la zona horaria de sus barras. Forex y futuros abren en hora redonda (0)
+APERTURA_BOLSA = {
+    'America/New_York': 570, 'America/Toronto': 570, 'America/Mexico_City': 510, 'America/Sao_Paulo': 600,
+    'Europe/London': 480, 'Europe/Paris': 540, 'Europe/Berlin': 540, 'Europe/Madrid': 540,
+    'Asia/Tokyo': 540, 'Asia/Hong_Kong': 570, 'Asia/Shanghai': 570, 'Asia/Kolkata': 555, 'Australia/Sydney': 600,
+}
+
+Sesiones = namedtuple('Sesiones', ['inicios', 'saltos', 'feriados'])
+Sesiones.__doc__ = """Posiciones (int64) de la primera barra de cada sesión, de las que siguen
+a un cierre de mercado y, entre estas, de las que siguen a un feriado."""
+
+_CACHE = {}
+
+
+def clase_activo(ticker_symbol):
+    if ticker_symbol.endswith('=X'):
+        return 'forex'
+    if ticker_symbol.endswith('=F'):
+        return 'futuros'
+    return 'acciones'
+
+def dias_sesion(indice, clase):
+    """Número de día (desde 1970) de la sesión de cada barra."""
+    corte = CORTE_SESION[clase]
+    if corte is None:
+        local = indice.tz_localize(None) if indice.tz is not None else indice
+        return local.as_unit('ns').asi8 // NS_DIA
+    nueva_york = indice.tz_convert('America/New_York') if indice.tz is not None else indice.tz_localize('UTC').tz_convert('America/New_York')
+    # Las barras desde el corte cuentan para el día siguiente
+    return (nueva_york.tz_localize(None).as_unit('ns').asi8 + (24 - corte) * NS_HORA) // NS_DIA
+
+def apertura_sesion(ticker_symbol, zona):
+    """Minutos desde la medianoche local (de `zona`) en que abre la sesión; las barras intradía se alinean aquí."""
+    if clase_activo(ticker_symbol) != 'acciones':
+        return 0
+    return APERTURA_BOLSA.get(str(zona), 0)
+
+def calcular_sesiones(indice, clase):
+    dias = dias_sesion(indice, clase)
+    if len(dias) == 0:
+        vacio = np.empty(0, dtype=np.int64)
+        return Sesiones(vacio, vacio, vacio)
+    salto_dias = np.diff(dias)
+    inicios = np.concatenate(([0], np.flatnonzero(salto_dias) + 1)).astype(np.int64)
+    cierres = np.flatnonzero(salto_dias > 1)
+    saltos = (cierres + 1).astype(np.int64)
+    # Días hábiles (lunes a viernes) que quedaron sin sesión entre las dos
+    habiles = np.busday_count((dias[cierres] + 1).astype('datetime64[D]'), dias[cierres + 1].astype('datetime64[D]'))
+    return Sesiones(inicios, saltos, saltos[habiles > 0])
+
+def indice_sesiones(ticker_symbol, interval, indice):
+    """Sesiones de la serie, calculadas una vez por ticker e intervalo mientras la serie no cambie."""
+    clave = (ticker_symbol, interval)
+    firma = (len(indice), indice[0].value, indice[-1].value) if len(indice) else (0, 0, 0)
+    guardado = _CACHE.get(clave)
+    if guardado is None or guardado[0] != firma:
+        guardado = (firma, calcular_sesiones(indice, clase_activo(ticker_symbol)))
+        _CACHE[clave] = guardado
+    return guardado[1]
+
+def fechas_hover(indice):
+    """Milisegundos de la hora local de cada barra (como si fuera UTC), para el hover de plotly.
+
+    plotly.js solo da formato de fecha a textos y objetos Date, así que PIRAMIDE_JS
+    arma el texto en el navegador y solo para las velas que muestra.
+    """
+    local = indice.tz_localize(None) if indice.tz is not None else indice
+    return local.as_unit('ns').asi8 // NS_MS
+
+def marcas_eje(indice, sesiones, nticks=20, formato='%d-%b-%Y %H:%M:%S'):
+    """tickvals/ticktext para un eje de posiciones: marcas en inicios de sesión (o repartidas si hay pocas)."""
+    posiciones = sesiones.inicios
+    if len(posiciones) < nticks // 2:
+        posiciones = np.unique(np.concatenate((posiciones, np.linspace(0, len(indice) - 1, nticks).astype(np.int64))))
+    posiciones = posiciones[::max(1, -(-len(posiciones) // nticks))]
+    # Solo se formatean las fechas de las marcas, no las de todas las barras
+    return dict(tickvals=posiciones, ticktext=list(indice[posiciones].strftime(formato)))
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import os
+
+# Calibración por lotes de los parámetros de los modelos a partir de las barras
+# descargadas. Todo se calcula con condiciones de momentos sobre la matriz ancha
+# de retornos (barras x tickers), para todos los tickers a la vez:
+#   - mu y sigma salen de la media y la varianza de los retornos logarítmicos;
+#   - con la varianza realizada u_k en ventanas de BARRAS_VENTANA barras, theta es
+#     su media, kappa sale del cociente de sus autocovarianzas de rezago 2 y 1
+#     (exp(-kappa * ventana)) y xi de 2 (gamma1 - gamma2) = xi^2 v ventana;
+#   - rho es la correlación entre el retorno de la ventana k + 1 y u_{k+2} - u_k.
+# Estas condiciones cruzan ventanas distintas, así que el ruido de medición de la
+# varianza realizada (independiente entre ventanas) no sesga kappa, xi ni rho.
+# Los estimadores dependen solo de sumas (estadísticos suficientes) que se guardan
+# en un caché en disco: cada corrida procesa únicamente las barras nuevas y parte
+# de las sumas de los ajustes anteriores.
+#
+# Unidades: el tiempo se mide en años de DIAS_POR_ANIO sesiones (como r, kappa y T).
+
+RUTA_CACHE = "calibracion.csv"
+DIAS_POR_ANIO = 252
+BARRAS_VENTANA = 8  # Barras por ventana de varianza realizada (2 horas en 15m)
+MIN_TERNAS = 10  # Ternas de ventanas consecutivas para estimar kappa, theta, xi y rho
+
+# Valores por defecto mientras no haya historia suficiente
+KAPPA_DEFECTO = 1.0
+RHO_DEFECTO = 0.1
+RHO_MAXIMO = 0.99
+
+# Duración de cada intervalo de yfinance
+INTERVALOS = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': '60min', '90m': '90min', '1h': '1h', '1d': '1D',
+}
+
+SUMAS_RETORNOS = ['n', 'suma', 'suma2']
+SUMAS_TERNAS = ['ternas', 'sx', 'sy', 'sz', 'sr', 'sxy', 'sxz', 'srr', 'srx', 'srz']
+# Las dos últimas ventanas completas se guardan para formar ternas con las siguientes
+VENTANAS_PREVIAS = ['Ventana anterior', 'Varianza anterior', 'Ventana previa', 'Varianza previa', 'Retorno previo']
+COLUMNAS_ESTADO = ['Ultima barra', 'Ultimo cierre', 'Barras por dia'] + VENTANAS_PREVIAS + SUMAS_RETORNOS + SUMAS_TERNAS
+PARAMETROS = ['S0', 'mu', 'sigma', 'v0', 'kappa', 'theta', 'xi', 'rho', 'Observaciones']
+
+
+def cargar_cache(ruta=RUTA_CACHE):
+    """Lee las sumas guardadas (un renglón por ticker e intervalo)."""
+    if ruta is None or not os.path.exists(ruta):
+        indice = pd.MultiIndex.from_arrays([[], []], names=['Ticker', 'Intervalo'])
+        return pd.DataFrame(columns=COLUMNAS_ESTADO, index=indice, dtype=np.float64)
+    return pd.read_csv(ruta, index_col=['Ticker', 'Intervalo'])
+
+def guardar_cache(cache, ruta=RUTA_CACHE):
+    cache.to_csv(ruta)
+
+def _estado_previo(cache, claves):
+    """Sumas del caché para `claves`; los tickers nuevos empiezan en cero."""
+    estado = cache.reindex(claves)[COLUMNAS_ESTADO].astype(np.float64)
+    estado[SUMAS_RETORNOS + SUMAS_TERNAS] = estado[SUMAS_RETORNOS + SUMAS_TERNAS].fillna(0.0)
+    # La marca de tiempo se guarda en nanosegundos enteros para no perder precisión
+    ultima = cache['Ultima barra'].reindex(claves).fillna(-1).astype(np.int64)
+    return estado, ultima.to_numpy()
+
+def _sumas_ternas(x, y, z, r, validas):
+    """Sumas de las ternas de varianzas (u_k, u_k+1, u_k+2) y el retorno de la ventana k + 1."""
+    x, y, z, r = (np.where(validas, a, 0.0) for a in (x, y, z, r))
+    return {
+        'ternas': validas.sum(axis=0), 'sx': x.sum(axis=0), 'sy': y.sum(axis=0), 'sz': z.sum(axis=0),
+        'sr': r.sum(axis=0), 'sxy': (x * y).sum(axis=0), 'sxz': (x * z).sum(axis=0),
+        'srr': (r * r).sum(axis=0), 'srx': (r * x).sum(axis=0), 'srz': (r * z).sum(axis=0),
+    }
+
+def _ultima_fila(mascara):
+    """Índice de la última fila verdadera de cada columna (-1 si no hay ninguna)."""
+    hay = mascara.any(axis=0)
+    return np.where(hay, len(mascara) - 1 - np.argmax(mascara[::-1], axis=0), -1)
+
+def acumular(cierres, estado, ultima_barra, intervalo_ns):
+    """Suma a `estado` las barras de `cierres` posteriores a `ultima_barra` (una por columna).
+
+    Solo se consumen las barras hasta la última ventana completa; la ventana en
+    curso se procesa en una corrida posterior, cuando ya tenga todas sus barras.
+    """
+    estado = estado.copy()
+    tiempos = cierres.index.as_unit('ns').asi8
+    logs = np.log(cierres.to_numpy(dtype=np.float64))
+    logs[tiempos[:, np.newaxis] <= ultima_barra] = np.nan
+
+    # Retornos respecto al último cierre conocido (el del caché para la primera barra nueva)
+    anterior = pd.DataFrame(logs).ffill().shift(1).to_numpy()
+    anterior = np.where(np.isnan(anterior), np.log(estado['Ultimo cierre'].to_numpy()), anterior)
+    retornos = logs - anterior
+    validos = ~np.isnan(retornos)
+    retornos = np.where(validos, retornos, 0.0)
+
+    # Ventanas alineadas a la época, iguales para todos los tickers
+    ventana_ns = BARRAS_VENTANA * intervalo_ns
+    ventanas, inicio = np.unique(tiempos // ventana_ns, return_index=True)
+    conteo = np.add.reduceat(validos.astype(np.int64), inicio, axis=0)
+    retorno_ventana = np.add.reduceat(retornos, inicio, axis=0)
+    varianza = np.add.reduceat(retornos**2, inicio, axis=0) / BARRAS_VENTANA  # Varianza por barra
+    completas = conteo == BARRAS_VENTANA
+
+    ultima_ventana = _ultima_fila(completas)
+    hay = ultima_ventana >= 0
+    corte = np.where(hay, (ventanas[ultima_ventana] + 1) * ventana_ns, np.iinfo(np.int64).min)
+    usadas = validos & (tiempos[:, np.newaxis] < corte)
+
+    estado['n'] += usadas.sum(axis=0)
+    estado['suma'] += np.where(usadas, retornos, 0.0).sum(axis=0)
+    estado['suma2'] += np.where(usadas, retornos**2, 0.0).sum(axis=0)
+
+    # Tabla de ventanas de cada ticker: las dos últimas del caché seguidas de las
+    # nuevas (las ventanas ya procesadas quedan antes de `desde` y se descartan)
+    columnas = np.arange(cierres.shape[1])
+    desde = np.searchsorted(ventanas, estado['Ventana previa'].fillna(-1).to_numpy() + 1)
+    filas = desde + np.arange(-2, len(ventanas))[:, np.newaxis]
+    dentro = (filas >= 0) & (filas < len(ventanas))
+    filas = np.clip(filas, 0, len(ventanas) - 1)
+    ids = np.where(dentro, ventanas[filas], np.nan)
+    u = np.take_along_axis(varianza, filas, axis=0)
+    rv = np.take_along_axis(retorno_ventana, filas, axis=0)
+    completa = dentro & np.take_along_axis(completas, filas, axis=0)
+    ids[0], u[0], rv[0] = estado['Ventana anterior'], estado['Varianza anterior'], np.nan
+    ids[1], u[1], rv[1] = estado['Ventana previa'], estado['Varianza previa'], estado['Retorno previo']
+    completa[:2] = ~np.isnan(u[:2])
+
+    validas = completa[:-2] & completa[1:-1] & completa[2:] & (ids[1:-1] == ids[:-2] + 1) & (ids[2:] == ids[1:-1] + 1)
+    sumas = _sumas_ternas(u[:-2], u[1:-1], u[2:], rv[1:-1], validas)
+    for nombre in SUMAS_TERNAS:
+        estado[nombre] += sumas[nombre]
+
+    fila = _ultima_fila(usadas)
+    estado['Ultimo cierre'] = np.where(hay, np.exp(logs[fila, columnas]), estado['Ultimo cierre'])
+    ultima_barra = np.where(hay, tiempos[fila], ultima_barra)
+    ultima = _ultima_fila(completa)
+    penultima = _ultima_fila(completa & (np.arange(len(completa))[:, np.newaxis] < ultima))
+    for columna, tabla, indice in (('Ventana anterior', ids, penultima), ('Varianza anterior', u, penultima),
+                                   ('Ventana previa', ids, ultima), ('Varianza previa', u, ultima),
+                                   ('Retorno previo', rv, ultima)):
+        estado[columna] = np.where(indice >= 0, tabla[indice, columnas], np.nan)
+
+    # Barras por sesión (mediana por fecha) para anualizar; se conserva la anterior si no hay datos
+    por_dia = cierres.notna().groupby(cierres.index.date).sum()
+    barras = por_dia.where(por_dia > 0).median().to_numpy(dtype=np.float64)
+    estado['Barras por dia'] = np.where(np.isnan(barras), estado['Barras por dia'], barras)
+    return estado, ultima_barra
+
+def parametros_desde_sumas(estado):
+    """Parámetros anualizados en forma cerrada a partir de las sumas acumuladas."""
+    e = estado
+    dt = 1 / (DIAS_POR_ANIO * e['Barras por dia'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = e['n']
+        media = e['suma'] / n
+        sigma = np.sqrt((e['suma2'] - n * media**2) / (n - 1) / dt)
+        mu = media / dt + 0.5 * sigma**2
+
+        # Autocovarianzas de la varianza por ventana: gamma_l = C exp(-kappa * l * ventana)
+        t = e['ternas']
+        mx, my, mz, mr = e['sx'] / t, e['sy'] / t, e['sz'] / t, e['sr'] / t
+        gamma1 = (e['sxy'] - t * mx * my) / (t - 1)
+        gamma2 = (e['sxz'] - t * mx * mz) / (t - 1)
+        b = gamma2 / gamma1
+        suficiente = t >= MIN_TERNAS
+        ajustable = suficiente & (gamma1 > 0) & (b > 0) & (b < 1)
+        kappa = np.where(ajustable, -np.log(b) / (BARRAS_VENTANA * dt), KAPPA_DEFECTO)
+        theta = np.where(suficiente, my / dt, sigma**2)
+        # 2 (gamma1 - gamma2) = xi^2 v ventana (por barra), sin el ruido de medición
+        q = 2 * (gamma1 - gamma2)
+        identificada = suficiente & (q > 0)
+        xi = np.sqrt(q / (my * BARRAS_VENTANA)) / dt
+
+        # Cov(R_k+1, u_k+2 - u_k) = rho * xi * v * ventana (por barra)
+        cov_rd = (e['srz'] - e['srx'] - t * mr * (mz - mx)) / (t - 1)
+        var_r = (e['srr'] - t * mr**2) / (t - 1)
+        rho = np.clip(cov_rd / np.sqrt(var_r * q), -RHO_MAXIMO, RHO_MAXIMO)
+        rho = np.where(identificada & np.isfinite(rho), rho, RHO_DEFECTO)
+
+    v0 = (e['Varianza previa'] / dt).fillna(sigma**2)
+    return pd.DataFrame({
+        'mu': mu, 'sigma': sigma, 'v0': v0, 'kappa': kappa, 'theta': theta,
+        'xi': np.where(identificada, xi, sigma), 'rho': rho, 'Observaciones': n.astype(np.int64),
+    }, index=estado.index)
+
+def calibrar(cierres, intervalo="15m", ruta_cache=RUTA_CACHE):
+    """Calibra a la vez todos los tickers (columnas de `cierres`).
+
+    Devuelve un DataFrame indexado por ticker con S0, mu, sigma, v0, kappa, theta,
+    xi (volatilidad de la varianza), rho y Observaciones. Las sumas y los parámetros
+    se guardan en `ruta_cache` (None para no usar caché), así una corrida repetida
+    solo procesa las barras nuevas.
+    """
+    tickers = list(cierres.columns)
+    claves = pd.MultiIndex.from_arrays([tickers, [intervalo] * len(tickers)], names=['Ticker', 'Intervalo'])
+    cache = cargar_cache(ruta_cache)
+    estado, ultima_barra = _estado_previo(cache, claves)
+    estado, ultima_barra = acumular(cierres, estado, ultima_barra, pd.Timedelta(INTERVALOS[intervalo]).value)
+    parametros = parametros_desde_sumas(estado)
+
+    if ruta_cache is not None:
+        guardado = estado.join(parametros)
+        guardado['Ultima barra'] = ultima_barra
+        cache = pd.concat([cache.drop(claves, errors='ignore'), guardado])
+        cache['Ultima barra'] = cache['Ultima barra'].astype(np.int64)
+        guardar_cache(cache, ruta_cache)
+
+    parametros.index = pd.Index(tickers, name='Ticker')
+    parametros.insert(0, 'S0', cierres.ffill().iloc[-1].to_numpy(dtype=np.float64))
+    return parametros
+
+def parametros_simulacion(calibracion, T):
+    """Diccionario de parámetros para simulacion.py a partir de un renglón (o tabla) calibrado.
+
+    Con una tabla de varios tickers cada parámetro es un arreglo (uno por ticker).
+    """
+    def valor(columna):
+        arreglo = np.asarray(calibracion[columna], dtype=np.float64)
+        return arreglo.item() if arreglo.ndim == 0 else arreglo
+    return dict(
+        S0=valor('S0'), T=T, r=valor('mu'), sigma=valor('sigma'), v0=valor('v0'),
+        kappa=valor('kappa'), theta=valor('theta'), xi=valor('xi'), rho=valor('rho'),
+    )
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Covarianza de retornos con datos faltantes. En lugar de quedarse solo con las
+# fechas en que todos los tickers tienen precio (un ticker que cotiza desde hace
+# poco recortaría la historia de todos), cada par de tickers usa todas las fechas
+# en que ambos tienen retorno. Las sumas de cada par salen de productos de
+# matrices con máscara (BLAS), sin bucles sobre pares:
+#   n_ij = M'M,   s_ij = X'M (suma de x_i donde también hay x_j),   p_ij = X'X
+#   cov_ij = (p_ij - s_ij s_ji / n_ij) / (n_ij - 1)
+# con X los retornos con ceros en los faltantes y M la máscara de presentes.
+#
+# Una matriz armada por pares puede no ser semidefinida positiva (cada entrada
+# usa fechas distintas), así que se repara recortando los valores propios
+# negativos antes de invertirla.
+
+MIN_OBSERVACIONES = 20      # Fechas en común mínimas para estimar la covarianza de un par
+PISO_VALOR_PROPIO = 1e-10   # Valor propio mínimo tras la reparación, relativo al mayor
+
+
+def covarianza_pares(retornos, min_observaciones=MIN_OBSERVACIONES):
+    """Covarianza muestral (DataFrame) con observaciones completas por pares.
+
+    Los pares con menos de `min_observaciones` fechas en común quedan en NaN.
+    """
+    valores = retornos.to_numpy(dtype=np.float64)
+    presentes = ~np.isnan(valores)
+    mascara = presentes.astype(np.float64)
+    x = np.where(presentes, valores, 0.0)
+
+    comunes = mascara.T @ mascara
+    sumas = x.T @ mascara           # sumas[i, j]: suma de x_i en las fechas en que también hay x_j
+    productos = x.T @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (productos - sumas * sumas.T / comunes) / (comunes - 1)
+    cov[comunes < max(min_observaciones, 2)] = np.nan
+    return pd.DataFrame(cov, index=retornos.columns, columns=retornos.columns)
+
+def reparar_psd(cov, piso=PISO_VALOR_PROPIO):
+    """Matriz semidefinida positiva más cercana recortando valores propios; conserva las varianzas.
+
+    Las covarianzas faltantes (NaN fuera de la diagonal) se toman como correlación cero.
+    """
+    matriz = cov.to_numpy(dtype=np.float64) if isinstance(cov, pd.DataFrame) else np.asarray(cov, dtype=np.float64)
+    matriz = np.where(np.isnan(matriz), 0.0, matriz)
+    matriz = (matriz + matriz.T) / 2
+    valores, vectores = np.linalg.eigh(matriz)
+    minimo = piso * max(valores[-1], 0.0)
+    if valores[0] >= minimo:
+        reparada = matriz
+    else:
+        reparada = (vectores * np.maximum(valores, minimo)) @ vectores.T
+        # Reescala para recuperar las varianzas originales (la diagonal)
+        escala = np.sqrt(np.diagonal(matriz) / np.diagonal(reparada))
+        reparada = reparada * np.outer(escala, escala)
+    if isinstance(cov, pd.DataFrame):
+        return pd.DataFrame(reparada, index=cov.index, columns=cov.columns)
+    return reparada
@@ -0,0 +1,137 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Reducción de velas para gráficas con muchas barras. Con días de barras de 1
+# minuto, una vela por barra hace que el navegador dibuje decenas de miles de
+# velas aunque en pantalla no caben más de unos cientos. Aquí se agrupan barras
+# consecutivas en velas más anchas (apertura de la primera, cierre de la última,
+# máximo y mínimo reales del grupo) y se arma una pirámide de niveles: el nivel 0
+# son las barras originales y cada nivel siguiente agrupa FACTOR_NIVEL veces más.
+#
+# La gráfica empieza con el nivel más fino que cabe completo en el ancho y, al
+# hacer zoom, un script (PIRAMIDE_JS) cambia al nivel más fino que cabe en el
+# rango visible y solo pasa a plotly las velas de ese rango. Así se dibujan a lo
+# más ~ancho / PIXELES_POR_VELA velas, sin importar cuántas barras haya.
+#
+# Los grupos nunca cruzan un cierre de mercado (sesiones.saltos), para que las
+# líneas de los saltos sigan cayendo entre velas. El eje x sigue siendo la
+# posición de la barra: cada vela agrupada se ubica en el centro de sus barras.
+
+PIXELES_POR_VELA = 3        # Ancho mínimo en pantalla de una vela
+FACTOR_NIVEL = 4            # Barras de un nivel por cada vela del siguiente
+
+PIRAMIDE_JS = """
+function activarPiramide(id) {
+  var div = document.getElementById(id), piramide = div.layout.meta.piramide;
+  function arreglo(v) {
+    // write_html deja los arreglos de layout.meta como {dtype, bdata} de plotly
+    if (v && v.bdata !== undefined) {
+      var binario = atob(v.bdata), bytes = new Uint8Array(binario.length);
+      for (var j = 0; j < binario.length; j++) bytes[j] = binario.charCodeAt(j);
+      var tipos = {f4: Float32Array, f8: Float64Array, i4: Int32Array, u4: Uint32Array, i2: Int16Array, u2: Uint16Array, i1: Int8Array, u1: Uint8Array};
+      if (v.dtype === 'i8') return Float64Array.from(new BigInt64Array(bytes.buffer), Number);
+      return new tipos[v.dtype](bytes.buffer);
+    }
+    return v;
+  }
+  var niveles = piramide.niveles.map(function(nivel) {
+    var copia = {tamano: nivel.tamano};
+    ['x', 'open', 'high', 'low', 'close', 'customdata'].forEach(function(campo) { copia[campo] = arreglo(nivel[campo]); });
+    return copia;
+  });
+  // customdata trae los milisegundos de la hora local (como si fuera UTC); plotly solo
+  // da formato de fecha a textos, así que se arman los de las velas mostradas
+  function fechas(ms) {
+    return Array.from(ms, function(t) { return new Date(t).toISOString().slice(0, 19); });
+  }
+  function buscar(x, valor) {
+    var a = 0, b = x.length;
+    while (a < b) { var m = (a + b) >> 1; if (x[m] < valor) a = m + 1; else b = m; }
+    return a;
+  }
+  var mostrado = null;
+  function mostrar(x0, x1) {
+    var nivel = niveles[niveles.length - 1];
+    for (var i = 0; i < niveles.length; i++) {
+      if ((x1 - x0) / niveles[i].tamano <= piramide.velas) { nivel = niveles[i]; break; }
+    }
+    // Una vela de margen a cada lado para que el borde no quede vacío al desplazar
+    var a = Math.max(0, buscar(nivel.x, x0) - 1), b = Math.min(nivel.x.length, buscar(nivel.x, x1) + 1);
+    var clave = nivel.tamano + ':' + a + ':' + b;
+    if (clave === mostrado) return;
+    mostrado = clave;
+    var cambio = {};
+    ['x', 'open', 'high', 'low', 'close'].forEach(function(campo) { cambio[campo] = [nivel[campo].slice(a, b)]; });
+    cambio.customdata = [fechas(nivel.customdata.slice(a, b))];
+    Plotly.restyle(div, cambio, [piramide.traza]);
+  }
+  div.on('plotly_relayout', function(evento) {
+    if (evento['xaxis.autorange'] || evento['autosize']) mostrar(-0.5, piramide.total - 0.5);
+    else if (evento['xaxis.range[0]'] !== undefined) mostrar(evento['xaxis.range[0]'], evento['xaxis.range[1]']);
+    else if (evento['xaxis.range'] !== undefined) mostrar(evento['xaxis.range'][0], evento['xaxis.range'][1]);
+  });
+  // La traza inicial llega con milisegundos: se vuelve a dibujar con sus fechas en texto
+  mostrar(-0.5, piramide.total - 0.5);
+}
+"""
+
+
+def decimar_ohlc(abre, maximo, minimo, cierre, tiempos, tamano, cortes=()):
+    """Agrupa las barras de `tamano` en `tamano`, empezando un grupo nuevo en cada corte.
+
+    Devuelve un dict con x (centro de cada grupo en posiciones de barra), open,
+    high, low, close y customdata (el tiempo de la primera barra del grupo, de `tiempos`;
+    con calendario.fechas_hover, milisegundos que PIRAMIDE_JS convierte en texto).
+    """
+    n = len(cierre)
+    limites = np.union1d(np.arange(0, n, tamano, dtype=np.int64), np.asarray(cortes, dtype=np.int64))
+    finales = np.append(limites[1:], n) - 1
+    return {
+        'x': (limites + finales) / 2,
+        'open': abre[limites],
+        'high': np.fmax.reduceat(maximo, limites),      # fmax/fmin ignoran barras sin dato
+        'low': np.fmin.reduceat(minimo, limites),
+        'close': cierre[finales],
+        'customdata': tiempos[limites],
+    }
+
+def piramide_velas(data, tiempos, cortes=(), ancho=1600, pixeles_por_vela=PIXELES_POR_VELA, factor=FACTOR_NIVEL):
+    """Niveles de velas del más fino (las barras originales) al primero que cabe completo en `ancho`.
+
+    Devuelve (niveles, velas), con velas el máximo de velas a dibujar a la vez.
+    """
+    velas = max(1, ancho // pixeles_por_vela)
+    columnas = [data[columna].to_numpy(dtype=np.float64) for columna in ('Open', 'High', 'Low', 'Close')]
+    cortes = np.asarray(cortes, dtype=np.int64)
+    niveles = []
+    tamano = 1
+    while True:
+        nivel = decimar_ohlc(*columnas, tiempos, tamano, cortes)
+        nivel['tamano'] = tamano
+        niveles.append(nivel)
+        # Los cortes ponen un piso al número de velas: si ya no baja, no hay más niveles útiles
+        if len(nivel['x']) <= velas or tamano >= len(data) or (len(niveles) > 1 and len(nivel['x']) == len(niveles[-2]['x'])):
+            return niveles, velas
+        tamano *= factor
+
+def agregar_velas(fig, data, tiempos, cortes=(), ancho=1600, **kwargs):
+    """Agrega a `fig` un go.Candlestick con la pirámide de `data` en layout.meta.
+
+    La traza empieza con el nivel que cabe completo; `kwargs` pasa a go.Candlestick
+    (nombre, colores, hovertemplate...). Para cambiar de nivel con el zoom hay que
+    incluir PIRAMIDE_JS y llamar activarPiramide(id) tras dibujar (ver script_piramide).
+    """
+    niveles, velas = piramide_velas(data, tiempos, cortes, ancho)
+    inicial = niveles[-1]
+    fig.add_trace(go.Candlestick(
+        x=inicial['x'], open=inicial['open'], high=inicial['high'], low=inicial['low'],
+        close=inicial['close'], customdata=inicial['customdata'], **kwargs
+    ))
+    fig.update_layout(meta=dict(piramide=dict(
+        niveles=niveles, velas=velas, total=len(data), traza=len(fig.data) - 1
+    )))
+    return fig
+
+def script_piramide(div_id="{plot_id}"):
+    """Script para fig.write_html(post_script=...); el id por defecto lo reemplaza plotly."""
+    return PIRAMIDE_JS + f'\nactivarPiramide("{div_id}");\n'
@@ -0,0 +1,219 @@
+import pandas as pd
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import almacen_barras
+from cache_datos import DIRECTORIO_CACHE, INTERVALO_BASE, rango_pedido, intervalo_descarga, tramos_pendientes, guardar_descarga
+from proveedores import proveedor_actual
+
+# Planificador de descargas para llenar el caché de varios tickers a la vez. Los
+# tickers que necesitan el mismo rango se agrupan en lotes y cada lote se pide en
+# una sola descarga masiva. Los lotes se reparten en un grupo acotado de hilos y
+# todas las peticiones pasan por un cubo de tokens que limita la tasa; cada
+# petición tiene un timeout y se reintenta con espera exponencial con jitter. Si
+# un lote falla del todo, sus tickers se piden de a uno antes de darse por perdidos.
+# Un ticker que vuelve sin barras cuenta como fallo: nunca se guarda como cubierto.
+#
+# Después de precargar(), historial() encuentra las barras en el caché y no va a la red.
+#
+# sondear() es para consultas frecuentes (vigilar): solo pide las barras posteriores
+# a la última del almacén de barras y las agrega al final, sin reescribir el caché.
+
+TAMANO_LOTE = 10          # Tickers por descarga masiva
+MAX_WORKERS = 4           # Descargas simultáneas
+TASA = 2.0                # Peticiones por segundo
+CAPACIDAD = 4             # Ráfaga máxima de peticiones
+INTENTOS = 3
+ESPERA_BASE = 1.0         # Segundos antes del primer reintento
+TIMEOUT = 20              # Segundos por petición
+
+
+class CuboTokens:
+    """Limitador de tasa compartido entre hilos: `tasa` peticiones por segundo con ráfagas de `capacidad`."""
+
+    def __init__(self, tasa=TASA, capacidad=CAPACIDAD):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._candado = threading.Lock()
+
+    def tomar(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._candado:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+
+def con_reintentos(funcion, *args, cubo=None, intentos=INTENTOS, espera_base=ESPERA_BASE):
+    """Llama a funcion(*args) tomando un token por intento; entre intentos espera base * 2^n con jitter."""
+    for intento in range(intentos):
+        if cubo is not None:
+            cubo.tomar()
+        try:
+            return funcion(*args)
+        except Exception:
+            if intento == intentos - 1:
+                raise
+            # El jitter evita que los hilos que fallaron juntos reintenten juntos
+            time.sleep(espera_base * 2 ** intento * random.uniform(0.5, 1.5))
+
+
+def _sin_barras(data):
+    return data is None or data.empty or data.dropna(how='all').empty
+
+def _pedir_varios(proveedor, pendientes, datos, interval, a, b, timeout):
+    """Descarga masiva de `pendientes`; pasa a `datos` los que trajeron barras y falla si falta alguno.
+
+    yf.download no lanza error por los tickers que fallan (los deja vacíos o en
+    NaN), así que un ticker sin barras cuenta como error: el reintento pide solo
+    los que faltan y, si se agotan los intentos, se pasa a pedirlos de a uno.
+    """
+    recibidos = proveedor.historial_varios(list(pendientes), interval, a, b, timeout)
+    for ticker in list(pendientes):
+        if not _sin_barras(recibidos.get(ticker)):
+            datos[ticker] = recibidos[ticker]
+            pendientes.remove(ticker)
+    if pendientes:
+        raise LookupError(f"Sin barras de {a} a {b} para {', '.join(pendientes)}")
+
+def _pedir(proveedor, ticker, interval, a, b, timeout):
+    data = proveedor.historial(ticker, interval, a, b, timeout)
+    if _sin_barras(data):
+        raise LookupError(f"Sin barras de {a} a {b} para {ticker}")
+    return data
+
+def _descargar_lote(proveedor, lote, interval, tramos, timeout, cubo):
+    """Descarga los tramos de un lote; devuelve ({ticker: [barras de cada tramo]}, {ticker: error})."""
+    nuevos = {ticker: [] for ticker in lote}
+    errores = {}
+    for a, b in tramos:
+        datos = {}
+        pendientes = [ticker for ticker in lote if ticker not in errores]
+        try:
+            con_reintentos(_pedir_varios, proveedor, pendientes, datos, interval, a, b, timeout, cubo=cubo)
+        except Exception:
+            # La descarga masiva falló para algunos tickers: se piden de a uno
+            for ticker in pendientes:
+                try:
+                    datos[ticker] = con_reintentos(_pedir, proveedor, ticker, interval, a, b, timeout, cubo=cubo)
+                except Exception as error:
+                    errores[ticker] = error
+        for ticker in lote:
+            nuevos[ticker].append(datos.get(ticker))
+    return nuevos, errores
+
+
+def precargar(tickers, period=None, interval="1d", start=None, end=None, tamano_lote=TAMANO_LOTE,
+              max_workers=MAX_WORKERS, tasa=TASA, timeout=TIMEOUT, directorio=DIRECTORIO_CACHE):
+    """Llena el caché de `tickers` para period/start/end con descargas masivas concurrentes.
+
+    Devuelve {ticker: error} con los tickers que no se pudieron descargar.
+    """
+    proveedor = proveedor_actual()
+    if not proveedor.cacheable:
+        # Sin caché no hay dónde dejar las barras: historial() las pedirá al proveedor
+        return {}
+    ahora = proveedor.ahora()
+    inicio, fin = rango_pedido(period, start, end, ahora)
+    # Se precarga lo que historial() va a leer: las barras de 1 minuto si el intervalo se deriva de ellas
+    interval = intervalo_descarga(interval, inicio, ahora)
+
+    # Agrupa los tickers por los tramos que les faltan (inicio redondeado al día)
+    pendientes = {}
+    grupos = {}
+    for ticker in dict.fromkeys(tickers):
+        pendiente = tramos_pendientes(ticker, interval, inicio, fin, directorio)
+        if not pendiente[3]:
+            continue
+        pendientes[ticker] = pendiente
+        clave = tuple((a.floor('D'), b) for a, b in pendiente[3])
+        grupos.setdefault(clave, []).append(ticker)
+    if not grupos:
+        return {}
+
+    # Cada lote pide desde el tramo más temprano de sus tickers, no desde el día redondeado
+    lotes = []
+    for grupo in grupos.values():
+        for i in range(0, len(grupo), tamano_lote):
+            lote = grupo[i:i + tamano_lote]
+            tramos = [(min(pendientes[ticker][3][k][0] for ticker in lote), b)
+                      for k, (_, b) in enumerate(pendientes[lote[0]][3])]
+            lotes.append((lote, tramos))
+    tramos_lote = {ticker: tramos for lote, tramos in lotes for ticker in lote}
+    cubo = CuboTokens(tasa, max(1, min(CAPACIDAD, max_workers)))
+    errores = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = [pool.submit(_descargar_lote, proveedor, lote, interval, tramos, timeout, cubo) for lote, tramos in lotes]
+        for futuro in as_completed(futuros):
+            nuevos, errores_lote = futuro.result()
+            errores.update(errores_lote)
+            for ticker, barras in nuevos.items():
+                # Los tramos que fallaron quedan pendientes; los que trajeron barras se guardan
+                ruta, data, cobertura, _ = pendientes[ticker]
+                guardar_descarga(ticker, interval, ruta, data, cobertura, tramos_lote[ticker], barras)
+
+    for ticker, error in errores.items():
+        print(f"No se pudo descargar {ticker} ({interval}): {error}")
+    return errores
+
+
+def sondear(tickers, interval=INTERVALO_BASE, period="1d", tamano_lote=TAMANO_LOTE, max_workers=MAX_WORKERS,
+            tasa=TASA, timeout=TIMEOUT, directorio=DIRECTORIO_CACHE):
+    """Agrega al almacén de barras de cada ticker las barras posteriores a la última guardada.
+
+    El costo por ticker es el de la cola nueva: ni el caché ni su cobertura se
+    reescriben (historial() los completa la próxima vez que se consulte). Los
+    tickers que aún no están en el almacén se precargan con `period`. Devuelve
+    {ticker: error} con los tickers que no se pudieron consultar.
+    """
+    proveedor = proveedor_actual()
+    if not proveedor.cacheable:
+        return {}
+    almacen = os.path.join(directorio, "barras")
+    desde = {}
+    for ticker in dict.fromkeys(tickers):
+        tiempos = almacen_barras.rango(ticker, interval, directorio=almacen)[0]
+        if len(tiempos):
+            # La última barra guardada pudo estar en curso: se vuelve a pedir
+            desde[ticker] = pd.Timestamp(int(tiempos[-1]), tz='UTC')
+    errores = precargar([ticker for ticker in tickers if ticker not in desde], period, interval, tamano_lote=tamano_lote,
+                        max_workers=max_workers, tasa=tasa, timeout=timeout, directorio=directorio)
+    if not desde:
+        return errores
+
+    ahora = proveedor.ahora()
+    lotes = [list(desde)[i:i + tamano_lote] for i in range(0, len(desde), tamano_lote)]
+    cubo = CuboTokens(tasa, max(1, min(CAPACIDAD, max_workers)))
+
+    def sondear_lote(lote):
+        # Una cola vacía es normal (mercado cerrado): aquí no cuenta como error
+        inicio = min(desde[ticker] for ticker in lote)
+        return con_reintentos(proveedor.historial_varios, lote, interval, inicio, ahora, timeout, cubo=cubo)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {pool.submit(sondear_lote, lote): lote for lote in lotes}
+        for futuro in as_completed(futuros):
+            try:
+                datos = futuro.result()
+            except Exception as error:
+                errores.update(dict.fromkeys(futuros[futuro], error))
+                continue
+            for ticker in futuros[futuro]:
+                data = datos.get(ticker)
+                if data is not None and not data.empty:
+                    almacen_barras.agregar(ticker, interval, data[data.index >= desde[ticker]], almacen)
+
+    for ticker in desde:
+        if ticker in errores:
+            print(f"No se pudo consultar {ticker} ({interval}): {errores[ticker]}")
+    return errores
@@ -0,0 +1,346 @@
+import numpy as np
+import math
+from collections import deque
+
+# Acumuladores en línea para resumir muchas trayectorias sin guardarlas.
+# Ambos trabajan columna a columna (una columna por paso de tiempo) y se
+# actualizan con lotes de forma (filas, columnas) que después se descartan.
+#
+# EstadisticasSerie resume una sola serie de precios (media, desviación,
+# asimetría, curtosis, mínimo, máximo y cuartiles) con los mismos principios:
+# se alimenta por lotes, se combina con las de otros tramos o activos y admite
+# una ventana móvil que quita los valores viejos.
+
+# Error relativo de los cuantiles de precios (0.1 %) y razón máximo / mínimo que
+# cubren sin colapsar cubetas: de ahí sale el número de cubetas
+ALPHA_PRECIOS = 1e-3
+RANGO_PRECIOS = 1e3
+
+
+def cubetas_necesarias(alpha, rango):
+    """Cubetas que necesita un SketchCuantiles de error `alpha` para valores con máximo / mínimo = `rango`."""
+    gamma = (1 + alpha) / (1 - alpha)
+    return math.ceil(math.log(rango) / math.log(gamma)) + 1
+
+
+class MomentosEnLinea:
+    """Media y varianza por columna con actualizaciones por lotes (Chan/Welford)."""
+
+    def __init__(self, n_columnas):
+        self.n = 0
+        self.media = np.zeros(n_columnas)
+        self.m2 = np.zeros(n_columnas)
+
+    def actualizar(self, lote):
+        lote = np.asarray(lote, dtype=np.float64)
+        if lote.ndim == 1:
+            lote = lote[np.newaxis, :]
+        n_b = lote.shape[0]
+        if n_b == 0:
+            return self
+        media_b = lote.mean(axis=0)
+        m2_b = ((lote - media_b) ** 2).sum(axis=0)
+        self._combinar(n_b, media_b, m2_b)
+        return self
+
+    def combinar(self, otro):
+        """Fusiona otro acumulador con el mismo número de columnas."""
+        if otro.n:
+            self._combinar(otro.n, otro.media, otro.m2)
+        return self
+
+    def _combinar(self, n_b, media_b, m2_b):
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.media = self.media + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta**2 * (self.n * n_b / n)
+        self.n = n
+
+    @property
+    def varianza(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.full_like(self.m2, np.nan)
+
+    @property
+    def desviacion(self):
+        return np.sqrt(self.varianza)
+
+
+class SketchCuantiles:
+    """Sketch de cuantiles por columna con cubetas logarítmicas (estilo DDSketch).
+
+    Cada cuantil se devuelve con error relativo menor a `alpha` y la memoria
+    queda acotada por `max_cubetas` por columna; al excederla se colapsan las
+    cubetas inferiores (ver cubetas_necesarias). Los cuantiles que caen entre
+    valores colapsados ya no tienen ese error y se devuelven como NaN. Solo
+    admite valores positivos (precios).
+    """
+
+    def __init__(self, n_columnas, alpha=0.001, max_cubetas=2048):
+        self.n_columnas = n_columnas
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.max_cubetas = max_cubetas
+        self.n = 0
+        self.offset = None  # Índice de la primera cubeta
+        self.conteos = np.zeros((n_columnas, 0), dtype=np.int64)
+        # Por columna, valores contados en la primera cubeta que en realidad son menores
+        self.colapsados = np.zeros(n_columnas, dtype=np.int64)
+
+    def _indices(self, valores):
+        valores = np.maximum(valores, np.finfo(np.float64).tiny)
+        return np.ceil(np.log(valores) / self.log_gamma).astype(np.int64)
+
+    def _ajustar_rango(self, i_min, i_max):
+        """Amplía (o colapsa) las cubetas para que cubran [i_min, i_max]."""
+        if self.offset is None:
+            self.offset = i_min
+        ancho = self.conteos.shape[1]
+        nuevo_offset = min(self.offset, i_min)
+        nuevo_fin = max(self.offset + ancho, i_max + 1)
+        # Si excede el máximo se sacrifican las cubetas inferiores
+        nuevo_offset = max(nuevo_offset, nuevo_fin - self.max_cubetas)
+        if nuevo_offset == self.offset and nuevo_fin == self.offset + ancho:
+            return
+        conteos = np.zeros((self.n_columnas, nuevo_fin - nuevo_offset), dtype=np.int64)
+        if ancho:
+            inicio = self.offset - nuevo_offset
+            if inicio >= 0:
+                conteos[:, inicio:inicio + ancho] = self.conteos
+            else:
+                conteos[:, 0] = self.conteos[:, :-inicio + 1].sum(axis=1)
+                # Lo que estaba debajo del nuevo inicio (incluida la cubeta 0 vieja) queda colapsado
+                self.colapsados = self.conteos[:, :-inicio].sum(axis=1)
+                # Si el rango nuevo empieza arriba de la última cubeta vieja, todo quedó en la 0
+                if ancho + inicio > 1:
+                    conteos[:, 1:ancho + inicio] = self.conteos[:, -inicio + 1:]
+        self.offset = nuevo_offset
+        self.conteos = conteos
+
+    def actualizar(self, lote):
+        lote = np.asarray(lote)
+        if lote.ndim == 1:
+            lote = lote[np.newaxis, :]
+        if lote.shape[0] == 0:
+            return self
+        indices = self._indices(lote)
+        self._ajustar_rango(int(indices.min()), int(indices.max()))
+        ancho = self.conteos.shape[1]
+        self.colapsados += (indices < self.offset).sum(axis=0)
+        np.maximum(indices - self.offset, 0, out=indices)  # Valores de cubetas colapsadas
+        indices += np.arange(self.n_columnas, dtype=np.int64) * ancho
+        self.conteos += np.bincount(indices.ravel(), minlength=self.n_columnas * ancho).reshape(self.n_columnas, ancho)
+        self.n += lote.shape[0]
+        return self
+
+    def quitar(self, lote):
+        """Descuenta valores agregados antes con actualizar (ventanas móviles)."""
+        lote = np.asarray(lote)
+        if lote.ndim == 1:
+            lote = lote[np.newaxis, :]
+        if lote.shape[0] == 0:
+            return self
+        ancho = self.conteos.shape[1]
+        # El rango nunca se achica, así que cada valor cae en la cubeta donde se contó
+        indices = self._indices(lote) - self.offset
+        self.colapsados -= (indices < 0).sum(axis=0)
+        np.maximum(indices, 0, out=indices)
+        indices += np.arange(self.n_columnas, dtype=np.int64) * ancho
+        self.conteos -= np.bincount(indices.ravel(), minlength=self.n_columnas * ancho).reshape(self.n_columnas, ancho)
+        self.n -= lote.shape[0]
+        return self
+
+    def combinar(self, otro):
+        """Fusiona otro sketch con el mismo alpha y número de columnas."""
+        if otro.n == 0:
+            return self
+        self._ajustar_rango(otro.offset, otro.offset + otro.conteos.shape[1] - 1)
+        inicio = max(otro.offset - self.offset, 0)
+        recorte = max(self.offset - otro.offset, 0)
+        conteos = otro.conteos
+        if recorte:
+            self.conteos[:, 0] += conteos[:, :recorte].sum(axis=1)
+            self.colapsados += conteos[:, :recorte].sum(axis=1)
+            conteos = conteos[:, recorte:]
+        else:
+            self.colapsados += otro.colapsados
+        self.conteos[:, inicio:inicio + conteos.shape[1]] += conteos
+        self.n += otro.n
+        return self
+
+    def cuantiles(self, qs):
+        """Devuelve un arreglo (len(qs), n_columnas) con los cuantiles pedidos (0-1).
+
+        Es NaN donde el cuantil cae entre valores colapsados (no se conoce con error `alpha`).
+        """
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        acumulado = np.cumsum(self.conteos, axis=1)
+        total = acumulado[:, -1:]
+        resultado = np.empty((len(qs), self.n_columnas))
+        for k, q in enumerate(qs):
+            rango = q * (total - 1)
+            cubeta = np.argmax(acumulado > rango, axis=1)
+            resultado[k] = 2 * self.gamma ** (cubeta + self.offset) / (self.gamma + 1)
+            # Los colapsados son los menores de la primera cubeta: ocupan sus primeros rangos
+            resultado[k, (cubeta == 0) & (rango[:, 0] < self.colapsados)] = np.nan
+        return resultado
+
+
+class EstadisticasSerie:
+    """Momentos, extremos y cuantiles de una serie, actualizables por lotes.
+
+    Los cuatro primeros momentos centrales se combinan con las fórmulas de
+    Welford/Pébay, así que dos acumuladores (días distintos, activos distintos)
+    se fusionan sin volver a recorrer las barras. Los cuantiles salen de un
+    SketchCuantiles con error relativo `alpha` (solo valores positivos) y cubetas
+    para precios que varían hasta `rango` veces; los cuantiles que caen fuera
+    de ese rango se devuelven como NaN.
+
+    Con `ventana` solo se resumen los últimos `ventana` valores: al agregar
+    nuevos se quitan los más viejos restando sus momentos.
+    """
+
+    def __init__(self, ventana=None, alpha=ALPHA_PRECIOS, rango=RANGO_PRECIOS):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = self.m3 = self.m4 = 0.0
+        self._minimo, self._maximo = np.inf, -np.inf
+        self.sketch = SketchCuantiles(1, alpha=alpha, max_cubetas=cubetas_necesarias(alpha, rango))
+        self.ventana = ventana
+        self._valores = deque() if ventana else None
+        # Con ventana, colas monótonas de (índice, valor): el frente es el mínimo
+        # (o el máximo) de la ventana y cada valor entra y sale una sola vez
+        self._inicio = self._agregados = 0
+        self._colas_min = deque() if ventana else None
+        self._colas_max = deque() if ventana else None
+
+    @staticmethod
+    def _momentos(lote):
+        desvios = lote - lote.mean()
+        cuadrados = desvios ** 2
+        return len(lote), lote.mean(), cuadrados.sum(), (cuadrados * desvios).sum(), (cuadrados ** 2).sum()
+
+    def _combinar(self, n_b, media_b, m2_b, m3_b, m4_b):
+        n_a, n = self.n, self.n + n_b
+        delta = media_b - self.media
+        m2_a, m3_a = self.m2, self.m3
+        self.m4 = (self.m4 + m4_b + delta**4 * n_a * n_b * (n_a**2 - n_a * n_b + n_b**2) / n**3
+                   + 6 * delta**2 * (n_a**2 * m2_b + n_b**2 * m2_a) / n**2 + 4 * delta * (n_a * m3_b - n_b * m3_a) / n)
+        self.m3 = m3_a + m3_b + delta**3 * n_a * n_b * (n_a - n_b) / n**2 + 3 * delta * (n_a * m2_b - n_b * m2_a) / n
+        self.m2 = m2_a + m2_b + delta**2 * n_a * n_b / n
+        self.media = self.media + delta * n_b / n
+        self.n = n
+
+    def _quitar(self, n_b, media_b, m2_b, m3_b, m4_b):
+        """Inversa de _combinar: deja los momentos del resto (A) sabiendo los del total y los de B."""
+        n, n_a = self.n, self.n - n_b
+        if n_a == 0:
+            self.n, self.media, self.m2, self.m3, self.m4 = 0, 0.0, 0.0, 0.0, 0.0
+            return
+        media_a = (n * self.media - n_b * media_b) / n_a
+        delta = media_b - media_a
+        m2_a = self.m2 - m2_b - delta**2 * n_a * n_b / n
+        m3_a = self.m3 - m3_b - delta**3 * n_a * n_b * (n_a - n_b) / n**2 - 3 * delta * (n_a * m2_b - n_b * m2_a) / n
+        self.m4 = (self.m4 - m4_b - delta**4 * n_a * n_b * (n_a**2 - n_a * n_b + n_b**2) / n**3
+                   - 6 * delta**2 * (n_a**2 * m2_b + n_b**2 * m2_a) / n**2 - 4 * delta * (n_a * m3_b - n_b * m3_a) / n)
+        self.n, self.media, self.m2, self.m3 = n_a, media_a, max(m2_a, 0.0), m3_a
+
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if len(valores) == 0:
+            return self
+        self._combinar(*self._momentos(valores))
+        self.sketch.actualizar(valores[:, np.newaxis])
+        self._minimo = min(self._minimo, valores.min())
+        self._maximo = max(self._maximo, valores.max())
+        if self.ventana:
+            lista = valores.tolist()
+            self._valores.extend(lista)
+            self._agregar_extremos(lista)
+            sobran = len(self._valores) - self.ventana
+            if sobran > 0:
+                self.quitar([self._valores.popleft() for _ in range(sobran)])
+                self._descartar_extremos(sobran)
+        return self
+
+    def _agregar_extremos(self, lista):
+        for valor in lista:
+            while self._colas_min and self._colas_min[-1][1] >= valor:
+                self._colas_min.pop()
+            while self._colas_max and self._colas_max[-1][1] <= valor:
+                self._colas_max.pop()
+            self._colas_min.append((self._agregados, valor))
+            self._colas_max.append((self._agregados, valor))
+            self._agregados += 1
+
+    def _descartar_extremos(self, n):
+        """Saca de las colas monótonas los `n` valores más viejos que dejaron la ventana."""
+        self._inicio += n
+        for cola in (self._colas_min, self._colas_max):
+            while cola and cola[0][0] < self._inicio:
+                cola.popleft()
+
+    def quitar(self, valores):
+        """Quita valores agregados antes; el mínimo y el máximo de la ventana los ajusta actualizar."""
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if len(valores) == 0:
+            return self
+        self._quitar(*self._momentos(valores))
+        self.sketch.quitar(valores[:, np.newaxis])
+        return self
+
+    def combinar(self, otro):
+        """Fusiona otro acumulador (de otro tramo o activo) sin ventana."""
+        if self.ventana or otro.ventana:
+            raise ValueError("No se pueden combinar acumuladores con ventana móvil.")
+        if otro.n:
+            self._combinar(otro.n, otro.media, otro.m2, otro.m3, otro.m4)
+            self.sketch.combinar(otro.sketch)
+            self._minimo = min(self._minimo, otro._minimo)
+            self._maximo = max(self._maximo, otro._maximo)
+        return self
+
+    @property
+    def minimo(self):
+        if self.ventana:
+            return self._colas_min[0][1] if self._colas_min else np.nan
+        return self._minimo if self.n else np.nan
+
+    @property
+    def maximo(self):
+        if self.ventana:
+            return self._colas_max[0][1] if self._colas_max else np.nan
+        return self._maximo if self.n else np.nan
+
+    @property
+    def varianza(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def desviacion(self):
+        return math.sqrt(self.varianza) if self.n > 1 else np.nan
+
+    @property
+    def asimetria(self):
+        """Asimetría muestral ajustada (la misma que pandas.Series.skew)."""
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return np.nan
+        g1 = math.sqrt(n) * self.m3 / self.m2 ** 1.5
+        return g1 * math.sqrt(n * (n - 1)) / (n - 2)
+
+    @property
+    def curtosis(self):
+        """Exceso de curtosis muestral (el mismo que pandas.Series.kurtosis)."""
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return np.nan
+        g2 = n * self.m4 / self.m2 ** 2 - 3
+        return ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3))
+
+    def cuantil(self, q):
+        return float(self.sketch.cuantiles([q])[0, 0]) if self.n else np.nan
+
+    @property
+    def mediana(self):
+        return self.cuantil(0.5)
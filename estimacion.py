@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import copy
+import math
+import time
+from simulacion import simular_modelo, _generador
+
+# Estimadores Monte Carlo con error estándar para los modelos de simulacion.py.
+# Permiten comparar técnicas de reducción de varianza por su costo real: cuántas
+# trayectorias (y segundos) hacen falta para alcanzar una precisión dada.
+
+
+class Estimacion:
+    """Valor estimado, su error estándar y el costo de obtenerlo."""
+
+    def __init__(self, valor, error_estandar, n_paths, segundos, metodo):
+        self.valor = valor
+        self.error_estandar = error_estandar
+        self.n_paths = n_paths
+        self.segundos = segundos
+        self.metodo = metodo
+
+    @property
+    def trayectorias_por_segundo(self):
+        return self.n_paths / self.segundos if self.segundos > 0 else math.inf
+
+    def trayectorias_para_error(self, objetivo):
+        """Trayectorias necesarias para un error estándar `objetivo` (el error cae como 1/sqrt(n))."""
+        return math.ceil(self.n_paths * (self.error_estandar / objetivo) ** 2)
+
+    def segundos_para_error(self, objetivo):
+        return self.trayectorias_para_error(objetivo) / self.trayectorias_por_segundo
+
+    def intervalo(self, z=1.96):
+        return self.valor - z * self.error_estandar, self.valor + z * self.error_estandar
+
+    def __repr__(self):
+        return f"Estimacion({self.metodo}: {self.valor:.6f} ± {self.error_estandar:.2e}, n={self.n_paths:,})"
+
+
+def _valor_y_error(y, x=None, media_x=None, antiteticas=False):
+    """Media y error estándar de las muestras `y`, con variable de control `x` opcional."""
+    if x is not None:
+        # Coeficiente óptimo b = cov(y, x) / var(x), estimado con las mismas muestras
+        var_x = np.var(x, ddof=1)
+        b = np.cov(y, x)[0, 1] / var_x if var_x > 0 else 0.0
+        y = y - b * (x - media_x)
+    valor = y.mean()
+    if antiteticas:
+        # La trayectoria mitad + j es la antitética de la j: se promedian los pares
+        mitad = (len(y) + 1) // 2
+        k = len(y) - mitad
+        pares = 0.5 * (y[:k] + y[mitad:mitad + k])
+        return valor, pares.std(ddof=1) / math.sqrt(k)
+    return valor, y.std(ddof=1) / math.sqrt(len(y))
+
+def _muestras(modelo, parametros, num_steps, n_paths, funcion, rng, reduccion, control, esquema, dtype):
+    """Simula y devuelve f(S_T) y, si se pide, el precio terminal GBM con los mismos choques."""
+    rng_control = copy.deepcopy(rng) if control else None
+    terminal = simular_modelo(modelo, parametros, num_steps, n_paths, rng, dtype, esquema, reduccion)[:, -1]
+    y = funcion(terminal.astype(np.float64))
+    if not control:
+        return y, None
+    x = simular_modelo('GBM', parametros, num_steps, n_paths, rng_control, dtype, esquema, reduccion)[:, -1]
+    return y, x.astype(np.float64)
+
+def estimar(modelo, parametros, num_steps, n_paths, funcion=None, reduccion=None, control=False, rng=None,
+            esquema='euler', replicas=16, dtype=np.float64):
+    """Estima E[funcion(S_T)] (por defecto el precio esperado) con su error estándar.
+
+    reduccion: None, 'antiteticas', 'momentos', 'sobol' o 'halton'.
+    control=True usa como variable de control el precio terminal de un GBM simulado
+    con los mismos números aleatorios, cuya media cerrada es S0 * exp(r * T).
+    Con momentos y cuasi-Monte Carlo el error se mide entre `replicas` corridas
+    independientes, porque las muestras de una misma corrida no son independientes.
+    """
+    funcion = (lambda s: s) if funcion is None else funcion
+    rng = _generador(rng)
+    media_x = parametros['S0'] * math.exp(parametros['r'] * parametros['T'])
+    metodo = (reduccion or 'simple') + (' + control' if control else '')
+
+    inicio = time.perf_counter()
+    if reduccion in ('momentos', 'sobol', 'halton'):
+        n_replica = max(n_paths // replicas, 2)
+        valores = np.array([
+            _valor_y_error(*_muestras(modelo, parametros, num_steps, n_replica, funcion, rng, reduccion, control, esquema, dtype),
+                           media_x=media_x)[0]
+            for _ in range(replicas)
+        ])
+        n_total = n_replica * replicas
+        valor, error = valores.mean(), valores.std(ddof=1) / math.sqrt(replicas)
+    else:
+        y, x = _muestras(modelo, parametros, num_steps, n_paths, funcion, rng, reduccion, control, esquema, dtype)
+        n_total = n_paths
+        valor, error = _valor_y_error(y, x, media_x, antiteticas=reduccion == 'antiteticas')
+    return Estimacion(valor, error, n_total, time.perf_counter() - inicio, metodo)
+
+def estimar_desde_trayectorias(trayectorias, reduccion=None, funcion=None):
+    """Estimación con error estándar a partir de trayectorias ya simuladas (n_paths, pasos + 1)."""
+    funcion = (lambda s: s) if funcion is None else funcion
+    y = funcion(np.asarray(trayectorias[:, -1], dtype=np.float64))
+    valor, error = _valor_y_error(y, antiteticas=reduccion == 'antiteticas')
+    return Estimacion(valor, error, len(y), 0.0, reduccion or 'simple')
+
+def comparar_reducciones(modelo, parametros, num_steps, n_paths, objetivo, funcion=None, rng=None, esquema='euler'):
+    """Tabla con el costo de cada técnica para alcanzar el error estándar `objetivo`."""
+    rng = _generador(rng)
+    filas = []
+    for reduccion in (None, 'antiteticas', 'momentos', 'sobol', 'halton'):
+        for control in (False, True):
+            est = estimar(modelo, parametros, num_steps, n_paths, funcion, reduccion, control, rng, esquema)
+            filas.append({
+                'Método': est.metodo,
+                'Estimación': est.valor,
+                'Error estándar': est.error_estandar,
+                'Trayectorias/s': est.trayectorias_por_segundo,
+                'Trayectorias necesarias': est.trayectorias_para_error(objetivo),
+                'Segundos necesarios': est.segundos_para_error(objetivo),
+            })
+    tabla = pd.DataFrame(filas)
+    tabla['Ahorro vs simple'] = tabla['Segundos necesarios'].iloc[0] / tabla['Segundos necesarios']
+    return tabla
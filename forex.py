@@ -1,10 +1,15 @@
-import yfinance as yf
 import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
 from scipy.stats import norm
 import math
 import warnings
+from simulacion import simular_modelos, simular_por_lotes, simular_en_paralelo, ResumenSimulacion
+from estimacion import estimar_desde_trayectorias
+from velas import simular_velas_modelos, vela_representativa
+from calibracion import calibrar, parametros_simulacion, DIAS_POR_ANIO
+from cache_datos import historial
+from proveedores import proveedor_actual
 
 warnings.filterwarnings("ignore")
 
@@ -68,55 +73,153 @@ def vasicek_model(S0, T, r, sigma, kappa, theta, num_steps):
     return prices
 
 # Función para pronosticar precios
-def pronosticar_precio(ticker_symbol):
-    # Crear objeto de Ticker y obtener el nombre del activo
-    ticker = yf.Ticker(ticker_symbol)
-    asset_name = ticker.info.get("shortName", "Activo")
+# Con tamano_lote se simula por lotes y cada modelo devuelve un ResumenSimulacion
+# (cuantiles y momentos por paso) en lugar de las trayectorias completas.
+# Con n_workers los lotes se reparten en un pool de procesos; el resultado
+# es reproducible para una semilla sin importar el número de procesos.
+# Con esquema='exacto' se usan los muestreadores exactos (QE en Heston), así que
+# num_steps solo depende de cuántos puntos se quieren graficar.
+# reduccion elige antitéticas, momentos, 'sobol' o 'halton' (ver simulacion.GeneradorReducido).
+# Con subpasos cada modelo devuelve velas OHLC reales (num_steps velas de subpasos
+# pasos finos cada una) guardadas en float32 en lugar de las trayectorias completas
+def pronosticar_precio(ticker_symbol, n_paths=1000, semilla=None, tamano_lote=None, n_workers=None,
+                       num_steps=100, esquema='euler', reduccion=None, subpasos=None):
+    # Obtener el nombre del activo
+    asset_name = proveedor_actual().info(ticker_symbol).get("shortName", "Activo")
     
-    # Descargar datos del activo en intervalos de 1 minuto para los últimos 5 días
-    data = ticker.history(period="5d", interval="15m")
+    # Datos del activo en intervalos de 15 minutos para los últimos 5 días (desde el caché local)
+    data = historial(ticker_symbol, period="5d", interval="15m")
     
     # Verificar si se obtuvieron datos
     if data.empty:
         print(f"No se han encontrado datos para la última semana de {ticker_symbol}.")
         return None, None, None
     
-    # Calcular media (mu) y volatilidad (sigma)
-    log_returns = np.log(data['Close'] / data['Close'].shift(1)).dropna()
-    mu = log_returns.mean() * len(data)
-    sigma = log_returns.std() * np.sqrt(len(data))
-
-    # Parámetros comunes
-    num_steps = 100  # Número de pasos en la simulación
-    S0 = data['Close'].iloc[-1]  # Precio inicial
-    T = 1 / 24  # 1 día
-    r = 0.01  # Tasa de interés libre de riesgo
-    v0 = sigma**2  # Volatilidad inicial
-    kappa = 1.0  # Velocidad de reversión
-    theta = sigma**2  # Nivel de equilibrio
-    rho = 0.1  # Correlación
-
-    # Pronósticos con los modelos seleccionados
-    prices_heston = heston_model(S0, T, r, sigma, v0, kappa, theta, rho, num_steps)
-    prices_bs = black_scholes_model(S0, T, r, sigma, num_steps)
-    prices_gbm = geometric_brownian_motion(S0, T, r, sigma, num_steps)
-    prices_cir = cir_model(S0, T, r, sigma, kappa, theta, num_steps)
-    prices_vasicek = vasicek_model(S0, T, r, sigma, kappa, theta, num_steps)
+    # Calibrar deriva, volatilidad, reversión a la media y correlación con las barras
+    # descargadas (las sumas de corridas anteriores se reutilizan desde el caché)
+    calibracion = calibrar(data[['Close']].rename(columns={'Close': ticker_symbol}), "15m")
+    # Horizonte de una sesión: calibracion mide el tiempo en años de DIAS_POR_ANIO sesiones
+    T = 1 / DIAS_POR_ANIO
+
+    # Pronósticos con los modelos seleccionados: arreglos (n_paths, num_steps + 1)
+    parametros = parametros_simulacion(calibracion.loc[ticker_symbol], T)
+    rng = np.random.default_rng(semilla)
+    if subpasos is not None:
+        trayectorias = simular_velas_modelos(parametros, num_steps, subpasos, n_paths, rng=rng, dtype=np.float32)
+    elif n_workers is not None:
+        trayectorias = simular_en_paralelo(parametros, num_steps, n_paths, semilla=semilla, n_workers=n_workers,
+                                           tamano_lote=tamano_lote or 10000, resumir=tamano_lote is not None,
+                                           esquema=esquema, reduccion=reduccion)
+    elif tamano_lote is None:
+        trayectorias = simular_modelos(parametros, num_steps, n_paths, rng=rng, esquema=esquema, reduccion=reduccion)
+    else:
+        trayectorias = simular_por_lotes(parametros, num_steps, n_paths, tamano_lote=tamano_lote, rng=rng,
+                                         esquema=esquema, reduccion=reduccion)
+
+    # Precio esperado al final del horizonte con su error estándar. La fórmula
+    # desviación / sqrt(n) supone muestras independientes: solo vale sin reducción de
+    # varianza o con antitéticas en un lote único (los pares solo están alineados ahí).
+    # Con momentos o cuasi-Monte Carlo el error sale de réplicas (estimacion.estimar)
+    error_valido = reduccion is None or (reduccion == 'antiteticas' and n_workers is None and tamano_lote is None)
+    for modelo, prices in trayectorias.items():
+        if isinstance(prices, ResumenSimulacion):
+            media = prices.momentos.media[-1]
+            error = prices.momentos.desviacion[-1] / np.sqrt(prices.n)
+        elif isinstance(prices, dict):
+            # Las velas no usan reducción de varianza
+            estimacion = estimar_desde_trayectorias(prices['Close'])
+            media, error = estimacion.valor, estimacion.error_estandar
+        else:
+            estimacion = estimar_desde_trayectorias(prices, reduccion if error_valido else None)
+            media, error = estimacion.valor, estimacion.error_estandar
+        if error_valido or isinstance(prices, dict):
+            print(f"- Precio esperado {modelo}: {media:.4f} ± {error:.4f} (error estándar)")
+        else:
+            print(f"- Precio esperado {modelo}: {media:.4f} (con reducción '{reduccion}' el error estándar "
+                  "requiere réplicas independientes: ver estimacion.estimar)")
+
+    prices_heston = trayectorias['Heston']
+    prices_bs = trayectorias['Black-Scholes']
+    prices_gbm = trayectorias['GBM']
+    prices_cir = trayectorias['CIR']
+    prices_vasicek = trayectorias['Vasicek']
 
     return data, prices_heston, prices_bs, prices_gbm, prices_cir, prices_vasicek, asset_name
 
+# Colores personalizados para cada modelo
+model_colors = {
+    'Heston': '#00FF00',  # Verde
+    'Black-Scholes': '#0000FF',  # Azul
+    'GBM': '#800080',  # Morado
+    'CIR': '#FF4500',  # Naranja
+    'Vasicek': '#FFD700',  # Dorado
+}
+
+# Convertir un color hexadecimal a rgba con transparencia
+def color_rgba(color_hex, alpha):
+    r, g, b = (int(color_hex[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgba({r},{g},{b},{alpha})'
+
+# Función para dibujar bandas de percentiles (5/25/50/75/95) a partir de un ResumenSimulacion
+def agregar_bandas_a_grafica(fig, future_times, model, resumen):
+    color = model_colors[model]
+    bandas = resumen.percentiles((5, 25, 50, 75, 95))
+    for inferior, superior, alpha in [(5, 95, 0.15), (25, 75, 0.35)]:
+        fig.add_trace(go.Scatter(
+            x=future_times,
+            y=bandas[inferior],
+            mode='lines',
+            line=dict(width=0, color=color),
+            legendgroup=model,
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=future_times,
+            y=bandas[superior],
+            mode='lines',
+            line=dict(width=0, color=color),
+            fill='tonexty',
+            fillcolor=color_rgba(color, alpha),
+            legendgroup=model,
+            name=f'{model} P{inferior}-P{superior}'
+        ))
+    fig.add_trace(go.Scatter(
+        x=future_times,
+        y=bandas[50],
+        mode='lines',
+        line=dict(color=color, width=2),
+        legendgroup=model,
+        name=f'{model} mediana ({resumen.n:,} trayectorias)'
+    ))
+
 # Función especial para agregar los pronósticos a la gráfica con candlesticks
 def agregar_pronosticos_a_grafica(fig, future_times, prices_dict):
-    # Colores personalizados para cada modelo
-    model_colors = {
-        'Heston': '#00FF00',  # Verde
-        'Black-Scholes': '#0000FF',  # Azul
-        'GBM': '#800080',  # Morado
-        'CIR': '#FF4500',  # Naranja
-        'Vasicek': '#FFD700',  # Dorado
-    }
-
     for model, prices in prices_dict.items():
+        # Los resúmenes por lotes se dibujan como abanico de percentiles
+        if isinstance(prices, ResumenSimulacion):
+            agregar_bandas_a_grafica(fig, future_times, model, prices)
+            continue
+
+        # Las velas simuladas ya traen máximos y mínimos reales dentro de cada vela
+        if isinstance(prices, dict):
+            vela = vela_representativa(prices)
+            fig.add_trace(go.Candlestick(
+                x=future_times,
+                open=vela['Open'],
+                high=vela['High'],
+                low=vela['Low'],
+                close=vela['Close'],
+                name=f'Predicción de Precios {model}',
+                increasing_line_color=model_colors[model],
+                decreasing_line_color=model_colors[model]
+            ))
+            continue
+
+        # Con varias trayectorias se grafica la mediana por paso de tiempo
+        if prices.ndim == 2:
+            prices = np.median(prices, axis=0)
+
         # Crear candlesticks para los pronósticos con colores específicos
         up_color = model_colors[model]  # Color para los precios crecientes
         down_color = model_colors[model]  # Color para los precios decrecientes
@@ -131,13 +234,24 @@ def agregar_pronosticos_a_grafica(fig, future_times, prices_dict):
             decreasing_line_color=down_color
         ))
 
+# Número de puntos de tiempo de un pronóstico (trayectorias, resumen por lotes o velas)
+def _num_puntos(prices):
+    if isinstance(prices, ResumenSimulacion):
+        return prices.momentos.media.shape[0]
+    if isinstance(prices, dict):
+        return prices['Close'].shape[-1] + 1
+    return prices.shape[-1]
+
 # Función para mostrar la gráfica combinada
 def mostrar_grafica(ticker_symbol, data, prices_dict, html_filename):
     if data is None or not prices_dict:
         return
     
-    # Crear figura para la simulación de precios
-    future_times = pd.date_range(data.index[-1], periods=len(next(iter(prices_dict.values()))), freq='40T')
+    # Crear figura para la simulación de precios. El pronóstico cubre una sesión
+    # (T = 1 / DIAS_POR_ANIO), que dura lo que las barras de 15m de una sesión típica
+    num_puntos = _num_puntos(next(iter(prices_dict.values())))
+    duracion_sesion = pd.Timedelta(minutes=15) * data.groupby(data.index.date).size().median()
+    future_times = pd.date_range(data.index[-1], periods=num_puntos, freq=duracion_sesion / (num_puntos - 1))
     
     fig = go.Figure()
     
@@ -180,20 +294,22 @@ def mostrar_grafica(ticker_symbol, data, prices_dict, html_filename):
     fig.write_html(html_filename)
     print(f"La gráfica de predicción ha sido guardada en {html_filename}")
 
-# Crear un archivo HTML para guardar la predicción de precios
-html_filename = "prediccion_precios.html"
+# El bloque principal queda protegido para que los procesos del pool puedan importar el módulo
+if __name__ == "__main__":
+    # Crear un archivo HTML para guardar la predicción de precios
+    html_filename = "prediccion_precios.html"
 
-# Pronosticar precios
-data, prices_heston, prices_bs, prices_gbm, prices_cir, prices_vasicek, asset_name = pronosticar_precio("MXN=X")
+    # Pronosticar precios
+    data, prices_heston, prices_bs, prices_gbm, prices_cir, prices_vasicek, asset_name = pronosticar_precio("MXN=X")
 
-# Crear un diccionario con los precios pronosticados
-prices_dict = {
-    'Heston': prices_heston,
-    'Black-Scholes': prices_bs,
-    'GBM': prices_gbm,
-    'CIR': prices_cir,
-    'Vasicek': prices_vasicek
-}
+    # Crear un diccionario con los precios pronosticados
+    prices_dict = {
+        'Heston': prices_heston,
+        'Black-Scholes': prices_bs,
+        'GBM': prices_gbm,
+        'CIR': prices_cir,
+        'Vasicek': prices_vasicek
+    }
 
-# Mostrar gráfica
-mostrar_grafica("MXN=X", data, prices_dict, html_filename)
+    # Mostrar gráfica
+    mostrar_grafica("MXN=X", data, prices_dict, html_filename)
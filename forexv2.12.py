@@ -1,91 +1,26 @@
-import yfinance as yf
-import plotly.graph_objects as go
 import pandas as pd
 import time
+from functools import partial
+from cache_datos import historial
+from descargas import precargar
+from estadisticas import EstadisticasSerie
+from fundamentales import info_varios
+from reporte_html import encabezado_html, pie_html
+from reporte_paralelo import Tarea, modo_fragmentado, seccion_grafica, secciones_en_orden
 start_time = time.time()
 
 
-def obtener_datos(ticker_symbol, period, interval):
-    """Obtiene los datos históricos de un ticker con el periodo e intervalo especificados."""
-    ticker = yf.Ticker(ticker_symbol)
-    data = ticker.history(period=period, interval=interval)
-    
-    if data.empty:
-        print(f"No se han encontrado datos para {tickers_info[ticker_symbol]} ({ticker_symbol}).")
-        return None, None
-
-    # Filtrar saltos mayores a 1 día
-    data = data[~data.index.to_series().diff().dt.days.gt(1)]
-    
-    # Convertir índices a fecha con formato "día mes abreviado y año"
-    data['Date'] = data.index.strftime('%d-%b-%Y %H:%M:%S')  # Día, mes abreviado y año (4 dígitos)
-    
-    # Identificar los saltos entre días
-    data['Delta'] = data.index.to_series().diff().dt.days.fillna(0)
-    weekend_jumps = data[data['Delta'] > 1].index  # Fechas con saltos
-
-    return data, weekend_jumps
-
 def mostrar_estadisticas(ticker_symbol, data):
     """Muestra estadísticas si el intervalo es de 1 minuto."""
     print("\n")
     print(f"Estadísticas del precio para {tickers_info[ticker_symbol]} ({ticker_symbol}):")
     print(f"- Último precio: {data['Close'].iloc[-1]:.4f} USD")
     print(f"- Última fecha y hora del dato: {data.index[-1]}")
-    print(f"- Precio medio: {data['Close'].mean():.4f} USD")
-    print(f"- Desviación estándar: {data['Close'].std():.4f} USD")
-    print(f"- Precio mínimo: {data['Close'].min():.4f} USD")
-    print(f"- Precio máximo: {data['Close'].max():.4f} USD")
-
-def crear_grafica(data, weekend_jumps, periodo, intervalo, ticker_symbol, index_id):
-    """Crea una gráfica de velas con los datos y añade las líneas de saltos."""
-    fig = go.Figure()
-
-    # Crear gráfico de velas
-    fig.add_trace(go.Candlestick(
-        x=data['Date'],
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
-        name=f'{tickers_info[ticker_symbol]} - Precio Histórico',
-        increasing_line_color='green',
-        decreasing_line_color='red'
-    ))
-
-    # Añadir líneas rojas para los saltos de fin de semana
-    for jump in weekend_jumps:
-        fig.add_shape(
-            type="line",
-            x0=jump.strftime('%d-%b-%Y %H:%M:%S'),
-            x1=jump.strftime('%d-%b-%Y %H:%M:%S'),
-            y0=data['Low'].min(),
-            y1=data['High'].max(),
-            line=dict(color="red", width=2, dash="dot"),
-            xref='x',
-            yref='y'
-        )
-
-    # Ajustar el diseño para omitir los huecos de tiempo
-    fig.update_xaxes(type='category')
-    
-    # Titulo dinámico basado en periodo e intervalo
-    title = f"{tickers_info[ticker_symbol]} ({ticker_symbol}), Periodo: {periodo}, Intervalo: {intervalo}"
-
-    fig.update_layout(
-        title=title,
-        xaxis_title='Fecha',
-        yaxis_title='Precio',
-        height=900,
-        width=1600,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        xaxis=dict(tickformat='%d-%b-%Y %H:%M:%S', tickmode='auto', nticks=20)
-    )
-
-    return fig
-
-
+    estadisticas = EstadisticasSerie().actualizar(data['Close'].to_numpy())
+    print(f"- Precio medio: {estadisticas.media:.4f} USD")
+    print(f"- Desviación estándar: {estadisticas.desviacion:.4f} USD")
+    print(f"- Precio mínimo: {estadisticas.minimo:.4f} USD")
+    print(f"- Precio máximo: {estadisticas.maximo:.4f} USD")
 
 # Formatear los valores numéricos a "1,234.56"
 def formatear_numeros(val):
@@ -95,7 +30,7 @@ def formatear_numeros(val):
         return val  # Si no es un número, lo dejamos tal cual
 
 # Función para guardar las gráficas y la tabla en un archivo HTML
-def guardar_graficas_html(html_filename, *figs, df, tickers_info):
+def guardar_graficas_html(html_filename, tareas, df, tickers_info):
     # Añadir la columna de nombres de los tickers
     df['Nombre Ticker'] = df['Ticker'].map(tickers_info)  # Mapear los nombres de los tickers
 
@@ -105,16 +40,21 @@ def guardar_graficas_html(html_filename, *figs, df, tickers_info):
     # Aplicar el formato a las columnas numéricas utilizando `apply` + `map`
     df = df.apply(lambda col: col.map(formatear_numeros) if col.dtype != 'O' else col)
 
+    # Con muchas gráficas la página solo lleva el índice y la tabla; cada gráfica se carga al verse
+    fragmentos, ruta_plotlyjs = modo_fragmentado(html_filename, tareas)
+
     # Guardar la información en HTML
     with open(html_filename, 'w', encoding='utf-8') as f:  # Codificación UTF-8
+        # plotly.js una sola vez: incrustado, o en un archivo aparte si las gráficas van en fragmentos
+        f.write(encabezado_html("Índice de Gráficas y Datos Financieros", ruta_plotlyjs))
+
         # Crear el índice al inicio del archivo HTML
         f.write("<h1 id='top'>Índice de Gráficas y Datos Financieros</h1>\n")
         f.write("<ul style='columns: 2;'>\n")  # Índice en dos columnas
         
         # Crear enlaces al índice de los tickers (gráficas)
-        for i, fig in enumerate(figs):
-            ticker_symbol = fig.layout.title.text.split('(')[0].strip()  # Obtener el nombre sin ticker
-            f.write(f'<li><a href="#ticker{i}" style="color:blue;">{ticker_symbol}</a></li>\n')
+        for tarea in tareas:
+            f.write(f'<li><a href="#ticker{tarea.indice}" style="color:blue;">{tarea.nombre}</a></li>\n')
         f.write("</ul>\n\n")
 
         # Insertar la tabla del DataFrame con la información financiera
@@ -125,13 +65,11 @@ def guardar_graficas_html(html_filename, *figs, df, tickers_info):
         f.write(df.to_html(index=False))  # Convertir el DataFrame a HTML y eliminar el índice
         f.write("</div>\n")  # Cierre del contenedor centrado
 
-        # Guardar las gráficas con sus títulos y asignar ID a cada sección
-        for i, fig in enumerate(figs):
-            f.write(f'<a id="ticker{i}"></a>\n')  # Asignar un ID a cada gráfico
-            f.write(f'<h2>{fig.layout.title.text}</h2>\n')  # Título descriptivo
-            f.write(fig.to_html(full_html=True, include_plotlyjs="cdn"))
-            f.write(f'<br><a href="#top">Ir al inicio</a><br><br>')  # Enlace para ir al inicio
-            f.write("\n")
+        # Las secciones de las gráficas se arman en paralelo y se escriben en orden
+        # conforme terminan, sin tener todas las figuras en memoria
+        for seccion in secciones_en_orden(partial(seccion_grafica, directorio=fragmentos), tareas):
+            f.write(seccion)
+        f.write(pie_html())
 
     print(f"Las gráficas y la tabla han sido guardadas en {html_filename}")
 
@@ -156,9 +94,11 @@ def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, lengt
 def get_financial_info(tickers_info):
     financial_data = []
     total_tickers = len(tickers_info)
-    for i, ticker in enumerate(tickers_info):
-        stock = yf.Ticker(ticker)
-        info = stock.info
+    # Consultas en paralelo; los tickers consultados hace menos de un día se leen del disco
+    infos = info_varios(tickers_info, progreso=lambda hechos: print_progress_bar(
+        hechos, total_tickers, prefix='Progreso:', suffix='Completado', length=50))
+    for ticker in tickers_info:
+        info = infos[ticker]
         
         # Recopilando la información financiera abreviada
         financial_info = {
@@ -188,9 +128,6 @@ def get_financial_info(tickers_info):
             "Sec Persp": info.get("sectorPerspective", 0)  # Sector Perspective
         }
         financial_data.append(financial_info)
-        
-        # Actualizar la barra de progreso
-        print_progress_bar(i + 1, total_tickers, prefix='Progreso:', suffix='Completado', length=50)
     
     return pd.DataFrame(financial_data)
 
@@ -249,8 +186,6 @@ def analizar_acciones(df, output_filename="resultados.txt"):
                 file.write(resultado)
 
 
-# Obtener la información financiera
-financial_data = get_financial_info
 # Recolectar la información financiera de los tickers
 print(f"Consultando en Yahoo en {time.time() - start_time:.2f} segundos.")
 financial_data = get_financial_info(tickers_info)
@@ -266,24 +201,32 @@ html_filename = "grafico_precios_historicos.html"
 print(f"Obteniendo data en {time.time() - start_time:.2f} segundos.")
 
 # Obtener datos y gráficas para cada par de periodo/intervalo
-figs = []
-index_id = 0
+# Descarga todos los tickers por lotes y en paralelo; precargar devuelve los que fallaron
+pares = [("1d", "1m"), ("1mo", "15m")]
+fallidos = {intervalo: precargar(list(tickers_info), periodo, intervalo) for periodo, intervalo in pares}
+
+# Las gráficas se arman al guardar el reporte: cada proceso lee sus datos del caché
+# (y calcula sus sesiones), así que aquí solo se leen las barras de 1 minuto de las estadísticas
+tareas = []
 for ticker in tickers_info.keys():
 #    for periodo, intervalo in [("1d", "1m"), ("1mo", "15m"), ("3mo", "1h")]:
-    for periodo, intervalo in [("1d", "1m"), ("1mo", "15m")]: #version light
-        data, weekend_jumps = obtener_datos(ticker, periodo, intervalo)
-        if data is not None:
-            # Mostrar estadísticas solo si el intervalo es de 1 minuto
-            if intervalo == "1m":
-                mostrar_estadisticas(ticker, data)
-            
-            fig = crear_grafica(data, weekend_jumps, periodo, intervalo, ticker, f"ticker{index_id}")
-            figs.append(fig)
-            index_id += 1
+    for periodo, intervalo in pares: #version light
+        if ticker in fallidos[intervalo]:
+            print(f"No se han encontrado datos para {tickers_info[ticker]} ({ticker}).")
+            continue
+        # Mostrar estadísticas solo si el intervalo es de 1 minuto
+        if intervalo == "1m":
+            data = historial(ticker, period=periodo, interval=intervalo)
+            if data.empty:
+                print(f"No se han encontrado datos para {tickers_info[ticker]} ({ticker}).")
+                continue
+            mostrar_estadisticas(ticker, data)
+
+        tareas.append(Tarea(len(tareas), ticker, tickers_info[ticker], periodo, intervalo))
 
 
 # Guardar todas las gráficas y la tabla de información financiera juntas en un solo archivo HTML
-guardar_graficas_html(html_filename, *figs, df=df, tickers_info=tickers_info)
+guardar_graficas_html(html_filename, tareas, df=df, tickers_info=tickers_info)
 
 
 # Llamar a la función pasando el dataframe df
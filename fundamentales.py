@@ -0,0 +1,78 @@
+import pandas as pd
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from descargas import CuboTokens, con_reintentos, MAX_WORKERS, TASA
+from proveedores import proveedor_actual
+
+# Caché en disco de la información de cada ticker (ratios, nombre, sector, ...).
+# Estos datos cambian como mucho una vez al día, así que cada ticker se consulta
+# al proveedor solo si su copia guardada tiene más de TTL de antigüedad. Las
+# consultas que faltan se hacen en paralelo con el mismo limitador de tasa y los
+# mismos reintentos que las descargas de barras.
+
+DIRECTORIO_FUNDAMENTALES = os.path.join("cache_datos", "info")
+# Antigüedad máxima de la copia en disco; se puede cambiar con TTL_FUNDAMENTALES (p. ej. '12h')
+TTL = pd.Timedelta(os.environ.get("TTL_FUNDAMENTALES", "1D"))
+
+
+def _ruta(ticker_symbol, directorio):
+    return os.path.join(directorio, re.sub(r'[^\w.=^-]', '_', ticker_symbol) + ".json")
+
+def _leer(ruta):
+    """Devuelve (fecha de consulta, info) guardados, o (None, None)."""
+    if not os.path.exists(ruta):
+        return None, None
+    with open(ruta) as archivo:
+        guardado = json.load(archivo)
+    return pd.Timestamp(guardado['fecha']), guardado['info']
+
+def _escribir(ruta, fecha, info):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w") as archivo:
+        json.dump({'fecha': fecha.isoformat(), 'info': info}, archivo, default=str)
+    os.replace(temporal, ruta)
+
+def info(ticker_symbol, ttl=TTL, directorio=DIRECTORIO_FUNDAMENTALES, cubo=None):
+    """Información del ticker desde el disco si tiene menos de `ttl`; si no, la consulta y la guarda."""
+    proveedor = proveedor_actual()
+    if not proveedor.cacheable:
+        return con_reintentos(proveedor.info, ticker_symbol, cubo=cubo)
+    ruta = _ruta(ticker_symbol, directorio)
+    fecha, guardado = _leer(ruta)
+    ahora = proveedor.ahora()
+    if guardado is not None and ahora - fecha < ttl:
+        return guardado
+    try:
+        nuevo = con_reintentos(proveedor.info, ticker_symbol, cubo=cubo)
+    except Exception:
+        # Mejor datos de ayer que ninguno
+        if guardado is not None:
+            return guardado
+        raise
+    _escribir(ruta, ahora, nuevo)
+    return nuevo
+
+def info_varios(tickers, ttl=TTL, max_workers=MAX_WORKERS, tasa=TASA, directorio=DIRECTORIO_FUNDAMENTALES, progreso=None):
+    """{ticker: info} consultando en paralelo solo los tickers vencidos.
+
+    `progreso(hechos)` se llama a medida que termina cada ticker. Si un ticker no
+    se puede consultar su info queda vacía.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    cubo = CuboTokens(tasa)
+    infos = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {pool.submit(info, ticker, ttl, directorio, cubo): ticker for ticker in tickers}
+        for hechos, futuro in enumerate(as_completed(futuros), start=1):
+            ticker = futuros[futuro]
+            try:
+                infos[ticker] = futuro.result()
+            except Exception as error:
+                print(f"No se pudo obtener la información de {ticker}: {error}")
+                infos[ticker] = {}
+            if progreso is not None:
+                progreso(hechos)
+    return {ticker: infos[ticker] for ticker in tickers}
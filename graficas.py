@@ -0,0 +1,94 @@
+import numpy as np
+import plotly.graph_objects as go
+from calendario import fechas_hover, marcas_eje
+from decimacion import agregar_velas
+
+# Trazas de plotly que reemplazan bucles de add_trace / add_shape. Una traza o
+# una figura con miles de elementos sueltos (una traza por activo, una forma por
+# salto) hace lento tanto armar la figura en Python como serializarla y
+# dibujarla; aquí cada grupo de elementos es una sola traza con arreglos, que se
+# arma en O(n) y se serializa como arreglos tipados (ver reporte_html).
+#
+# grafica_velas arma la gráfica de precios de los reportes con ambas piezas; vive
+# aquí (y no en cada script) para que los procesos de reporte_paralelo la importen.
+
+MAX_ETIQUETAS = 60      # Con más puntos, los nombres solo se muestran en el hover
+
+
+def puntos_etiquetados(x, y, etiquetas, claves=None, name=None, **marker):
+    """Una sola traza de marcadores con el texto de cada punto.
+
+    `etiquetas` se escriben junto a cada punto (si son pocos) y en el hover;
+    `claves` (p. ej. los tickers) se agregan al hover. `marker` pasa a go.Scatter.
+    """
+    etiquetas = np.asarray(etiquetas, dtype=object)
+    hover = etiquetas if claves is None else np.char.add(
+        np.char.add(etiquetas.astype(str), " ("), np.char.add(np.asarray(claves, dtype=str), ")")
+    )
+    return go.Scatter(
+        x=np.asarray(x, dtype=np.float64),
+        y=np.asarray(y, dtype=np.float64),
+        mode='markers+text' if len(etiquetas) <= MAX_ETIQUETAS else 'markers',
+        text=etiquetas,
+        textposition="top center",
+        hovertext=hover,
+        hovertemplate='%{hovertext}<br>x: %{x}<br>y: %{y}<extra></extra>',
+        name=name,
+        marker=marker
+    )
+
+def lineas_verticales(posiciones, y0, y1, name=None, **line):
+    """Una sola traza con un segmento vertical de y0 a y1 en cada posición.
+
+    Los segmentos se separan con NaN (plotly corta la línea ahí), así que los
+    arreglos siguen siendo numéricos. `line` pasa a go.Scatter.
+    """
+    posiciones = np.asarray(posiciones, dtype=np.float64)
+    x = np.repeat(posiciones, 3)
+    x[2::3] = np.nan
+    y = np.tile(np.array([y0, y1, np.nan], dtype=np.float64), len(posiciones))
+    return go.Scatter(
+        x=x,
+        y=y,
+        mode='lines',
+        name=name,
+        line=line,
+        hoverinfo='skip',
+        showlegend=False
+    )
+
+def grafica_velas(data, sesiones, titulo, nombre, yaxis_title='Precio', ancho=1600, alto=900):
+    """Gráfica de velas de `data` en posiciones de barra, con las líneas de los cierres de mercado."""
+    fig = go.Figure()
+
+    # Velas agrupadas según el ancho (decimacion); el eje x es la posición de la barra,
+    # así no quedan huecos de tiempo
+    agregar_velas(
+        fig, data, fechas_hover(data.index), sesiones.saltos, ancho=ancho,
+        hovertemplate='%{customdata|%d-%b-%Y %H:%M:%S}<br>Apertura: %{open}<br>Máximo: %{high}<br>Mínimo: %{low}<br>Cierre: %{close}<extra></extra>',
+        name=nombre,
+        increasing_line_color='green',
+        decreasing_line_color='red'
+    )
+
+    # Líneas rojas para los cierres de mercado (fines de semana y feriados), en una sola traza
+    fig.add_trace(lineas_verticales(
+        sesiones.saltos - 0.5,
+        data['Low'].min(),
+        data['High'].max(),
+        name='Cierre de mercado',
+        color="red", width=2, dash="dot"
+    ))
+
+    fig.update_layout(
+        title=titulo,
+        xaxis_title='Fecha',
+        yaxis_title=yaxis_title,
+        height=alto,
+        width=ancho,
+        showlegend=True,
+        xaxis_rangeslider_visible=False,
+        xaxis=dict(tickmode='array', **marcas_eje(data.index, sesiones, nticks=20))
+    )
+
+    return fig
@@ -1,36 +1,35 @@
-import yfinance as yf
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import pandas as pd
+from cache_datos import historial
+from calendario import indice_sesiones
+from decimacion import script_piramide
+from estadisticas import EstadisticasSerie
+from graficas import grafica_velas
 
 def obtener_datos(ticker_symbol, period, interval):
-    ticker = yf.Ticker(ticker_symbol)
-    data = ticker.history(period=period, interval=interval)
+    data = historial(ticker_symbol, period=period, interval=interval)
     
     if data.empty:
         print(f"No se han encontrado datos para {ticker_symbol}.")
         return None, None
 
-    data = data[~data.index.to_series().diff().dt.days.gt(1)]
-    data['Date'] = data.index.strftime('%d-%b-%Y %H:%M:%S')
-    data['Delta'] = data.index.to_series().diff().dt.days.fillna(0)
-    weekend_jumps = data[data['Delta'] > 1].index
+    sesiones = indice_sesiones(ticker_symbol, interval, data.index)
     
     last_datetime = data.index[-1]
     
-    mean_price = data['Close'].mean()
-    std_dev_price = data['Close'].std()
-    min_price = data['Close'].min()
-    max_price = data['Close'].max()
+    # Un solo recorrido de los cierres para todas las estadísticas
+    estadisticas = EstadisticasSerie().actualizar(data['Close'].to_numpy())
+    mean_price = estadisticas.media
+    std_dev_price = estadisticas.desviacion
+    min_price = estadisticas.minimo
+    max_price = estadisticas.maximo
     price_range = max_price - min_price
-    median_price = data['Close'].median()
+    median_price = estadisticas.mediana
     coef_var = (std_dev_price / mean_price) * 100
     last_price = data['Close'].iloc[-1]
-    q1_price = data['Close'].quantile(0.25)
-    q3_price = data['Close'].quantile(0.75)
+    q1_price = estadisticas.cuantil(0.25)
+    q3_price = estadisticas.cuantil(0.75)
     iqr_price = q3_price - q1_price
-    skewness = data['Close'].skew()
-    kurtosis = data['Close'].kurtosis()
+    skewness = estadisticas.asimetria
+    kurtosis = estadisticas.curtosis
     
     print(f"- Último precio: {last_price:.2f} USD")
     print(f"- Última fecha y hora del dato: {last_datetime}")
@@ -47,55 +46,18 @@ def obtener_datos(ticker_symbol, period, interval):
     print(f"- Asimetría: {skewness:.2f}")
     print(f"- Curtosis: {kurtosis:.2f}")
     
-    return data, weekend_jumps, last_price, mean_price, std_dev_price, coef_var, q1_price, q3_price, skewness, kurtosis
+    return data, sesiones, last_price, mean_price, std_dev_price, coef_var, q1_price, q3_price, skewness, kurtosis
 
-def crear_grafica(data, weekend_jumps, ticker_symbol):
-    fig = go.Figure()
-
-    fig.add_trace(go.Candlestick(
-        x=data['Date'],
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
-        name=f'{ticker_symbol} - Precio Histórico', 
-        increasing_line_color='green',
-        decreasing_line_color='red'
-    ))
-
-    for jump in weekend_jumps:
-        fig.add_shape(
-            type="line",
-            x0=jump.strftime('%d-%b-%Y %H:%M:%S'),
-            x1=jump.strftime('%d-%b-%Y %H:%M:%S'),
-            y0=data['Low'].min(),
-            y1=data['High'].max(),
-            line=dict(color="red", width=2, dash="dot"),
-            xref='x',
-            yref='y'
-        )
-
-    fig.update_xaxes(type='category')
-
-    fig.update_layout(
-        title=f"Precio del Activo ({ticker_symbol})",
-        xaxis_title='Fecha',
-        yaxis_title='Precio (USD)',
-        height=900,
-        width=1600,
-        showlegend=True,
-        xaxis_rangeslider_visible=False,
-        xaxis=dict(tickformat='%d-%b-%Y %H:%M:%S', tickmode='auto', nticks=20)
-    )
-
-    return fig
+def crear_grafica(data, sesiones, ticker_symbol):
+    return grafica_velas(data, sesiones, f"Precio del Activo ({ticker_symbol})", f'{ticker_symbol} - Precio Histórico',
+                         yaxis_title='Precio (USD)')
 
 def analizar_activo(ticker_symbol, html_filename="analisis_activos.html"):
-    data, weekend_jumps, last_price, mean_price, std_dev_price, coef_var, q1_price, q3_price, skewness, kurtosis = obtener_datos(ticker_symbol, "5d", "1m")
+    data, sesiones, last_price, mean_price, std_dev_price, coef_var, q1_price, q3_price, skewness, kurtosis = obtener_datos(ticker_symbol, "5d", "1m")
     
     if data is not None:
-        fig = crear_grafica(data, weekend_jumps, ticker_symbol)
-        fig.write_html(html_filename)
+        fig = crear_grafica(data, sesiones, ticker_symbol)
+        fig.write_html(html_filename, post_script=script_piramide())
         print(f"Gráfica exportada exitosamente a {html_filename}")
 
         # Conclusiones para tomar decisiones
@@ -1,8 +1,11 @@
-import yfinance as yf
 import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
 import warnings
+from cache_datos import historial, historial_varios
+from covarianza import covarianza_pares, reparar_psd
+from graficas import puntos_etiquetados
+from reporte_html import encabezado_html, div_figura, pie_html
 warnings.filterwarnings("ignore")
 
 """
@@ -251,25 +254,27 @@ tickers_info = {
 # Function to obtain historical data
 def obtener_datos(tickers_info, start_date, end_date):
     tickers = list(tickers_info.keys())  # Get tickers from dictionary keys
-    precios = yf.download(tickers, start=start_date, end=end_date)['Adj Close']
-    retornos = precios.pct_change().dropna()
-    
-    # Check for null values
-    if retornos.isnull().any().any():
-        print("Warning: There are null values in returns.")
-        retornos = retornos.dropna()
+    precios = historial_varios(tickers, start=start_date, end=end_date)  # Adj Close desde el caché local
+    # Each ticker keeps its own history: missing prices (recent listings, inactive symbols) stay NaN
+    # instead of truncating every other ticker to the common dates
+    retornos = precios.pct_change(fill_method=None).dropna(how='all')
     
     return precios, retornos
 
 # Calculate performance metrics and covariance matrix
 def calcular_metricas(retornos):
-    media_retornos = retornos.mean() * 252  # Annual returns
-    cov_matrix = retornos.cov() * 252  # Annualized covariance matrix
+    media_retornos = retornos.mean() * 252  # Annual returns (each ticker over its own history)
+    cov_matrix = covarianza_pares(retornos) * 252  # Annualized covariance over pairwise-common dates
+    
+    # Drop tickers without enough observations of their own
+    sin_datos = cov_matrix.index[np.isnan(np.diagonal(cov_matrix))]
+    if len(sin_datos):
+        print(f"Warning: not enough returns for {', '.join(sin_datos)}; they are excluded.")
+        cov_matrix = cov_matrix.drop(index=sin_datos, columns=sin_datos)
+        media_retornos = media_retornos.drop(sin_datos)
     
-    # Check if the covariance matrix has null values
-    if cov_matrix.isnull().any().any():
-        print("Warning: There are null values in the covariance matrix.")
-        cov_matrix = cov_matrix.dropna(axis=0, how='all').dropna(axis=1, how='all')
+    # A pairwise covariance may not be positive semidefinite: repair it before inverting
+    cov_matrix = reparar_psd(cov_matrix)
     
     return media_retornos, cov_matrix
 
@@ -328,18 +333,17 @@ def frontera_eficiente(media_retornos, cov_matrix, num_puntos=100):
 def graficar_frontera_eficiente(media_retornos, cov_matrix, riesgos, retornos, tickers_info, industria):
     fig = go.Figure()
 
-    # Points for stocks with full names
-    for ticker, (nombre_completo, _) in tickers_info.items():
-        i = list(tickers_info.keys()).index(ticker)  # Get ticker index
-        fig.add_trace(go.Scatter(
-            x=[np.sqrt(cov_matrix.iloc[i, i])],  # Standard deviation
-            y=[media_retornos.iloc[i]],  # Expected return using iloc[]
-            mode='markers+text',
-            text=nombre_completo,  # Display full name instead of ticker
-            name=ticker,
-            textposition="top center",
-            marker=dict(size=10, color="red", line=dict(width=1))
-        ))
+    # Points for stocks with full names: a single trace for the whole universe
+    tickers = list(tickers_info.keys())
+    nombres = [nombre_completo for nombre_completo, _ in tickers_info.values()]
+    fig.add_trace(puntos_etiquetados(
+        np.sqrt(np.diagonal(cov_matrix.loc[tickers, tickers].to_numpy())),  # Standard deviation
+        media_retornos[tickers].to_numpy(),  # Expected return
+        nombres,  # Display full name instead of ticker
+        claves=tickers,
+        name='Stocks',
+        size=10, color="red", line=dict(width=1)
+    ))
 
     # Efficient frontier
     fig.add_trace(go.Scatter(
@@ -364,7 +368,7 @@ def graficar_frontera_eficiente(media_retornos, cov_matrix, riesgos, retornos, t
 # Check if a ticker is active
 def is_ticker_active(ticker, start_date, end_date):
     try:
-        data = yf.download(ticker, start=start_date, end=end_date)
+        data = historial(ticker, start=start_date, end=end_date)
         if data.empty:
             print(f"Warning: {ticker} has no data within the given date range.")
             return False
@@ -392,8 +396,8 @@ for ticker, (nombre_completo, industria) in tickers_info.items():
 
 # Recorrer cada industria para calcular la frontera eficiente y el mix de activos
 for industria, tickers in industries.items():
-    # Filtrar tickers disponibles en precios para esta industria
-    tickers_disponibles = [ticker for ticker in tickers if ticker in precios.columns]
+    # Filtrar tickers con covarianza estimada para esta industria
+    tickers_disponibles = [ticker for ticker in tickers if ticker in cov_matrix.index]
 
     if tickers_disponibles:
         # Calcular frontera eficiente para la industria
@@ -433,11 +437,11 @@ for industria, tickers in industries.items():
 # Generate plots and save to HTML file
 html_filename = 'efficient_frontier_industries.html'
 with open(html_filename, 'w', encoding='utf-8') as f:  # UTF-8 encoding
-    f.write('<html><body>')
+    f.write(encabezado_html("Efficient Frontier by Industry"))  # Plotly.js inlined once, works offline
     
-    for industria, tickers in industries.items():
-        # Filter available tickers in the prices (those that have no NaN)
-        tickers_disponibles = [ticker for ticker in tickers if ticker in precios.columns]
+    for i, (industria, tickers) in enumerate(industries.items()):
+        # Filter tickers that have an estimated covariance
+        tickers_disponibles = [ticker for ticker in tickers if ticker in cov_matrix.index]
 
         # Calculate efficient frontier
         riesgos, retornos, _ = frontera_eficiente(media_retornos[tickers_disponibles], cov_matrix.loc[tickers_disponibles, tickers_disponibles])
@@ -447,8 +451,8 @@ with open(html_filename, 'w', encoding='utf-8') as f:  # UTF-8 encoding
         
         # Write each figure as HTML inside the file, one below the other
         f.write(f'<h2>{industria} Industry</h2>')
-        f.write(fig.to_html(full_html=False, include_plotlyjs='cdn'))  # Include Plotly.js from CDN
+        f.write(div_figura(fig, f"frontera{i}"))
 
-    f.write('</body></html>')
+    f.write(pie_html())
 
 print(f"All charts have been saved to {html_filename}")
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import warnings
+from simulacion import MODELOS, simular_modelo, _generador
+from proveedores import proveedor_actual
+from calibracion import calibrar, parametros_simulacion, RUTA_CACHE, DIAS_POR_ANIO
+
+warnings.filterwarnings("ignore")
+
+# Pronóstico por lotes para todo un universo de tickers: una sola descarga masiva,
+# calibración vectorizada sobre la matriz ancha de retornos (calibracion.py) y una
+# simulación (tickers, trayectorias, pasos) por modelo. El resultado es una tabla
+# ordenada con un renglón por ticker y modelo en lugar de un HTML por símbolo.
+
+# Horizonte común (el mismo que usa pronosticar_precio en forex.py): una sesión,
+# en años de DIAS_POR_ANIO sesiones como los parámetros de calibracion
+T = 1 / DIAS_POR_ANIO
+
+
+def descargar_cierres(tickers, period="5d", interval="15m"):
+    """Descarga en una sola petición los precios de cierre de todos los tickers (matriz ancha)."""
+    datos = proveedor_actual().descargar(tickers, period, interval)
+    if datos.empty:
+        return pd.DataFrame(columns=list(tickers))
+    cierres = datos['Close']
+    if isinstance(cierres, pd.Series):
+        cierres = cierres.to_frame(tickers[0])
+    return cierres.reindex(columns=list(tickers))
+
+def estimar_parametros(cierres, interval="15m", ruta_cache=RUTA_CACHE):
+    """Calibra S0, mu, sigma, v0, kappa, theta, xi y rho de todas las columnas a la vez."""
+    parametros = calibrar(cierres, interval, ruta_cache)
+    # Se descartan los tickers sin datos suficientes para estimar la volatilidad
+    validos = parametros['S0'].notna() & parametros['sigma'].notna() & (parametros['sigma'] > 0)
+    for ticker in parametros.index[~validos]:
+        print(f"No se han encontrado datos suficientes para {ticker}.")
+    return parametros[validos]
+
+def simular_universo(parametros, n_paths=1000, num_steps=100, rng=None, modelos=None, dtype=np.float64, esquema='euler'):
+    """Simula todos los tickers a la vez y devuelve {modelo: arreglo (tickers, n_paths, num_steps + 1)}.
+
+    Los parámetros de cada ticker se repiten n_paths veces para que cada trayectoria
+    lleve los suyos, así el motor avanza todos los activos en el mismo bucle.
+    """
+    rng = _generador(rng)
+    modelos = list(MODELOS) if modelos is None else modelos
+    n_tickers = len(parametros)
+    argumentos = {nombre: (valor if nombre == 'T' else np.repeat(valor, n_paths))
+                  for nombre, valor in parametros_simulacion(parametros, T).items()}
+    return {
+        modelo: simular_modelo(modelo, argumentos, num_steps, n_tickers * n_paths, rng, dtype, esquema)
+        .reshape(n_tickers, n_paths, num_steps + 1)
+        for modelo in modelos
+    }
+
+def tabla_pronosticos(parametros, tensores, percentiles=(5, 50, 95)):
+    """Resume los tensores simulados en una tabla ordenada (un renglón por ticker y modelo)."""
+    tablas = []
+    for modelo, tensor in tensores.items():
+        terminal = tensor[:, :, -1].astype(np.float64)
+        n_paths = terminal.shape[1]
+        tabla = pd.DataFrame({
+            'Ticker': parametros.index,
+            'Modelo': modelo,
+            'Último precio': parametros['S0'].to_numpy(),
+            'mu': parametros['mu'].to_numpy(),
+            'sigma': parametros['sigma'].to_numpy(),
+            'Precio esperado': terminal.mean(axis=1),
+            'Error estándar': terminal.std(axis=1, ddof=1) / np.sqrt(n_paths),
+        })
+        for p, valores in zip(percentiles, np.percentile(terminal, percentiles, axis=1)):
+            tabla[f'P{p}'] = valores
+        tabla['Prob. alza'] = (terminal > parametros['S0'].to_numpy()[:, np.newaxis]).mean(axis=1)
+        tablas.append(tabla)
+    return pd.concat(tablas, ignore_index=True).sort_values(['Ticker', 'Modelo'], ignore_index=True)
+
+def pronosticar_universo(tickers, n_paths=1000, num_steps=100, semilla=None, modelos=None,
+                         period="5d", interval="15m", dtype=np.float64, esquema='euler'):
+    """Descarga, estima y simula todos los tickers y devuelve la tabla de pronósticos."""
+    cierres = descargar_cierres(tickers, period, interval)
+    parametros = estimar_parametros(cierres, interval)
+    if parametros.empty:
+        return pd.DataFrame()
+    tensores = simular_universo(parametros, n_paths, num_steps, np.random.default_rng(semilla), modelos, dtype, esquema)
+    return tabla_pronosticos(parametros, tensores)
+
+
+if __name__ == "__main__":
+    tickers = ["MXN=X", "EURUSD=X", "GBPUSD=X", "USDJPY=X", "USDCAD=X", "AUDUSD=X", "GC=F", "SI=F", "CL=F"]
+    tabla = pronosticar_universo(tickers, n_paths=2000, semilla=0)
+    tabla.to_csv("pronosticos.csv", index=False)
+    print(tabla.to_string(index=False))
+    print("Los pronósticos han sido guardados en pronosticos.csv")
@@ -0,0 +1,206 @@
+import yfinance as yf
+import pandas as pd
+import hashlib
+import json
+import os
+import threading
+
+# Capa de proveedores de datos de mercado. Los scripts piden barras, información
+# de tickers y descargas masivas a través de proveedor_actual() en lugar de llamar
+# a yfinance directamente, así se pueden cambiar por una grabación en disco:
+#   - ProveedorYFinance: consulta yfinance (requiere red);
+#   - GrabadorProveedor: envuelve otro proveedor y guarda cada respuesta en disco;
+#   - ProveedorReproduccion: sirve lo grabado sin red y siempre igual, con el reloj
+#     detenido en el momento de la grabación.
+# El proveedor se elige con establecer_proveedor() o con la variable de entorno
+# PROVEEDOR_DATOS: 'yfinance', 'grabar:<directorio>' o 'reproducir:<directorio>'.
+
+
+class ProveedorDatos:
+    """Interfaz común de los proveedores de datos."""
+
+    nombre = 'base'
+    # Si es False, el caché de cache_datos no guarda lo que devuelve este proveedor
+    cacheable = True
+
+    def ahora(self):
+        """Hora actual (UTC) desde el punto de vista del proveedor."""
+        return pd.Timestamp.now(tz='UTC')
+
+    def historial(self, ticker_symbol, interval, start, end, timeout=None):
+        """Barras sin ajustar de [start, end) con 'Adj Close', 'Dividends' y 'Stock Splits'."""
+        raise NotImplementedError
+
+    def historial_varios(self, tickers, interval, start, end, timeout=None):
+        """{ticker: barras} de varios tickers; los proveedores con descarga masiva lo hacen en una petición.
+
+        Un ticker que falla puede faltar en el resultado o venir vacío.
+        """
+        return {ticker: self.historial(ticker, interval, start, end, timeout) for ticker in tickers}
+
+    def info(self, ticker_symbol):
+        """Diccionario con la información del ticker (nombre, fundamentales, ...)."""
+        raise NotImplementedError
+
+    def descargar(self, tickers, period, interval):
+        """Descarga masiva: DataFrame con columnas (campo, ticker), como yf.download."""
+        raise NotImplementedError
+
+
+class ProveedorYFinance(ProveedorDatos):
+    nombre = 'yfinance'
+
+    def historial(self, ticker_symbol, interval, start, end, timeout=None):
+        return yf.Ticker(ticker_symbol).history(start=start, end=end, interval=interval, auto_adjust=False, actions=True,
+                                                timeout=timeout or 10)
+
+    def historial_varios(self, tickers, interval, start, end, timeout=None):
+        datos = yf.download(list(tickers), start=start, end=end, interval=interval, auto_adjust=False, actions=True,
+                            group_by="ticker", ignore_tz=False, progress=False, threads=False, timeout=timeout or 10)
+        if datos.empty:
+            return {}
+        # Cada ticker conserva solo sus barras (la descarga alinea todos en un mismo índice). Los
+        # tickers que fallaron vienen vacíos o en NaN en lugar de lanzar error: se omiten del resultado
+        recibidos = {}
+        for ticker in tickers:
+            if ticker in datos.columns.get_level_values(0):
+                data = datos[ticker].dropna(how='all')
+                if not data.empty:
+                    recibidos[ticker] = data
+        return recibidos
+
+    def info(self, ticker_symbol):
+        return yf.Ticker(ticker_symbol).info
+
+    def descargar(self, tickers, period, interval):
+        return yf.download(list(tickers), period=period, interval=interval, group_by="column", progress=False, threads=True)
+
+
+def _nombre_archivo(*partes):
+    texto = "_".join(str(p) for p in partes)
+    legible = "".join(c if c.isalnum() or c in "=^.-" else "_" for c in texto)[:80]
+    return f"{legible}_{hashlib.sha1(texto.encode()).hexdigest()[:10]}"
+
+
+class GrabadorProveedor(ProveedorDatos):
+    """Pasa las llamadas a `proveedor` y graba cada respuesta en `directorio`.
+
+    Las barras de un mismo ticker e intervalo se acumulan en un solo archivo, así
+    la reproducción puede servir cualquier rango que caiga dentro de lo grabado.
+    """
+
+    nombre = 'grabar'
+    # Todas las llamadas deben llegar al proveedor para quedar grabadas
+    cacheable = False
+
+    def __init__(self, directorio, proveedor=None):
+        self.directorio = directorio
+        self.proveedor = ProveedorYFinance() if proveedor is None else proveedor
+        self._candado = threading.Lock()  # Las barras se combinan con lo ya grabado
+        for sub in ('historial', 'info', 'descargas'):
+            os.makedirs(os.path.join(directorio, sub), exist_ok=True)
+        self.ahora()
+
+    def ahora(self):
+        ahora = self.proveedor.ahora()
+        # El reloj de la reproducción se detiene en la última llamada grabada
+        with open(os.path.join(self.directorio, "grabacion.json"), "w") as archivo:
+            json.dump({'ahora': ahora.isoformat(), 'proveedor': self.proveedor.nombre}, archivo)
+        return ahora
+
+    def historial(self, ticker_symbol, interval, start, end, timeout=None):
+        data = self.proveedor.historial(ticker_symbol, interval, start, end, timeout)
+        self._grabar_historial(ticker_symbol, interval, data)
+        return data
+
+    def historial_varios(self, tickers, interval, start, end, timeout=None):
+        datos = self.proveedor.historial_varios(tickers, interval, start, end, timeout)
+        for ticker, data in datos.items():
+            self._grabar_historial(ticker, interval, data)
+        return datos
+
+    def _grabar_historial(self, ticker_symbol, interval, data):
+        ruta = os.path.join(self.directorio, 'historial', _nombre_archivo(ticker_symbol, interval) + ".pkl")
+        with self._candado:
+            grabado = pd.read_pickle(ruta) if os.path.exists(ruta) else None
+            if grabado is not None and not grabado.empty:
+                data_total = pd.concat([grabado, data]) if not data.empty else grabado
+                data_total = data_total[~data_total.index.duplicated(keep='last')].sort_index()
+            else:
+                data_total = data
+            data_total.to_pickle(ruta)
+
+    def info(self, ticker_symbol):
+        info = self.proveedor.info(ticker_symbol)
+        with open(os.path.join(self.directorio, 'info', _nombre_archivo(ticker_symbol) + ".json"), "w") as archivo:
+            json.dump(info, archivo, default=str)
+        return info
+
+    def descargar(self, tickers, period, interval):
+        data = self.proveedor.descargar(tickers, period, interval)
+        data.to_pickle(os.path.join(self.directorio, 'descargas', _nombre_archivo(*sorted(tickers), period, interval) + ".pkl"))
+        return data
+
+
+class ProveedorReproduccion(ProveedorDatos):
+    """Sirve las respuestas grabadas por GrabadorProveedor, sin red y de forma determinista."""
+
+    nombre = 'reproducir'
+    cacheable = False
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, "grabacion.json")) as archivo:
+            self._ahora = pd.Timestamp(json.load(archivo)['ahora'])
+        self._historiales = {}
+
+    def _leer(self, sub, nombre, lector):
+        ruta = os.path.join(self.directorio, sub, nombre)
+        if not os.path.exists(ruta):
+            raise LookupError(f"No hay datos grabados para {nombre} en {self.directorio}.")
+        return lector(ruta)
+
+    def ahora(self):
+        return self._ahora
+
+    def historial(self, ticker_symbol, interval, start, end, timeout=None):
+        clave = (ticker_symbol, interval)
+        if clave not in self._historiales:
+            self._historiales[clave] = self._leer('historial', _nombre_archivo(*clave) + ".pkl", pd.read_pickle)
+        data = self._historiales[clave]
+        return data[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+
+    def info(self, ticker_symbol):
+        def leer_json(ruta):
+            with open(ruta) as archivo:
+                return json.load(archivo)
+        return self._leer('info', _nombre_archivo(ticker_symbol) + ".json", leer_json)
+
+    def descargar(self, tickers, period, interval):
+        return self._leer('descargas', _nombre_archivo(*sorted(tickers), period, interval) + ".pkl", pd.read_pickle)
+
+
+def proveedor_desde_entorno():
+    """Crea el proveedor indicado en PROVEEDOR_DATOS (por defecto yfinance)."""
+    valor = os.environ.get("PROVEEDOR_DATOS", "yfinance")
+    tipo, _, directorio = valor.partition(":")
+    if tipo == 'yfinance':
+        return ProveedorYFinance()
+    if tipo == 'grabar':
+        return GrabadorProveedor(directorio or "grabacion_datos")
+    if tipo == 'reproducir':
+        return ProveedorReproduccion(directorio or "grabacion_datos")
+    raise ValueError(f"Proveedor desconocido: {valor}")
+
+PROVEEDOR = None
+
+def establecer_proveedor(proveedor):
+    """Elige el proveedor que usan todos los scripts."""
+    global PROVEEDOR
+    PROVEEDOR = proveedor
+
+def proveedor_actual():
+    global PROVEEDOR
+    if PROVEEDOR is None:
+        PROVEEDOR = proveedor_desde_entorno()
+    return PROVEEDOR
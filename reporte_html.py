@@ -0,0 +1,193 @@
+import numpy as np
+import base64
+import html
+import json
+import os
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+from decimacion import PIRAMIDE_JS
+
+# Escritura de reportes HTML autocontenidos con muchas gráficas. En lugar de un
+# documento completo por figura (fig.to_html) con plotly.js desde el CDN:
+#   - plotly.js se incrusta una sola vez en el encabezado, así el reporte abre sin red;
+#   - cada figura es un <div> más un Plotly.newPlot con su JSON; la plantilla de
+#     estilo por defecto (varios KB) también se escribe una sola vez;
+#   - las figuras con pirámide de velas (decimacion.agregar_velas) cambian de
+#     nivel con el zoom;
+#   - las series numéricas van como arreglos tipados en base64 (float32 para
+#     precios, int64 para marcas de tiempo) en vez de números decimales en texto,
+#     y un decodificador en JS las convierte antes de graficar.
+#
+# Uso: escribir encabezado_html(), luego div_figura() por cada figura (con el HTML
+# que se quiera entre ellas) y al final pie_html().
+#
+# Para reportes con cientos de gráficas hay un modo fragmentado: la página solo
+# lleva lugares vacíos (div_diferido) y cada figura va en su propio archivo .js,
+# que se carga cuando su lugar está por entrar en pantalla o al hacer clic en él.
+# plotly.js va en un archivo aparte (escribir_plotlyjs) y la página abre al instante.
+
+# Los arreglos más cortos se dejan como JSON: codificarlos no ahorra nada
+MIN_ELEMENTOS = 16
+
+DECODIFICADOR_JS = """
+function decodificarArreglos(obj) {
+  if (Array.isArray(obj)) {
+    for (var i = 0; i < obj.length; i++) obj[i] = decodificarArreglos(obj[i]);
+    return obj;
+  }
+  if (obj === null || typeof obj !== 'object') return obj;
+  if (obj.__b64 !== undefined) {
+    var binario = atob(obj.__b64), bytes = new Uint8Array(binario.length);
+    for (var j = 0; j < binario.length; j++) bytes[j] = binario.charCodeAt(j);
+    switch (obj.tipo) {
+      case 'f4': return new Float32Array(bytes.buffer);
+      case 'f8': return new Float64Array(bytes.buffer);
+      case 'i4': return new Int32Array(bytes.buffer);
+      case 'i8':
+        // plotly no usa BigInt: los int64 (milisegundos) caben exactos en un double
+        var enteros = new BigInt64Array(bytes.buffer), numeros = new Float64Array(enteros.length);
+        for (var k = 0; k < enteros.length; k++) numeros[k] = Number(enteros[k]);
+        return numeros;
+    }
+  }
+  for (var clave in obj) obj[clave] = decodificarArreglos(obj[clave]);
+  return obj;
+}
+"""
+
+CARGADOR_JS = """
+function registrarFigura(id, figura, plantilla, piramide) {
+  figura = decodificarArreglos(figura);
+  if (plantilla) figura.layout.template = PLANTILLA_PLOTLY;
+  var div = document.getElementById(id);
+  div.innerHTML = '';
+  Plotly.newPlot(div, figura.data, figura.layout, {responsive: true}).then(function() {
+    if (piramide) activarPiramide(id);
+  });
+}
+function cargarFigura(div) {
+  // Los fragmentos son scripts (no fetch) para que funcionen abriendo el archivo local
+  if (div.getAttribute('data-cargada')) return;
+  div.setAttribute('data-cargada', '1');
+  var script = document.createElement('script');
+  script.src = div.getAttribute('data-fragmento');
+  document.head.appendChild(script);
+}
+document.addEventListener('DOMContentLoaded', function() {
+  var pendientes = document.querySelectorAll('div[data-fragmento]');
+  if (!('IntersectionObserver' in window)) {
+    pendientes.forEach(cargarFigura);
+    return;
+  }
+  var observador = new IntersectionObserver(function(entradas) {
+    entradas.forEach(function(entrada) {
+      if (entrada.isIntersecting) {
+        observador.unobserve(entrada.target);
+        cargarFigura(entrada.target);
+      }
+    });
+  }, {rootMargin: '300px'});
+  pendientes.forEach(function(div) { observador.observe(div); });
+});
+"""
+
+
+def _codificar(valor):
+    """Reemplaza los arreglos numéricos largos por {'__b64', 'tipo'}; lo demás queda igual."""
+    if isinstance(valor, dict):
+        if 'bdata' in valor and 'dtype' in valor and 'shape' not in valor:
+            # plotly >= 6 ya entrega algunos arreglos en base64, pero en float64
+            return _codificar(np.frombuffer(base64.b64decode(valor['bdata']), dtype=valor['dtype']))
+        return {clave: _codificar(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        if len(valor) < MIN_ELEMENTOS:
+            return [_codificar(v) for v in valor]
+        valor = np.asarray(valor)
+    if not isinstance(valor, np.ndarray) or valor.ndim != 1 or len(valor) < MIN_ELEMENTOS:
+        return valor
+    if np.issubdtype(valor.dtype, np.datetime64):
+        valor = valor.astype('datetime64[ms]').astype(np.int64)
+    if np.issubdtype(valor.dtype, np.integer):
+        cabe = valor.min() >= np.iinfo(np.int32).min and valor.max() <= np.iinfo(np.int32).max
+        tipo = 'i4' if cabe else 'i8'
+    elif np.issubdtype(valor.dtype, np.floating):
+        tipo = 'f4'
+    else:
+        return valor
+    datos = np.ascontiguousarray(valor, dtype='<' + tipo).tobytes()
+    return {'__b64': base64.b64encode(datos).decode('ascii'), 'tipo': tipo}
+
+def _plantilla_defecto():
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+def encabezado_html(titulo, ruta_plotlyjs=None):
+    """Inicio del documento: plotly.js, los scripts de apoyo y la plantilla por defecto, una sola vez.
+
+    Con `ruta_plotlyjs` plotly.js se carga de ese archivo (ver escribir_plotlyjs)
+    en lugar de incrustarse, para que la página misma sea pequeña.
+    """
+    plantilla = json.dumps(_plantilla_defecto(), cls=PlotlyJSONEncoder).replace("</", "<\\/")
+    if ruta_plotlyjs is None:
+        plotlyjs = f"<script type=\"text/javascript\">{get_plotlyjs()}</script>\n"
+    else:
+        # defer: la página se muestra sin esperar a plotly.js, que se ejecuta antes de DOMContentLoaded
+        plotlyjs = f"<script type=\"text/javascript\" src=\"{html.escape(ruta_plotlyjs)}\" defer></script>\n"
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(titulo)}</title>\n"
+        f"{plotlyjs}"
+        f"<script type=\"text/javascript\">{DECODIFICADOR_JS}{PIRAMIDE_JS}{CARGADOR_JS}\nvar PLANTILLA_PLOTLY = {plantilla};</script>\n"
+        "</head>\n<body>\n"
+    )
+
+def escribir_plotlyjs(directorio):
+    """Escribe plotly.min.js en `directorio` (si cambió) y devuelve su ruta."""
+    ruta = os.path.join(directorio, "plotly.min.js")
+    codigo = get_plotlyjs()
+    if not os.path.exists(ruta) or os.path.getsize(ruta) != len(codigo.encode('utf-8')):
+        os.makedirs(directorio, exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(codigo)
+    return ruta
+
+def _registro_figura(fig, div_id):
+    """Llamada registrarFigura(...) que dibuja `fig` con sus series codificadas en base64."""
+    figura = fig.to_plotly_json()
+    layout = dict(figura.get('layout', {}))
+    # La plantilla por defecto ya está en el encabezado
+    usa_defecto = layout.get('template') == _plantilla_defecto()
+    if usa_defecto:
+        del layout['template']
+    if 'meta' in layout:
+        layout['meta'] = _codificar(layout['meta'])
+    piramide = isinstance(layout.get('meta'), dict) and 'piramide' in layout['meta']
+    datos = {'data': _codificar(figura.get('data', [])), 'layout': layout}
+    texto = json.dumps(datos, cls=PlotlyJSONEncoder).replace("</", "<\\/")
+    return f"registrarFigura(\"{div_id}\", {texto}, {json.dumps(usa_defecto)}, {json.dumps(piramide)});\n"
+
+def _estilo(fig):
+    ancho, alto = fig.layout.width, fig.layout.height
+    return f"width:{ancho}px;height:{alto}px;" if ancho and alto else "width:100%;height:600px;"
+
+def div_figura(fig, div_id):
+    """<div> y script que dibujan `fig` en la misma página."""
+    return (
+        f"<div id=\"{div_id}\" style=\"{_estilo(fig)}\"></div>\n"
+        f"<script type=\"text/javascript\">{_registro_figura(fig, div_id)}</script>\n"
+    )
+
+def div_diferido(fig, div_id, ruta_fragmento, directorio_pagina="."):
+    """Escribe la figura en el archivo `ruta_fragmento` y devuelve el <div> que lo carga al verse."""
+    os.makedirs(os.path.dirname(ruta_fragmento) or ".", exist_ok=True)
+    with open(ruta_fragmento, 'w', encoding='utf-8') as archivo:
+        archivo.write(_registro_figura(fig, div_id))
+    # La página pide el fragmento con una ruta relativa a ella
+    ruta = html.escape(os.path.relpath(ruta_fragmento, directorio_pagina).replace(os.sep, "/"))
+    return (
+        f"<div id=\"{div_id}\" data-fragmento=\"{ruta}\" style=\"{_estilo(fig)}\" "
+        "onclick=\"cargarFigura(this)\"><p>Cargando gráfica...</p></div>\n"
+    )
+
+def pie_html():
+    return "</body>\n</html>\n"
@@ -0,0 +1,85 @@
+import glob
+import multiprocessing
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from cache_datos import historial
+from calendario import indice_sesiones
+from graficas import grafica_velas
+from reporte_html import div_diferido, div_figura, escribir_plotlyjs
+
+# Generación del reporte de gráficas en paralelo y por partes. En lugar de armar
+# todas las figuras en una lista y serializarlas al final (la memoria crece con el
+# número de tickers y todo corre en un núcleo), cada proceso arma y serializa la
+# sección HTML de una gráfica y el proceso principal las escribe en el archivo en
+# orden conforme terminan. Las figuras nunca salen del proceso que las arma; al
+# principal solo llega el texto de cada sección, y a lo más
+# procesos * (1 + ADELANTO) secciones esperan a ser escritas.
+#
+# Los procesos leen los datos del caché (conviene llamar antes a precargar). Se
+# crean con fork para no volver a ejecutar el script que los lanza; donde no hay
+# fork (Windows) las secciones se arman en el mismo proceso.
+#
+# Con más de MAX_GRAFICAS_EN_LINEA gráficas el reporte se fragmenta (ver
+# reporte_html): la página queda con el índice, la tabla y lugares vacíos, y cada
+# proceso escribe la figura de su sección en <reporte>_graficas/figuraN.js.
+
+PROCESOS = os.cpu_count() or 1
+ADELANTO = 2                # Secciones extra encargadas por adelantado por cada proceso
+MAX_GRAFICAS_EN_LINEA = 20  # Con más gráficas, cada una va en un fragmento que se carga al verse
+
+Tarea = namedtuple('Tarea', ['indice', 'ticker', 'nombre', 'periodo', 'intervalo'])
+
+
+def titulo_tarea(tarea):
+    return f"{tarea.nombre} ({tarea.ticker}), Periodo: {tarea.periodo}, Intervalo: {tarea.intervalo}"
+
+def modo_fragmentado(html_filename, tareas, maximo=MAX_GRAFICAS_EN_LINEA):
+    """(directorio de fragmentos, ruta de plotly.js relativa a la página), o (None, None) si caben en la página."""
+    if len(tareas) <= maximo:
+        return None, None
+    directorio = os.path.splitext(html_filename)[0] + "_graficas"
+    # Los fragmentos de un reporte anterior con más gráficas ya no se usan
+    for viejo in glob.glob(os.path.join(directorio, "figura*.js")):
+        os.remove(viejo)
+    ruta = escribir_plotlyjs(directorio)
+    return directorio, os.path.relpath(ruta, os.path.dirname(html_filename) or ".").replace(os.sep, "/")
+
+def seccion_grafica(tarea, directorio=None):
+    """HTML de la sección de una gráfica: ancla, título, figura y enlace al inicio.
+
+    Con `directorio` (junto a la página) la figura se escribe ahí como fragmento
+    y la sección solo lleva el lugar donde se dibuja al verse.
+    """
+    titulo = titulo_tarea(tarea)
+    partes = [f'<a id="ticker{tarea.indice}"></a>\n', f'<h2>{titulo}</h2>\n']  # Asignar un ID a cada gráfico
+    data = historial(tarea.ticker, period=tarea.periodo, interval=tarea.intervalo)
+    if data.empty:
+        partes.append(f"<p>No se han encontrado datos para {tarea.nombre} ({tarea.ticker}).</p>\n")
+    else:
+        sesiones = indice_sesiones(tarea.ticker, tarea.intervalo, data.index)
+        fig = grafica_velas(data, sesiones, titulo, f'{tarea.nombre} - Precio Histórico')
+        if directorio is None:
+            partes.append(div_figura(fig, f"figura{tarea.indice}"))  # Solo un div; las series van en base64
+        else:
+            ruta = os.path.join(directorio, f"figura{tarea.indice}.js")
+            partes.append(div_diferido(fig, f"figura{tarea.indice}", ruta, os.path.dirname(directorio) or "."))
+    partes.append('<br><a href="#top">Ir al inicio</a><br><br>\n')  # Enlace para ir al inicio
+    return "".join(partes)
+
+def secciones_en_orden(construir, tareas, procesos=PROCESOS, adelanto=ADELANTO):
+    """Genera construir(tarea) para cada tarea, en orden, calculándolas en `procesos` procesos."""
+    if procesos <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for tarea in tareas:
+            yield construir(tarea)
+        return
+    limite = procesos * (1 + adelanto)
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('fork')) as ejecutor:
+        pendientes = deque()
+        for tarea in tareas:
+            pendientes.append(ejecutor.submit(construir, tarea))
+            # Se entrega la más antigua antes de encargar más: la cola no crece sin límite
+            if len(pendientes) >= limite:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
@@ -0,0 +1,504 @@
+import numpy as np
+import math
+import os
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from estadisticas import MomentosEnLinea, SketchCuantiles
+
+# Backend compilado opcional: si Numba está instalado los modelos de Euler usan
+# los núcleos de simulacion_numba; si no, el mismo cálculo corre en NumPy puro
+try:
+    import simulacion_numba
+except ImportError:
+    simulacion_numba = None
+
+BACKENDS = ('numpy', 'numba')
+BACKEND = 'numba' if simulacion_numba is not None else 'numpy'
+
+def establecer_backend(nombre):
+    """Elige el backend de los modelos de Euler ('numpy' o 'numba')."""
+    global BACKEND
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {nombre}")
+    if nombre == 'numba' and simulacion_numba is None:
+        raise ImportError("Numba no está instalado; use el backend 'numpy'.")
+    BACKEND = nombre
+
+# Motor de simulación Monte Carlo vectorizado para los modelos de forex.py.
+# Cada función devuelve un arreglo (n_paths, num_steps + 1) con todas las
+# trayectorias; los números aleatorios se generan en un solo bloque con un
+# np.random.Generator y cada paso se aplica a todas las trayectorias a la vez.
+# Salvo T, los parámetros pueden ser escalares o arreglos de longitud n_paths
+# (un valor por trayectoria), lo que permite simular varios activos juntos.
+
+
+REDUCCIONES = (None, 'antiteticas', 'momentos', 'sobol', 'halton')
+
+class GeneradorReducido:
+    """Envuelve un np.random.Generator y aplica una técnica de reducción de varianza.
+
+    Todas las muestras se piden con las trayectorias en el último eje:
+    - 'antiteticas': la segunda mitad de las trayectorias usa -Z (y 1 - U).
+    - 'momentos': cada fila se reescala para tener media 0 y varianza 1 exactas.
+    - 'sobol' / 'halton': cuasi-aleatorios aleatorizados de scipy.stats.qmc, una
+      dimensión por fila (paso de tiempo).
+    Los métodos que no admiten la técnica se delegan al generador original.
+    """
+
+    def __init__(self, rng, metodo):
+        if metodo not in REDUCCIONES:
+            raise ValueError(f"Reducción de varianza desconocida: {metodo}")
+        self.rng = rng
+        self.metodo = metodo
+
+    def __getattr__(self, nombre):
+        return getattr(self.rng, nombre)
+
+    def _uniformes_qmc(self, filas, n):
+        from scipy.stats import qmc
+        clase = qmc.Sobol if self.metodo == 'sobol' else qmc.Halton
+        with warnings.catch_warnings():
+            # Sobol advierte si n no es potencia de 2; el balance se pierde pero sigue siendo válido
+            warnings.simplefilter("ignore")
+            puntos = clase(d=filas, scramble=True, seed=self.rng).random(n)
+        return np.clip(puntos.T, 1e-12, 1 - 1e-12)
+
+    def random(self, size=None, dtype=np.float64, out=None):
+        forma = out.shape if out is not None else size
+        if self.metodo in ('sobol', 'halton'):
+            forma2d = (1, forma) if np.ndim(forma) == 0 else (int(np.prod(forma[:-1])), forma[-1])
+            muestra = self._uniformes_qmc(*forma2d).reshape(forma)
+        else:
+            muestra = self.rng.random(forma)
+            if self.metodo == 'antiteticas':
+                mitad = (muestra.shape[-1] + 1) // 2
+                muestra[..., mitad:] = 1 - muestra[..., :muestra.shape[-1] - mitad]
+        if out is None:
+            return muestra.astype(dtype, copy=False)
+        out[...] = muestra
+        return out
+
+    def standard_normal(self, size=None, dtype=np.float64, out=None):
+        forma = out.shape if out is not None else size
+        if self.metodo in ('sobol', 'halton'):
+            from scipy.special import ndtri
+            muestra = ndtri(self.random(forma))
+        else:
+            muestra = self.rng.standard_normal(forma)
+            if self.metodo == 'antiteticas':
+                mitad = (muestra.shape[-1] + 1) // 2
+                muestra[..., mitad:] = -muestra[..., :muestra.shape[-1] - mitad]
+            elif self.metodo == 'momentos' and muestra.shape[-1] > 1:
+                muestra -= muestra.mean(axis=-1, keepdims=True)
+                muestra /= muestra.std(axis=-1, keepdims=True)
+        if out is None:
+            return muestra.astype(dtype, copy=False)
+        out[...] = muestra
+        return out
+
+def _generador(rng, reduccion=None):
+    """Acepta un Generator, una semilla o None y devuelve un np.random.Generator.
+
+    Con `reduccion` el generador se envuelve en un GeneradorReducido.
+    """
+    if not isinstance(rng, (np.random.Generator, GeneradorReducido)):
+        rng = np.random.default_rng(rng)
+    if reduccion is not None and not isinstance(rng, GeneradorReducido):
+        rng = GeneradorReducido(rng, reduccion)
+    return rng
+
+def _bloque_normal(rng, num_steps, n_paths, dtype):
+    """Reserva el arreglo de salida (pasos + 1, trayectorias) y llena las filas 1.. con N(0, 1)."""
+    bloque = np.empty((num_steps + 1, n_paths), dtype=dtype)
+    bloque[0] = 0
+    rng.standard_normal(out=bloque[1:], dtype=dtype)
+    return bloque
+
+def _usar_numba():
+    return BACKEND == 'numba' and simulacion_numba is not None
+
+def _por_trayectoria(valor, n_paths):
+    """Expande un parámetro (escalar o por trayectoria) a un arreglo float64 de longitud n_paths."""
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(valor, dtype=np.float64), (n_paths,)))
+
+def _a_precios(log_incrementos, S0):
+    """Convierte en sitio los incrementos logarítmicos (pasos + 1, trayectorias) en precios."""
+    np.cumsum(log_incrementos, axis=0, out=log_incrementos)
+    np.exp(log_incrementos, out=log_incrementos)
+    log_incrementos *= S0
+    return log_incrementos.T
+
+# Modelo de Heston con varianza estocástica correlacionada
+def heston_trayectorias(S0, T, r, sigma, v0, kappa, theta, rho, num_steps, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dt = T / num_steps
+    precios = _bloque_normal(rng, num_steps, n_paths, dtype)
+    z1 = rng.standard_normal((num_steps, n_paths), dtype=dtype)
+    if _usar_numba():
+        simulacion_numba.heston_incrementos(precios, z1, *(_por_trayectoria(x, n_paths) for x in (v0, kappa, theta, sigma, r, rho)), dt)
+        return _a_precios(precios, S0)
+    v = np.full(n_paths, v0, dtype=dtype)
+    raiz = np.empty(n_paths, dtype=dtype)
+    temp = np.empty(n_paths, dtype=dtype)
+    c_rho = np.sqrt(1 - np.square(rho))
+    for i in range(num_steps):
+        # La varianza se trunca en cero para evitar raíces de números negativos
+        np.maximum(v, 0, out=raiz)
+        raiz *= dt
+        np.sqrt(raiz, out=raiz)
+        # z2 = rho * z1 + sqrt(1 - rho^2) * w, escalado por sqrt(v * dt)
+        z2 = precios[i + 1]
+        z2 *= c_rho
+        np.multiply(z1[i], rho, out=temp)
+        z2 += temp
+        z2 *= raiz
+        np.multiply(v, -0.5 * dt, out=temp)
+        temp += r * dt
+        z2 += temp
+        # v += kappa * (theta - v) * dt + sigma * sqrt(v * dt) * z1
+        np.multiply(raiz, z1[i], out=temp)
+        temp *= sigma
+        v *= 1 - kappa * dt
+        v += kappa * theta * dt
+        v += temp
+    return _a_precios(precios, S0)
+
+def black_scholes_trayectorias(S0, T, r, sigma, num_steps, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dt = T / num_steps
+    precios = _bloque_normal(rng, num_steps, n_paths, dtype)
+    if _usar_numba():
+        simulacion_numba.gbm_incrementos(precios, _por_trayectoria(sigma, n_paths), _por_trayectoria(r, n_paths), dt)
+        return _a_precios(precios, S0)
+    precios[1:] *= sigma * math.sqrt(dt)
+    precios[1:] += (r - 0.5 * sigma**2) * dt
+    return _a_precios(precios, S0)
+
+def gbm_trayectorias(S0, T, r, sigma, num_steps, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dt = T / num_steps
+    precios = _bloque_normal(rng, num_steps, n_paths, dtype)
+    if _usar_numba():
+        simulacion_numba.gbm_incrementos(precios, _por_trayectoria(sigma, n_paths), _por_trayectoria(r, n_paths), dt)
+        return _a_precios(precios, S0)
+    precios[1:] *= sigma * math.sqrt(dt)
+    precios[1:] += (r - 0.5 * sigma**2) * dt
+    return _a_precios(precios, S0)
+
+# Modelo CIR (Cox-Ingersoll-Ross): el mismo choque mueve la varianza y el precio
+def cir_trayectorias(S0, T, r, sigma, kappa, theta, num_steps, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dt = T / num_steps
+    precios = _bloque_normal(rng, num_steps, n_paths, dtype)
+    if _usar_numba():
+        simulacion_numba.cir_incrementos(precios, *(_por_trayectoria(x, n_paths) for x in (np.asarray(sigma)**2, kappa, theta, r)), dt)
+        return _a_precios(precios, S0)
+    v = np.full(n_paths, sigma**2, dtype=dtype)
+    raiz = np.empty(n_paths, dtype=dtype)
+    for i in range(num_steps):
+        dz = precios[i + 1]
+        np.multiply(v, dt, out=raiz)
+        np.sqrt(raiz, out=raiz)
+        dz *= raiz  # dz = sqrt(v * dt) * z, compartido por varianza y precio
+        deriva = (r - 0.5 * v) * dt
+        v += kappa * (theta - v) * dt
+        v += dz
+        np.maximum(v, 0, out=v)  # Evitar que la volatilidad se vuelva negativa
+        dz += deriva
+    return _a_precios(precios, S0)
+
+# Modelo Vasicek: la tasa de interés sigue un proceso con reversión a la media
+def vasicek_trayectorias(S0, T, r, sigma, kappa, theta, num_steps, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dt = T / num_steps
+    precios = _bloque_normal(rng, num_steps, n_paths, dtype)
+    if _usar_numba():
+        simulacion_numba.vasicek_incrementos(precios, *(_por_trayectoria(x, n_paths) for x in (r, kappa, theta, sigma)), dt)
+        return _a_precios(precios, S0)
+    tasa = np.full(n_paths, r, dtype=dtype)
+    choque = sigma * math.sqrt(dt)
+    for i in range(num_steps):
+        dz = precios[i + 1]
+        dz *= choque
+        incremento = (tasa - 0.5 * sigma**2) * dt
+        tasa += kappa * (theta - tasa) * dt + dz
+        dz += incremento
+    return _a_precios(precios, S0)
+
+
+
+# Muestreadores exactos o estables con pasos grandes sobre una grilla de tiempos
+# arbitraria `tiempos` (instantes > 0, crecientes). Devuelven (n_paths, len(tiempos) + 1)
+# incluyendo el instante 0, así que el número de pasos depende de la resolución de
+# salida y no del límite de estabilidad numérica.
+
+def _pasos_grilla(tiempos):
+    """Convierte la grilla de tiempos en los tamaños de paso (columna) para difundir por trayectorias."""
+    tiempos = np.asarray(tiempos, dtype=np.float64)
+    dts = np.diff(tiempos, prepend=0.0)
+    if np.any(dts <= 0):
+        raise ValueError("La grilla de tiempos debe ser estrictamente creciente y positiva.")
+    return dts
+
+def gbm_exacto(S0, r, sigma, tiempos, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dts = _pasos_grilla(tiempos)[:, np.newaxis]
+    precios = _bloque_normal(rng, len(dts), n_paths, dtype)
+    precios[1:] *= (sigma * np.sqrt(dts)).astype(dtype)
+    precios[1:] += ((r - 0.5 * sigma**2) * dts).astype(dtype)
+    return _a_precios(precios, S0)
+
+def black_scholes_exacto(S0, r, sigma, tiempos, n_paths, rng=None, dtype=np.float64):
+    return gbm_exacto(S0, r, sigma, tiempos, n_paths, rng=rng, dtype=dtype)
+
+# Vasicek exacto: la tasa y el log-precio comparten el mismo browniano, por lo que
+# sus choques en cada intervalo son una normal bivariada con covarianza cerrada
+def vasicek_exacto(S0, r, sigma, kappa, theta, tiempos, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dts = _pasos_grilla(tiempos)
+    precios = _bloque_normal(rng, len(dts), n_paths, dtype)
+    z_tasa = rng.standard_normal((len(dts), n_paths), dtype=dtype)
+    tasa = np.full(n_paths, r, dtype=np.float64)
+    c = 1 + 1 / kappa
+    for i, h in enumerate(dts):
+        e = np.exp(-kappa * h)
+        i1 = (1 - e) / kappa
+        i2 = (1 - e**2) / (2 * kappa)
+        var_x = sigma**2 * i2
+        var_y = sigma**2 * (c**2 * h - 2 * c * i1 / kappa + i2 / kappa**2)
+        cov = sigma**2 * (c * i1 - i2 / kappa)
+        # Cholesky de la covarianza 2x2: el choque del log-precio es la primera componente
+        l11 = np.sqrt(var_y)
+        l21 = cov / l11
+        l22 = np.sqrt(np.maximum(var_x - l21**2, 0.0))
+        dz = precios[i + 1]
+        choque_tasa = l21 * dz + l22 * z_tasa[i]
+        dz *= l11
+        dz += theta * h + (tasa - theta) * i1 - 0.5 * sigma**2 * h
+        tasa = theta + (tasa - theta) * e + choque_tasa
+    return _a_precios(precios, S0)
+
+# CIR con la varianza muestreada de su ley exacta (chi-cuadrado no central). El
+# log-precio usa la identidad integral del mismo browniano y la regla del trapecio
+# para la integral de la varianza
+def cir_exacto(S0, r, sigma, kappa, theta, tiempos, n_paths, rng=None, dtype=np.float64):
+    rng = _generador(rng)
+    dts = _pasos_grilla(tiempos)
+    precios = np.zeros((len(dts) + 1, n_paths), dtype=dtype)
+    v = np.full(n_paths, sigma**2, dtype=np.float64)
+    grados = 4 * kappa * theta  # La volatilidad de la varianza es 1 en este modelo
+    for i, h in enumerate(dts):
+        e = np.exp(-kappa * h)
+        c = (1 - e) / (4 * kappa)
+        v_sig = c * rng.noncentral_chisquare(grados, v * e / c, size=n_paths)
+        integral_v = 0.5 * (v + v_sig) * h
+        # int sqrt(v) dW = v(t+h) - v(t) - kappa * theta * h + kappa * int v ds
+        difusion = v_sig - v - kappa * theta * h + kappa * integral_v
+        precios[i + 1] = r * h - 0.5 * integral_v + difusion
+        v = v_sig
+    return _a_precios(precios, S0)
+
+# Heston con el esquema QE de Andersen (2008): estable con pasos grandes y sin
+# varianzas negativas. El log-precio usa la discretización K0..K4 con gamma1 = gamma2 = 1/2
+def heston_qe(S0, r, sigma, v0, kappa, theta, rho, tiempos, n_paths, rng=None, dtype=np.float64, psi_c=1.5):
+    rng = _generador(rng)
+    dts = _pasos_grilla(tiempos)
+    precios = _bloque_normal(rng, len(dts), n_paths, dtype)
+    z_v = rng.standard_normal((len(dts), n_paths))
+    u_v = rng.random((len(dts), n_paths))
+    v = np.full(n_paths, v0, dtype=np.float64)
+    for i, h in enumerate(dts):
+        e = np.exp(-kappa * h)
+        m = theta + (v - theta) * e
+        s2 = v * sigma**2 * e * (1 - e) / kappa + theta * sigma**2 * (1 - e)**2 / (2 * kappa)
+        psi = s2 / np.maximum(m**2, np.finfo(np.float64).tiny)
+        v_sig = np.empty(n_paths)
+        # Sin dispersión (psi = 0, p. ej. v = theta = 0) la varianza siguiente es su media
+        fija = psi <= 0
+        v_sig[fija] = m[fija]
+        # Región cuadrática: v' = a (b + Z)^2; la raíz se factoriza para no desbordar con psi diminuto
+        cuad = (psi <= psi_c) & ~fija
+        inv_psi = 2 / psi[cuad]
+        b2 = inv_psi - 1 + inv_psi * np.sqrt(1 - 1 / inv_psi)
+        a = m[cuad] / (1 + b2)
+        v_sig[cuad] = a * (np.sqrt(b2) + z_v[i, cuad])**2
+        # Región exponencial: masa en cero más una cola exponencial
+        expo = psi > psi_c
+        p = (psi[expo] - 1) / (psi[expo] + 1)
+        beta = (1 - p) / m[expo]
+        u = u_v[i, expo]
+        v_sig[expo] = np.where(u <= p, 0.0, np.log((1 - p) / np.maximum(1 - u, 1e-300)) / beta)
+
+        k0 = -rho * kappa * theta * h / sigma
+        k1 = 0.5 * h * (kappa * rho / sigma - 0.5) - rho / sigma
+        k2 = 0.5 * h * (kappa * rho / sigma - 0.5) + rho / sigma
+        k34 = 0.5 * h * (1 - rho**2)
+        dz = precios[i + 1]
+        dz *= np.sqrt(k34 * (v + v_sig))
+        dz += r * h + k0 + k1 * v + k2 * v_sig
+        v = v_sig
+    return _a_precios(precios, S0)
+
+
+# Registro de modelos y de los parámetros que consume cada uno
+MODELOS = {
+    'Heston': heston_trayectorias,
+    'Black-Scholes': black_scholes_trayectorias,
+    'GBM': gbm_trayectorias,
+    'CIR': cir_trayectorias,
+    'Vasicek': vasicek_trayectorias,
+}
+
+ARGUMENTOS_MODELO = {
+    'Heston': ('S0', 'T', 'r', 'xi', 'v0', 'kappa', 'theta', 'rho'),
+    'Black-Scholes': ('S0', 'T', 'r', 'sigma'),
+    'GBM': ('S0', 'T', 'r', 'sigma'),
+    'CIR': ('S0', 'T', 'r', 'sigma', 'kappa', 'theta'),
+    'Vasicek': ('S0', 'T', 'r', 'sigma', 'kappa', 'theta'),
+}
+
+# Esquemas exactos (o QE para Heston) sobre grilla; no reciben T, lo define la grilla
+MODELOS_EXACTOS = {
+    'Heston': heston_qe,
+    'Black-Scholes': black_scholes_exacto,
+    'GBM': gbm_exacto,
+    'CIR': cir_exacto,
+    'Vasicek': vasicek_exacto,
+}
+
+# Parámetros opcionales y el parámetro que toman por defecto: la volatilidad de
+# la varianza de Heston (xi) es sigma salvo que la calibración la estime aparte
+ALIAS_PARAMETROS = {'xi': 'sigma'}
+
+ARGUMENTOS_EXACTOS = {modelo: tuple(a for a in argumentos if a != 'T') for modelo, argumentos in ARGUMENTOS_MODELO.items()}
+
+def _argumentos(parametros, nombres):
+    return [parametros[n] if n in parametros else parametros[ALIAS_PARAMETROS[n]] for n in nombres]
+
+def simular_en_grilla(modelo, parametros, tiempos, n_paths, rng=None, dtype=np.float64):
+    """Simula un modelo con su esquema exacto en los instantes de `tiempos` (p. ej. solo [T])."""
+    argumentos = _argumentos(parametros, ARGUMENTOS_EXACTOS[modelo])
+    return MODELOS_EXACTOS[modelo](*argumentos, tiempos, n_paths, rng=rng, dtype=dtype)
+
+def simular_modelo(modelo, parametros, num_steps, n_paths, rng=None, dtype=np.float64, esquema='euler', reduccion=None):
+    """Simula un modelo del registro con un diccionario de parámetros.
+
+    esquema='euler' usa la discretización original; esquema='exacto' usa los
+    muestreadores exactos (QE en Heston) sobre una grilla uniforme de num_steps pasos.
+    reduccion elige una técnica de GeneradorReducido (antitéticas, momentos, Sobol, Halton).
+    """
+    rng = _generador(rng, reduccion)
+    if esquema == 'exacto':
+        tiempos = np.linspace(0, parametros['T'], num_steps + 1)[1:]
+        return simular_en_grilla(modelo, parametros, tiempos, n_paths, rng, dtype)
+    argumentos = _argumentos(parametros, ARGUMENTOS_MODELO[modelo])
+    return MODELOS[modelo](*argumentos, num_steps, n_paths, rng=rng, dtype=dtype)
+
+def simular_modelos(parametros, num_steps, n_paths, rng=None, modelos=None, dtype=np.float64, esquema='euler', reduccion=None):
+    """Simula todos los modelos (o los indicados) y devuelve {modelo: arreglo (n_paths, num_steps + 1)}."""
+    rng = _generador(rng, reduccion)
+    modelos = list(MODELOS) if modelos is None else modelos
+    return {modelo: simular_modelo(modelo, parametros, num_steps, n_paths, rng, dtype, esquema) for modelo in modelos}
+
+
+class ResumenSimulacion:
+    """Cuantiles y momentos por paso de tiempo de un modelo simulado por lotes."""
+
+    def __init__(self, n_columnas, alpha=0.001):
+        self.sketch = SketchCuantiles(n_columnas, alpha=alpha)
+        self.momentos = MomentosEnLinea(n_columnas)
+
+    @property
+    def n(self):
+        return self.momentos.n
+
+    def actualizar(self, trayectorias):
+        self.sketch.actualizar(trayectorias)
+        self.momentos.actualizar(trayectorias)
+        return self
+
+    def combinar(self, otro):
+        self.sketch.combinar(otro.sketch)
+        self.momentos.combinar(otro.momentos)
+        return self
+
+    def percentiles(self, percentiles=(5, 25, 50, 75, 95)):
+        """Devuelve {percentil: arreglo (num_steps + 1,)} para dibujar bandas."""
+        valores = self.sketch.cuantiles(np.asarray(percentiles) / 100)
+        return dict(zip(percentiles, valores))
+
+def simular_por_lotes(parametros, num_steps, n_paths, tamano_lote=10000, rng=None, modelos=None, alpha=0.001, dtype=np.float64,
+                      esquema='euler', reduccion=None):
+    """Simula n_paths trayectorias en lotes y solo conserva sus resúmenes.
+
+    Cada lote alimenta los sketches y momentos de su modelo y se descarta, así
+    que la memoria máxima depende de `tamano_lote` y no de `n_paths`.
+    """
+    rng = _generador(rng, reduccion)
+    modelos = list(MODELOS) if modelos is None else modelos
+    resumenes = {modelo: ResumenSimulacion(num_steps + 1, alpha) for modelo in modelos}
+    restantes = n_paths
+    while restantes > 0:
+        n_lote = min(tamano_lote, restantes)
+        for modelo in modelos:
+            resumenes[modelo].actualizar(simular_modelo(modelo, parametros, num_steps, n_lote, rng, dtype, esquema))
+        restantes -= n_lote
+    return resumenes
+
+
+def _simular_lote(tarea):
+    """Tarea de un proceso: simula un lote con su propio flujo aleatorio."""
+    parametros, num_steps, n_lote, semilla_lote, modelos, resumir, alpha, dtype, esquema, reduccion, backend = tarea
+    establecer_backend(backend)
+    rng = _generador(np.random.Generator(np.random.PCG64(semilla_lote)), reduccion)
+    if not resumir:
+        return simular_modelos(parametros, num_steps, n_lote, rng=rng, modelos=modelos, dtype=dtype, esquema=esquema)
+    return {modelo: ResumenSimulacion(num_steps + 1, alpha).actualizar(simular_modelo(modelo, parametros, num_steps, n_lote, rng, dtype, esquema))
+            for modelo in modelos}
+
+def simular_en_paralelo(parametros, num_steps, n_paths, semilla=None, n_workers=None, tamano_lote=10000,
+                        modelos=None, resumir=False, alpha=0.001, dtype=np.float64, esquema='euler', reduccion=None):
+    """Reparte los lotes de trayectorias en un pool de procesos.
+
+    Cada lote recibe un flujo independiente derivado de np.random.SeedSequence(semilla)
+    y los resultados se combinan en el orden de los lotes, por lo que para una semilla
+    dada el resultado es idéntico bit a bit sin importar el número de procesos.
+    Con resumir=True devuelve {modelo: ResumenSimulacion}; si no, las trayectorias completas.
+    """
+    modelos = list(MODELOS) if modelos is None else modelos
+    n_workers = (os.cpu_count() or 1) if n_workers is None else n_workers
+    semilla_raiz = semilla if isinstance(semilla, np.random.SeedSequence) else np.random.SeedSequence(semilla)
+    tamanos = [min(tamano_lote, n_paths - inicio) for inicio in range(0, n_paths, tamano_lote)]
+    semillas = semilla_raiz.spawn(len(tamanos))
+    tareas = [(parametros, num_steps, n_lote, semilla_lote, modelos, resumir, alpha, dtype, esquema, reduccion, BACKEND)
+              for n_lote, semilla_lote in zip(tamanos, semillas)]
+
+    if n_workers <= 1:
+        lotes = map(_simular_lote, tareas)
+        return _combinar_lotes(lotes, modelos, num_steps, resumir, alpha)
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=_contexto_procesos()) as pool:
+        lotes = pool.map(_simular_lote, tareas)
+        return _combinar_lotes(lotes, modelos, num_steps, resumir, alpha)
+
+def _contexto_procesos():
+    # Los hilos de Numba no sobreviven a un fork: si está instalado los procesos se
+    # crean desde un servidor limpio (forkserver) o con spawn donde no exista
+    if simulacion_numba is None:
+        return None
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+def _combinar_lotes(lotes, modelos, num_steps, resumir, alpha):
+    """Combina los resultados por lote en orden (necesario para la reproducibilidad)."""
+    if resumir:
+        resumenes = {modelo: ResumenSimulacion(num_steps + 1, alpha) for modelo in modelos}
+        for lote in lotes:
+            for modelo in modelos:
+                resumenes[modelo].combinar(lote[modelo])
+        return resumenes
+    partes = {modelo: [] for modelo in modelos}
+    for lote in lotes:
+        for modelo in modelos:
+            partes[modelo].append(lote[modelo])
+    return {modelo: np.concatenate(partes[modelo], axis=0) for modelo in modelos}
@@ -0,0 +1,74 @@
+import math
+from numba import njit, prange
+
+# Núcleos compilados (Numba) para el motor de simulacion.py. Reciben los mismos
+# bloques de normales que dibuja la versión NumPy y escriben los incrementos
+# logarítmicos en sitio, fusionando cada paso de tiempo en una sola pasada sin
+# arreglos temporales. Las operaciones siguen el mismo orden que la versión NumPy,
+# así que los resultados coinciden bit a bit para la misma semilla.
+# Los parámetros llegan como arreglos float64 de longitud n_paths (uno por
+# trayectoria) y se redondean al tipo del bloque dentro de cada núcleo, igual que
+# NumPy redondea los escalares de Python al operar con un arreglo float32; las
+# combinaciones de parámetros (p. ej. kappa * theta * dt) se calculan en float64
+# antes de redondear, como en la versión NumPy. Con parámetros escalares el
+# resultado coincide también en float32; con arreglos de parámetros NumPy opera
+# en float64 y solo coincide en float64.
+
+
+@njit(parallel=True, cache=True)
+def heston_incrementos(precios, z1, v0, kappa, theta, sigma, r, rho, dt):
+    t = precios.dtype.type
+    n_paths = precios.shape[1]
+    v = v0.astype(precios.dtype)
+    dt_bloque = t(dt)
+    for i in range(precios.shape[0] - 1):
+        for j in prange(n_paths):
+            raiz = math.sqrt(max(v[j], t(0)) * dt_bloque)
+            # NumPy multiplica por sqrt(1 - rho^2) como escalar float64
+            z2 = t(precios[i + 1, j] * math.sqrt(1 - rho[j]**2))
+            z2 = z2 + z1[i, j] * t(rho[j])
+            z2 = z2 * raiz
+            z2 = z2 + (v[j] * t(-0.5 * dt) + t(r[j] * dt))
+            precios[i + 1, j] = z2
+            temp = raiz * z1[i, j] * t(sigma[j])
+            vj = v[j] * t(1 - kappa[j] * dt)
+            vj = vj + t(kappa[j] * theta[j] * dt)
+            v[j] = vj + temp
+
+@njit(parallel=True, cache=True)
+def gbm_incrementos(precios, sigma, r, dt):
+    t = precios.dtype.type
+    n_paths = precios.shape[1]
+    raiz_dt = math.sqrt(dt)
+    for i in range(precios.shape[0] - 1):
+        for j in prange(n_paths):
+            precios[i + 1, j] = precios[i + 1, j] * t(sigma[j] * raiz_dt) + t((r[j] - 0.5 * sigma[j]**2) * dt)
+
+@njit(parallel=True, cache=True)
+def cir_incrementos(precios, v0, kappa, theta, r, dt):
+    t = precios.dtype.type
+    n_paths = precios.shape[1]
+    v = v0.astype(precios.dtype)
+    dt_bloque = t(dt)
+    for i in range(precios.shape[0] - 1):
+        for j in prange(n_paths):
+            dz = precios[i + 1, j] * math.sqrt(v[j] * dt_bloque)
+            deriva = (t(r[j]) - t(0.5) * v[j]) * dt_bloque
+            vj = v[j] + t(kappa[j]) * (t(theta[j]) - v[j]) * dt_bloque
+            vj = vj + dz
+            v[j] = max(vj, t(0))  # Evitar que la volatilidad se vuelva negativa
+            precios[i + 1, j] = dz + deriva
+
+@njit(parallel=True, cache=True)
+def vasicek_incrementos(precios, r0, kappa, theta, sigma, dt):
+    t = precios.dtype.type
+    n_paths = precios.shape[1]
+    tasa = r0.astype(precios.dtype)
+    dt_bloque = t(dt)
+    raiz_dt = math.sqrt(dt)
+    for i in range(precios.shape[0] - 1):
+        for j in prange(n_paths):
+            dz = precios[i + 1, j] * t(sigma[j] * raiz_dt)
+            incremento = (tasa[j] - t(0.5 * sigma[j]**2)) * dt_bloque
+            tasa[j] = tasa[j] + (t(kappa[j]) * (t(theta[j]) - tasa[j]) * dt_bloque + dz)
+            precios[i + 1, j] = dz + incremento
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import almacen_barras
+
+
+def _barras(inicio, n, base=100.0):
+    indice = pd.date_range(inicio, periods=n, freq='1min', tz='America/New_York', unit='ns')
+    cierre = base + np.arange(n, dtype=np.float64)
+    return pd.DataFrame({'Open': cierre, 'High': cierre + 1, 'Low': cierre - 1, 'Close': cierre,
+                         'Adj Close': cierre, 'Volume': 10.0, 'Dividends': 0.0, 'Stock Splits': 0.0}, index=indice)
+
+
+def _leer(directorio):
+    tiempos, registros = almacen_barras.rango('SPY', '1m', directorio=directorio)
+    return almacen_barras.como_dataframe(tiempos, registros, almacen_barras.zona_horaria('SPY', '1m', directorio))
+
+
+def test_agregar_cola_y_reescritura(tmp_path):
+    directorio = str(tmp_path)
+    primeras = _barras('2024-03-04 09:30', 100)
+    assert almacen_barras.agregar('SPY', '1m', primeras, directorio) == 100
+    # La cola empieza en la última barra guardada: solo esa se reescribe
+    cola = _barras('2024-03-04 11:09', 30, base=500.0)
+    assert almacen_barras.agregar('SPY', '1m', cola, directorio) == 30
+    # Barras viejas (una recarga) reescriben desde la primera y conservan las que no vienen
+    recarga = _barras('2024-03-04 10:00', 5, base=900.0)
+    almacen_barras.agregar('SPY', '1m', recarga, directorio)
+
+    esperado = pd.concat([primeras.iloc[:99], cola])
+    esperado.loc[recarga.index] = recarga
+    leido = _leer(directorio)
+    assert almacen_barras.cantidad('SPY', '1m', directorio) == 129
+    assert str(leido.index.tz) == 'America/New_York'
+    pd.testing.assert_frame_equal(leido, esperado.rename_axis('Datetime'), check_freq=False)
+
+    tiempos, registros = almacen_barras.rango('SPY', '1m', '2024-03-04 15:00Z', '2024-03-04 15:05Z', directorio)
+    np.testing.assert_array_equal(registros['close'], [900.0, 901.0, 902.0, 903.0, 904.0])
+
+
+def test_agregar_reajusta_precio_ajustado(tmp_path):
+    directorio = str(tmp_path)
+    almacen_barras.agregar('SPY', '1m', _barras('2024-03-04 09:30', 10), directorio)
+    # La recarga trae las barras desde la 5 con el precio ajustado a la mitad (p. ej. un split)
+    recarga = _barras('2024-03-04 09:35', 5, base=105.0)
+    recarga['Adj Close'] /= 2
+    almacen_barras.agregar('SPY', '1m', recarga, directorio, reajustar=True)
+    leido = _leer(directorio)
+    np.testing.assert_allclose(leido['Adj Close'], leido['Close'] / 2)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from cache_datos import remuestrear
+from calendario import apertura_sesion
+
+
+def _minutos(inicio, fin, tz):
+    indice = pd.date_range(inicio, fin, freq='1min', tz=tz, inclusive='left')
+    precio = np.arange(len(indice), dtype=np.float64)
+    return pd.DataFrame({'Open': precio, 'High': precio + 0.5, 'Low': precio - 0.5, 'Close': precio + 0.25,
+                         'Volume': 1.0}, index=indice)
+
+
+def test_remuestrear_alinea_con_la_apertura():
+    # Faltan las dos primeras barras de la sesión: las horas igual empiezan a las 9:30
+    data = _minutos('2024-03-04 09:32', '2024-03-04 12:00', 'America/New_York')
+    horas = remuestrear(data, '1h', apertura_sesion('SPY', data.index.tz))
+    inicios = pd.date_range('2024-03-04 09:30', periods=3, freq='1h', tz='America/New_York')
+    assert list(horas.index) == list(inicios)
+    primera = data.loc[:'2024-03-04 10:29']
+    assert horas['Open'].iloc[0] == primera['Open'].iloc[0]
+    assert horas['High'].iloc[0] == primera['High'].max()
+    assert horas['Close'].iloc[0] == primera['Close'].iloc[-1]
+    assert horas['Volume'].iloc[0] == len(primera)
+
+
+def test_remuestrear_forex_en_hora_redonda():
+    data = _minutos('2024-03-04 09:32', '2024-03-04 12:00', 'Europe/London')
+    horas = remuestrear(data, '1h', apertura_sesion('EURUSD=X', data.index.tz))
+    assert list(horas.index.hour) == [9, 10, 11]
+    assert horas['Volume'].iloc[0] == 28
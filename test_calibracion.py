@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+from calibracion import calibrar
+
+
+def _cierres(n=96 * 20):
+    indice = pd.date_range('2024-01-01', periods=n, freq='15min', tz='UTC')
+    retornos = np.random.default_rng(3).normal(0, 1e-3, (n, 2))
+    cierres = pd.DataFrame(100 * np.exp(np.cumsum(retornos, axis=0)), index=indice, columns=['EURUSD=X', 'GC=F'])
+    cierres.iloc[200:230, 1] = np.nan  # Un hueco corta las ternas de un solo ticker
+    return cierres
+
+
+def test_calibracion_incremental_igual_a_completa(tmp_path):
+    cierres = _cierres()
+    ruta = str(tmp_path / "calibracion.csv")
+    # Los cortes caen a mitad de ventana: la ventana en curso se termina en la corrida siguiente
+    for fin in (701, 1203):
+        calibrar(cierres.iloc[:fin], "15m", ruta_cache=ruta)
+    incremental = calibrar(cierres, "15m", ruta_cache=ruta)
+    completa = calibrar(cierres, "15m", ruta_cache=None)
+    pd.testing.assert_frame_equal(incremental, completa, rtol=1e-9)
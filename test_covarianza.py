@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from covarianza import covarianza_pares, reparar_psd
+
+
+def test_covarianza_pares_igual_a_pandas():
+    rng = np.random.default_rng(2)
+    retornos = pd.DataFrame(rng.normal(0, 0.01, (300, 4)), columns=list('ABCD'))
+    retornos.iloc[:250, 1] = np.nan                  # Cotiza desde hace poco
+    retornos.iloc[rng.random(300) < 0.2, 2] = np.nan  # Fechas sueltas sin dato
+    retornos.iloc[:290, 3] = np.nan                  # Muy poca historia: sin pares
+    cov = covarianza_pares(retornos)
+    pd.testing.assert_frame_equal(cov, retornos.cov(min_periods=20))
+    assert cov.loc['A', 'D'] != cov.loc['A', 'D']
+    assert cov.loc['A', 'B'] == cov.loc['A', 'B']
+
+
+def test_reparar_psd_conserva_varianzas():
+    # Correlaciones incompatibles entre sí, como las que dejan los pares con fechas distintas
+    corr = np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]])
+    varianzas = np.array([4.0, 1.0, 0.25])
+    cov = pd.DataFrame(corr * np.sqrt(np.outer(varianzas, varianzas)), index=list('ABC'), columns=list('ABC'))
+    assert np.linalg.eigvalsh(cov.to_numpy())[0] < 0
+    reparada = reparar_psd(cov)
+    assert list(reparada.index) == list('ABC')
+    np.testing.assert_allclose(np.diagonal(reparada), varianzas)
+    assert np.linalg.eigvalsh(reparada.to_numpy())[0] >= 0
+    # Una matriz que ya es semidefinida positiva no cambia
+    sana = np.cov(np.random.default_rng(4).normal(size=(3, 50)))
+    np.testing.assert_array_equal(reparar_psd(sana), sana)
@@ -0,0 +1,39 @@
+import numpy as np
+from estadisticas import EstadisticasSerie, SketchCuantiles
+
+
+def test_sketch_rango_nuevo_arriba_del_viejo():
+    # El segundo lote obliga a colapsar todas las cubetas viejas en la primera
+    s = SketchCuantiles(3)
+    s.actualizar(np.ones((10, 3)))
+    s.actualizar(np.full((10, 3), 1000.))
+    assert s.n == 20
+    assert (s.conteos.sum(axis=1) == 20).all()
+    assert (s.conteos[:, 0] == 10).all()
+    np.testing.assert_allclose(s.cuantiles([0.99])[0], 1000., rtol=s.alpha)
+
+
+def test_serie_cuantiles_con_rango_amplio():
+    s = EstadisticasSerie().actualizar(np.linspace(10, 40, 1001))
+    np.testing.assert_allclose([s.cuantil(0.05), s.cuantil(0.25)], [11.5, 17.5], rtol=2 * s.sketch.alpha)
+
+
+def test_sketch_cuantiles_colapsados_son_nan():
+    s = SketchCuantiles(1, alpha=0.01, max_cubetas=10)
+    s.actualizar(np.linspace(1, 100, 100)[:, np.newaxis])
+    assert s.colapsados[0] > 0
+    assert np.isnan(s.cuantiles([0.05])[0, 0])
+    np.testing.assert_allclose(s.cuantiles([0.99])[0, 0], 99., rtol=s.alpha)
+    s.quitar(np.linspace(1, 90, 90)[:, np.newaxis])
+    assert s.colapsados[0] == 0
+
+
+def test_serie_extremos_en_ventana():
+    rng = np.random.default_rng(5)
+    valores = rng.uniform(10, 20, 500)
+    s = EstadisticasSerie(ventana=50)
+    for inicio in range(0, 500, 7):
+        s.actualizar(valores[inicio:inicio + 7])
+        ventana = valores[max(inicio + 7 - 50, 0):inicio + 7]
+        assert s.minimo == ventana.min()
+        assert s.maximo == ventana.max()
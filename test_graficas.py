@@ -0,0 +1,50 @@
+import json
+import shutil
+import subprocess
+import numpy as np
+import pandas as pd
+import pytest
+from calendario import calcular_sesiones, fechas_hover
+from graficas import grafica_velas
+from reporte_html import CARGADOR_JS, DECODIFICADOR_JS, PIRAMIDE_JS, _registro_figura
+
+# Navegador mínimo para correr registrarFigura en node: guarda la customdata que
+# recibe plotly al dibujar y en cada restyle
+ENTORNO_JS = """
+var atob = function(b) { return Buffer.from(b, 'base64').toString('binary'); };
+var PLANTILLA_PLOTLY = {}, salida = [];
+var div = {on: function(evento, f) {}};
+var document = {getElementById: function() { return div; }, addEventListener: function() {}};
+var Plotly = {
+  newPlot: function(d, data, layout) { d.data = data; d.layout = layout; return {then: function(f) { f(); }}; },
+  restyle: function(d, cambio) { salida.push(Array.from(cambio.customdata[0])); }
+};
+"""
+
+
+def _velas(n=3000):
+    indice = pd.date_range('2024-03-07 20:00', periods=n, freq='1min', tz='UTC').tz_convert('Europe/Madrid')
+    cierre = 1.08 + np.cumsum(np.random.default_rng(1).normal(0, 1e-4, n))
+    return pd.DataFrame({'Open': cierre, 'High': cierre + 1e-4, 'Low': cierre - 1e-4, 'Close': cierre}, index=indice)
+
+
+def test_fechas_hover_en_milisegundos_locales():
+    data = _velas(20)
+    ms = fechas_hover(data.index)
+    assert ms.dtype == np.int64
+    assert ms[0] == pd.Timestamp('2024-03-07 21:00').value // 10**6
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='requiere node')
+def test_hover_muestra_la_hora_local():
+    data = _velas()
+    fig = grafica_velas(data, calcular_sesiones(data.index, 'forex'), 'EURUSD', 'EURUSD')
+    registro = _registro_figura(fig, 'g')
+    # La customdata viaja como int64 en base64, sin un texto por barra
+    assert '"customdata": {"__b64"' in registro
+    codigo = ENTORNO_JS + DECODIFICADOR_JS + PIRAMIDE_JS + CARGADOR_JS + registro + 'console.log(JSON.stringify(salida));'
+    salida = json.loads(subprocess.run(['node'], input=codigo, capture_output=True, text=True, check=True).stdout)
+    fechas = salida[-1]
+    assert len(fechas) < len(data)
+    assert fechas[0] == '2024-03-07T21:00:00'
+    assert set(fechas) <= set(data.index.strftime('%Y-%m-%dT%H:%M:%S'))
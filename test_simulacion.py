@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import simulacion
+
+PARAMETROS = dict(S0=20.0, T=1 / 24, r=0.01, sigma=0.1, v0=0.01, kappa=1.0, theta=0.01, xi=1.0, rho=0.1)
+
+
+@pytest.fixture
+def backend_original():
+    anterior = simulacion.BACKEND
+    yield
+    simulacion.establecer_backend(anterior)
+
+
+@pytest.mark.skipif(simulacion.simulacion_numba is None, reason='requiere numba')
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+@pytest.mark.parametrize('modelo', ['Heston', 'GBM', 'CIR', 'Vasicek'])
+def test_backends_coinciden_bit_a_bit(modelo, dtype, backend_original):
+    trayectorias = {}
+    for backend in simulacion.BACKENDS:
+        simulacion.establecer_backend(backend)
+        trayectorias[backend] = simulacion.simular_modelo(modelo, PARAMETROS, 50, 1000, np.random.default_rng(7), dtype)
+    assert trayectorias['numba'].dtype == dtype
+    np.testing.assert_array_equal(trayectorias['numpy'], trayectorias['numba'])
+
+
+EXACTOS = dict(S0=20.0, T=1.0, r=0.03, sigma=0.2, v0=0.04, kappa=2.0, theta=0.04, xi=0.3, rho=-0.5)
+
+
+@pytest.mark.parametrize('pasos', [1, 20])
+@pytest.mark.parametrize('modelo', ['GBM', 'Vasicek'])
+def test_exactos_siguen_la_ley_normal(modelo, pasos):
+    from benchmark_simulacion import log_precio_normal
+    n = 100000
+    tiempos = np.linspace(0, EXACTOS['T'], pasos + 1)[1:]
+    log_final = np.log(simulacion.simular_en_grilla(modelo, EXACTOS, tiempos, n, np.random.default_rng(11))[:, -1])
+    media, desviacion = log_precio_normal(modelo, EXACTOS)
+    assert abs(log_final.mean() - media) < 4 * desviacion / np.sqrt(n)
+    np.testing.assert_allclose(log_final.std(), desviacion, rtol=0.01)
+
+
+@pytest.mark.parametrize('modelo', ['CIR', 'Heston'])
+def test_exactos_precio_descontado_es_martingala(modelo):
+    n = 100000
+    tiempos = np.linspace(0, EXACTOS['T'], 21)[1:]
+    final = simulacion.simular_en_grilla(modelo, EXACTOS, tiempos, n, np.random.default_rng(11))[:, -1]
+    esperado = EXACTOS['S0'] * np.exp(EXACTOS['r'] * EXACTOS['T'])
+    assert abs(final.mean() - esperado) < 4 * final.std() / np.sqrt(n)
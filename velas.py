@@ -0,0 +1,101 @@
+import numpy as np
+from simulacion import MODELOS, _generador
+
+# Simulación que emite velas OHLC de pronóstico directamente. Cada vela se simula
+# con `subpasos` pasos finos y se reduce al vuelo a apertura/máximo/mínimo/cierre,
+# así las mechas son extremos reales dentro de la vela y solo se guardan los
+# agregados por vela (opcionalmente en float32), nunca la trayectoria fina completa.
+
+CAMPOS_VELA = ('Open', 'High', 'Low', 'Close')
+
+
+# Pasos de Euler de cada modelo sobre el log-precio. Reciben el estado del modelo
+# (varianza o tasa), lo actualizan en sitio y devuelven el incremento logarítmico.
+def _paso_heston(estado, z, dt, p):
+    v = estado
+    raiz = np.sqrt(np.maximum(v, 0) * dt)
+    z1, w = z
+    z2 = p['rho'] * z1 + np.sqrt(1 - np.square(p['rho'])) * w
+    incremento = (p['r'] - 0.5 * v) * dt + raiz * z2
+    v += p['kappa'] * (p['theta'] - v) * dt + p.get('xi', p['sigma']) * raiz * z1
+    return incremento
+
+def _paso_cir(estado, z, dt, p):
+    v = estado
+    dz = np.sqrt(v * dt) * z[0]
+    incremento = (p['r'] - 0.5 * v) * dt + dz
+    v += p['kappa'] * (p['theta'] - v) * dt + dz
+    np.maximum(v, 0, out=v)  # Evitar que la volatilidad se vuelva negativa
+    return incremento
+
+def _paso_vasicek(estado, z, dt, p):
+    tasa = estado
+    dz = p['sigma'] * np.sqrt(dt) * z[0]
+    incremento = (tasa - 0.5 * p['sigma']**2) * dt + dz
+    tasa += p['kappa'] * (p['theta'] - tasa) * dt + dz
+    return incremento
+
+# Modelo: (función de paso, normales por paso, estado inicial)
+PASOS_MODELO = {
+    'Heston': (_paso_heston, 2, lambda p: p['v0']),
+    'CIR': (_paso_cir, 1, lambda p: p['sigma']**2),
+    'Vasicek': (_paso_vasicek, 1, lambda p: p['r']),
+}
+
+def simular_velas(modelo, parametros, num_velas, subpasos, n_paths, rng=None, dtype=np.float32):
+    """Simula `num_velas` velas por trayectoria con `subpasos` pasos finos cada una.
+
+    Devuelve {'Open', 'High', 'Low', 'Close'}: arreglos (n_paths, num_velas) de `dtype`.
+    El horizonte total es parametros['T'] y el log-precio se acumula en float64.
+    """
+    rng = _generador(rng)
+    dt = parametros['T'] / (num_velas * subpasos)
+    velas = {campo: np.empty((n_paths, num_velas), dtype=dtype) for campo in CAMPOS_VELA}
+    log_s = np.zeros(n_paths)
+    S0 = parametros['S0']
+
+    if modelo in ('GBM', 'Black-Scholes'):
+        # Incrementos independientes: cada vela se acumula de una vez a lo largo de sus subpasos
+        sigma, r = parametros['sigma'], parametros['r']
+        for k in range(num_velas):
+            camino = rng.standard_normal((subpasos, n_paths))
+            camino *= sigma * np.sqrt(dt)
+            camino += (r - 0.5 * sigma**2) * dt
+            camino[0] += log_s
+            np.cumsum(camino, axis=0, out=camino)
+            maximo = np.maximum(camino.max(axis=0), log_s)
+            minimo = np.minimum(camino.min(axis=0), log_s)
+            _guardar_vela(velas, k, S0, log_s, maximo, minimo, camino[-1])
+            log_s = camino[-1].copy()
+        return velas
+
+    paso, n_normales, estado_inicial = PASOS_MODELO[modelo]
+    estado = np.array(np.broadcast_to(estado_inicial(parametros), n_paths), dtype=np.float64)
+    for k in range(num_velas):
+        z = rng.standard_normal((n_normales, subpasos, n_paths))
+        apertura = log_s.copy()
+        maximo = log_s.copy()
+        minimo = log_s.copy()
+        for j in range(subpasos):
+            log_s += paso(estado, z[:, j], dt, parametros)
+            np.maximum(maximo, log_s, out=maximo)
+            np.minimum(minimo, log_s, out=minimo)
+        _guardar_vela(velas, k, S0, apertura, maximo, minimo, log_s)
+    return velas
+
+def _guardar_vela(velas, k, S0, apertura, maximo, minimo, cierre):
+    """Convierte los log-precios de una vela en precios y los guarda en la columna k."""
+    for campo, valores in zip(CAMPOS_VELA, (apertura, maximo, minimo, cierre)):
+        velas[campo][:, k] = S0 * np.exp(valores)
+
+def simular_velas_modelos(parametros, num_velas, subpasos, n_paths, rng=None, modelos=None, dtype=np.float32):
+    """Simula las velas de varios modelos: {modelo: {'Open', 'High', 'Low', 'Close'}}."""
+    rng = _generador(rng)
+    modelos = list(MODELOS) if modelos is None else modelos
+    return {modelo: simular_velas(modelo, parametros, num_velas, subpasos, n_paths, rng, dtype) for modelo in modelos}
+
+def vela_representativa(velas):
+    """Elige la trayectoria cuyo cierre final es la mediana y devuelve sus velas (1D)."""
+    cierres = velas['Close'][:, -1]
+    indice = np.argsort(cierres)[len(cierres) // 2]
+    return {campo: velas[campo][indice] for campo in CAMPOS_VELA}
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import time
+import almacen_barras
+from cache_datos import historial, rango_pedido
+from descargas import precargar, sondear
+from estadisticas import EstadisticasSerie, MomentosEnLinea
+from proveedores import proveedor_actual
+
+# Modo de vigilancia: sigue varios tickers durante la sesión sin volver a
+# descargar ni recalcular todo en cada vuelta. En cada sondeo solo se piden las
+# barras posteriores a la última guardada y se agregan al final del almacén de
+# barras (sin reescribir el caché), y cada ticker lee de ahí únicamente las
+# nuevas. Las estadísticas (último precio, media, desviación, mínimo, máximo) y el
+# pronóstico se actualizan en O(1) por barra con acumuladores en línea, y solo se
+# vuelven a emitir los tickers que cambiaron.
+#
+# La barra más reciente puede estar en curso: se muestra como último precio pero
+# entra en los acumuladores cuando aparece la siguiente.
+
+INTERVALO = "1m"              # Se archivan en almacen_barras
+PERIODO = "1d"                # Historia con la que arranca cada ticker
+SONDEO = 60                   # Segundos entre sondeos
+HORIZONTE = 60                # Barras hacia adelante del pronóstico
+DIRECTORIO_SALIDA = "vigilancia"
+
+TICKERS = ["MXN=X", "EURUSD=X", "GBPUSD=X", "USDJPY=X", "USDCAD=X", "AUDUSD=X", "GC=F", "SI=F", "CL=F"]
+
+
+class EstadoTicker:
+    """Estadísticas en línea de los cierres de un ticker."""
+
+    def __init__(self, ticker_symbol, desde):
+        self.ticker_symbol = ticker_symbol
+        self.desde = desde                      # ns UTC de la primera barra que falta procesar
+        self.precios = EstadisticasSerie()
+        self.retornos = MomentosEnLinea(1)      # Retornos logarítmicos por barra
+        self.cierre_anterior = np.nan
+        self.ultimo_precio = np.nan
+        self.ultima_fecha = None
+
+    def agregar(self, cierres):
+        """Incorpora barras cerradas (en orden); cuesta O(1) por barra."""
+        if len(cierres) == 0:
+            return
+        cierres = np.asarray(cierres, dtype=np.float64)
+        self.precios.actualizar(cierres)
+        retornos = np.diff(np.log(np.concatenate(([self.cierre_anterior], cierres))))
+        if np.isnan(self.cierre_anterior):
+            retornos = retornos[1:]
+        self.retornos.actualizar(retornos[:, np.newaxis])
+        self.cierre_anterior = cierres[-1]
+
+    def pronostico(self, horizonte=HORIZONTE):
+        """Precio esperado y desviación a `horizonte` barras con un GBM de los retornos observados."""
+        if self.retornos.n < 2 or np.isnan(self.ultimo_precio):
+            return np.nan, np.nan
+        media, varianza = self.retornos.media[0], self.retornos.varianza[0]
+        esperado = self.ultimo_precio * np.exp(horizonte * (media + varianza / 2))
+        return esperado, esperado * np.sqrt(np.expm1(horizonte * varianza))
+
+    def resumen(self):
+        esperado, desviacion_pronostico = self.pronostico()
+        return {
+            'Ticker': self.ticker_symbol,
+            'Fecha': None if self.ultima_fecha is None else self.ultima_fecha.isoformat(),
+            'Ultimo precio': self.ultimo_precio,
+            'Precio medio': self.precios.media if self.precios.n else np.nan,
+            'Desviacion': self.precios.desviacion,
+            'Minimo': self.precios.minimo,
+            'Maximo': self.precios.maximo,
+            'Barras': self.precios.n,
+            'Pronostico': esperado,
+            'Desviacion pronostico': desviacion_pronostico,
+        }
+
+
+def _barras_nuevas(ticker_symbol, desde):
+    """(tiempos ns UTC, cierres) desde `desde`, leyendo solo la cola del almacén si hay caché."""
+    if proveedor_actual().cacheable:
+        tiempos, registros = almacen_barras.rango(ticker_symbol, INTERVALO, desde)
+        return tiempos, registros['adj_close']
+    # Sin caché (grabación/reproducción) se lee la ventana completa y se filtra
+    data = historial(ticker_symbol, period=PERIODO, interval=INTERVALO)
+    if data.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    tiempos = data.index.tz_convert('UTC').as_unit('ns').asi8
+    return tiempos[tiempos >= desde], data['Close'].to_numpy()[tiempos >= desde]
+
+def actualizar(estado):
+    """Procesa las barras nuevas de un ticker; devuelve True si cambió algo."""
+    tiempos, cierres = _barras_nuevas(estado.ticker_symbol, estado.desde)
+    if len(tiempos) == 0:
+        return False
+    ultimo_precio = float(cierres[-1])
+    ultima_fecha = pd.Timestamp(int(tiempos[-1]), tz='UTC')
+    cambio = len(tiempos) > 1 or ultimo_precio != estado.ultimo_precio or ultima_fecha != estado.ultima_fecha
+    # Todas menos la última (en curso) entran en los acumuladores
+    estado.agregar(cierres[:-1])
+    estado.desde = int(tiempos[-1])
+    estado.ultimo_precio, estado.ultima_fecha = ultimo_precio, ultima_fecha
+    return cambio
+
+def emitir(estado, directorio=DIRECTORIO_SALIDA):
+    """Muestra y guarda el resumen de un ticker (solo se llama para los que cambiaron)."""
+    resumen = estado.resumen()
+    print(f"{resumen['Fecha']} {estado.ticker_symbol:10s} último {resumen['Ultimo precio']:.4f}  "
+          f"media {resumen['Precio medio']:.4f}  desv. {resumen['Desviacion']:.4f}  "
+          f"mín. {resumen['Minimo']:.4f}  máx. {resumen['Maximo']:.4f}  "
+          f"pronóstico {resumen['Pronostico']:.4f} ± {resumen['Desviacion pronostico']:.4f}")
+    os.makedirs(directorio, exist_ok=True)
+    nombre = "".join(c if c.isalnum() or c in "=^.-" else "_" for c in estado.ticker_symbol)
+    with open(os.path.join(directorio, f"{nombre}.json"), "w") as archivo:
+        json.dump(resumen, archivo, default=float)
+
+def vigilar(tickers=TICKERS, sondeo=SONDEO, ciclos=None, directorio=DIRECTORIO_SALIDA):
+    """Sondea los tickers cada `sondeo` segundos (indefinidamente si ciclos es None)."""
+    precargar(tickers, PERIODO, INTERVALO)
+    estados = {}
+    for ticker in tickers:
+        # Arranca en la primera barra de la última sesión, como mostrar_estadisticas
+        data = historial(ticker, period=PERIODO, interval=INTERVALO)
+        desde = data.index[0] if not data.empty else rango_pedido(PERIODO)[0]
+        estados[ticker] = EstadoTicker(ticker, pd.Timestamp(desde).value)
+    ciclo = 0
+    while ciclos is None or ciclo < ciclos:
+        comienzo = time.time()
+        if ciclo:
+            sondear(tickers, INTERVALO, PERIODO)
+        for estado in estados.values():
+            if actualizar(estado):
+                emitir(estado, directorio)
+        ciclo += 1
+        if ciclos is None or ciclo < ciclos:
+            time.sleep(max(0.0, sondeo - (time.time() - comienzo)))
+    return estados
+
+
+if __name__ == "__main__":
+    try:
+        vigilar()
+    except KeyboardInterrupt:
+        print("Vigilancia detenida.")